@@ -0,0 +1,3 @@
+"""
+Microbenchmarks of the Kabelwerk SDK — run with: python -m benchmarks
+"""
@@ -0,0 +1,329 @@
+"""
+Microbenchmarks of the SDK hot paths, run against a local stub of the
+Kabelwerk API.
+
+Usage:
+
+    python -m benchmarks [--output FILE] [--compare FILE] [--filter TEXT]
+
+The results are printed as a table and can be written to a JSON file, which
+can then be passed to --compare when benchmarking another version of the SDK.
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import cycle
+import json
+import platform
+import statistics
+import sys
+import time
+
+from kabelwerk import __version__, config
+from kabelwerk.api import update_user, update_users
+from kabelwerk.api.base import get_headers, get_session, make_api_call
+from kabelwerk.api.client import Client, get_client
+from kabelwerk.api.codec import decode, encode
+from kabelwerk.api.decoders import (
+    USER_CACHE_SIZE, decode_message, decode_room, decode_user,
+)
+from kabelwerk.api.log import RequestLog
+from kabelwerk.config import get_api_url
+from kabelwerk.utils import parse_datetime
+
+from .server import MESSAGE, ROOM, USER, StubServer
+
+
+BENCHMARKS = []
+
+
+def benchmark(name, iterations):
+    """
+    Register a benchmark timing each call of the decorated function.
+    """
+    def decorator(function):
+        BENCHMARKS.append((name, 'latency', iterations, function))
+        return function
+
+    return decorator
+
+
+def throughput(name, operations):
+    """
+    Register a benchmark timing a single call of the decorated function, which
+    makes the given number of operations.
+    """
+    def decorator(function):
+        BENCHMARKS.append((name, 'throughput', operations, function))
+        return function
+
+    return decorator
+
+
+"""
+per-call overhead
+"""
+
+
+@benchmark('config.get_api_url', 100_000)
+def bench_get_api_url():
+    get_api_url()
+
+
+@benchmark('client.get_client', 100_000)
+def bench_get_client():
+    get_client()
+
+
+@benchmark('base.get_headers', 100_000)
+def bench_get_headers():
+    get_headers()
+
+
+@benchmark('codec.encode', 100_000)
+def bench_encode():
+    encode({'attributes': ROOM['attributes'], 'hub_user': 'batou'})
+
+
+MESSAGE_BYTES = json.dumps(MESSAGE).encode()
+
+
+@benchmark('codec.decode', 100_000)
+def bench_decode():
+    decode(MESSAGE_BYTES)
+
+
+@benchmark('log.request_log', 100_000)
+def bench_request_log():
+    log = RequestLog('PATCH', 'http://localhost/api/users/x', '/users/x',
+                     {'name': 'Motoko'})
+    log.start()
+    log.response(20, 200, 'OK', USER)
+
+
+@benchmark('http.raw_session', 2_000)
+def bench_raw_session():
+    get_session().patch(get_api_url() + '/users/kusanagi', data=b'{}',
+                        headers=get_headers()).content
+
+
+@benchmark('http.make_api_call', 2_000)
+def bench_make_api_call():
+    make_api_call('PATCH', '/users/kusanagi', {'name': 'Motoko'})
+
+
+@benchmark('http.make_api_call[urllib3]', 2_000)
+def bench_make_api_call_urllib3():
+    make_api_call('PATCH', '/users/kusanagi', {'name': 'Motoko'},
+                  client=get_urllib3_client())
+
+
+@lru_cache(maxsize=None)
+def get_urllib3_client():
+    """
+    Return the client of the urllib3 benchmark, created on first use — i.e.
+    once the stub server is running — and then reused by all the calls.
+    """
+    return Client(transport='urllib3')
+
+
+@benchmark('api.update_user', 2_000)
+def bench_update_user():
+    update_user(key='kusanagi', name='Motoko')
+
+
+"""
+decoding
+"""
+
+
+# distinct users — more than decode_user keeps interned, so that cycling
+# through them times building the users rather than hitting the cache
+USERS_TO_DECODE = cycle([
+    {**USER, 'id': USER['id'] + index, 'key': f'user-{index}'}
+    for index in range(USER_CACHE_SIZE * 2)
+])
+
+
+@benchmark('decoders.decode_user', 100_000)
+def bench_decode_user():
+    decode_user(next(USERS_TO_DECODE))
+
+
+@benchmark('decoders.decode_room', 100_000)
+def bench_decode_room():
+    decode_room(ROOM)
+
+
+# distinct messages, with distinct users and timestamps — see above
+MESSAGES_TO_DECODE = cycle([
+    {
+        **MESSAGE,
+        'id': MESSAGE['id'] + index,
+        'inserted_at': f'2023-07-22T09:{index // 60 % 60:02}:{index % 60:02}Z',
+        'updated_at': f'2023-07-22T10:{index // 60 % 60:02}:{index % 60:02}Z',
+        'user': {**MESSAGE['user'], 'id': MESSAGE['user']['id'] + index,
+                 'key': f'user-{index}'},
+    }
+    for index in range(USER_CACHE_SIZE * 2)
+])
+
+
+@benchmark('decoders.decode_message', 100_000)
+def bench_decode_message():
+    decode_message(next(MESSAGES_TO_DECODE))
+
+
+@benchmark('utils.parse_datetime', 100_000)
+def bench_parse_datetime():
+    parse_datetime('2023-07-22T09:46:57Z')
+
+
+"""
+throughput
+"""
+
+
+USERS = [{'key': f'user-{index}', 'name': 'Motoko'} for index in range(1000)]
+
+
+@throughput('throughput.threads', len(USERS))
+def bench_threads():
+    update_users(USERS, concurrency=config.KABELWERK_POOL_SIZE)
+
+
+@throughput('throughput.async', len(USERS))
+def bench_async():
+    # the aio package imports httpx lazily, on the first function accessed
+    try:
+        import httpx  # noqa: F401
+
+        from kabelwerk import aio
+    except ImportError:
+        return False
+
+    async def main():
+        await aio.update_users(USERS, concurrency=config.KABELWERK_POOL_SIZE)
+        await aio.base.close_client()
+
+    asyncio.run(main())
+
+
+"""
+running
+"""
+
+
+def run(name, kind, count, function):
+    """
+    Run a benchmark and return its results as a dict — or None if it cannot
+    run in this environment.
+    """
+    if kind == 'throughput':
+        function()  # warm up
+
+        started_at = time.perf_counter()
+        if function() is False:
+            return None
+        elapsed = time.perf_counter() - started_at
+
+        return {
+            'kind': kind,
+            'operations': count,
+            'seconds': elapsed,
+            'ops_per_sec': count / elapsed,
+        }
+
+    for _ in range(min(count // 10, 1000)):
+        function()  # warm up
+
+    timings = []
+    clock = time.perf_counter_ns
+
+    for _ in range(count):
+        started_at = clock()
+        function()
+        timings.append(clock() - started_at)
+
+    timings.sort()
+
+    return {
+        'kind': kind,
+        'iterations': count,
+        'mean_us': statistics.fmean(timings) / 1000,
+        'median_us': timings[len(timings) // 2] / 1000,
+        'p95_us': timings[int(len(timings) * 0.95)] / 1000,
+        'ops_per_sec': 1e9 / statistics.fmean(timings),
+    }
+
+
+def compare(name, result, baseline):
+    """
+    Return the change of the result relative to the baseline as a string,
+    e.g. '+12.5%', where positive means faster.
+    """
+    previous = baseline.get('results', {}).get(name)
+
+    if previous is None:
+        return ''
+
+    change = result['ops_per_sec'] / previous['ops_per_sec'] - 1
+
+    return f'{change:+.1%}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('--output', help='write the results to a JSON file')
+    parser.add_argument('--compare', help='compare with a JSON results file')
+    parser.add_argument('--filter', default='',
+                        help='only run the benchmarks containing this text')
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+    results = {}
+
+    with StubServer() as server:
+        config.KABELWERK_URL = server.url
+        config.KABELWERK_API_TOKEN = 'benchmark'
+        config.KABELWERK_MAX_ATTEMPTS = 1
+
+        for name, kind, count, function in BENCHMARKS:
+            if args.filter not in name:
+                continue
+
+            result = run(name, kind, count, function)
+            if result is None:
+                print(f'{name:40} skipped')
+                continue
+
+            results[name] = result
+
+            if kind == 'latency':
+                summary = (f'{result["median_us"]:10.2f} µs median '
+                           f'{result["p95_us"]:10.2f} µs p95')
+            else:
+                summary = f'{result["ops_per_sec"]:10.0f} ops/s'
+
+            print(f'{name:40} {summary} {compare(name, result, baseline)}')
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({
+                'sdk_version': __version__,
+                'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'platform': platform.platform(),
+                'date': datetime.now(timezone.utc).isoformat(),
+                'results': results,
+            }, file, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
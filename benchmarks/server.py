@@ -0,0 +1,107 @@
+"""
+A stub of the Kabelwerk API for the benchmarks, serving canned responses over
+keep-alive HTTP/1.1 connections on localhost.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import re
+import threading
+
+
+USER = {
+    'id': 49447,
+    'key': 'kusanagi',
+    'name': 'Motoko',
+}
+
+ROOM = {
+    'archived': False,
+    'attributes': {'tags': ['vip'], 'priority': 2},
+    'hub_user': {'id': 49448, 'key': 'batou', 'name': 'Batou'},
+    'id': 22833,
+    'user': USER,
+}
+
+MESSAGE = {
+    'html': '<p>And where does the newborn go from here?</p>',
+    'id': 16947,
+    'inserted_at': '2023-07-22T09:46:57Z',
+    'room_id': 22833,
+    'text': 'And where does the newborn go from here?',
+    'type': 'text',
+    'updated_at': '2023-07-22T09:46:57Z',
+    'upload': None,
+    'user': {'id': 49448, 'key': 'batou', 'name': 'Batou'},
+}
+
+# (method, path regex) → (status, response body)
+ROUTES = [
+    ('POST', re.compile(r'^/api/users$'), 201, USER),
+    ('PATCH', re.compile(r'^/api/users/[^/]+$'), 200, USER),
+    ('DELETE', re.compile(r'^/api/users/[^/]+$'), 204, None),
+    ('PATCH', re.compile(r'^/api/hubs/[^/]+/rooms/[^/]+$'), 200, ROOM),
+    ('POST', re.compile(r'^/api/hubs/[^/]+/rooms/[^/]+/messages$'), 201,
+     MESSAGE),
+]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    # send the headers and the body of each response in one go, as otherwise
+    # the body waits for the client's delayed ACK
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.respond()
+
+    def do_PATCH(self):
+        self.respond()
+
+    def do_DELETE(self):
+        self.respond()
+
+    def respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+
+        for method, path, status, payload in ROUTES:
+            if method == self.command and path.match(self.path):
+                break
+        else:
+            status, payload = 404, {'errors': {'detail': 'Not Found'}}
+
+        body = json.dumps(payload).encode() if payload is not None else b''
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """
+    Runs the stub in a background thread; use as a context manager.
+    """
+
+    def __init__(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
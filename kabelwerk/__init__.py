@@ -1,4 +1,30 @@
-from .exceptions import *
+__version__ = '0.1.2'
 
 
-__version__ = '0.1.2'
+# the exceptions, which are imported from kabelwerk.exceptions on first access
+# so that importing the package itself costs next to nothing
+__all__ = [
+    'AuthenticationError',
+    'ChannelError',
+    'CircuitOpenError',
+    'ConnectionError',
+    'DeadlineExceededError',
+    'DoesNotExist',
+    'KabelwerkException',
+    'QueueFullError',
+    'ServerError',
+    'ValidationError',
+]
+
+
+def __getattr__(name):
+    if name not in __all__:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    from . import exceptions
+
+    return getattr(exceptions, name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
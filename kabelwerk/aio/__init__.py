@@ -0,0 +1,46 @@
+"""
+The asyncio flavour of the Kabelwerk API.
+
+The functions in this package mirror those in kabelwerk.api, taking the same
+arguments, returning the same results, and raising the same exceptions — but
+they are coroutine functions which do not block the event loop. Like those in
+kabelwerk.api, they are imported on first access.
+
+This package assumes that you have httpx installed, which you can get with:
+pip install kabelwerk[async]
+"""
+
+import importlib
+
+
+# the public functions of the package and the modules defining them
+_LAZY = {
+    'broadcast_message': 'rooms',
+    'create_user': 'users',
+    'create_users': 'users',
+    'delete_user': 'users',
+    'delete_users': 'users',
+    'post_message': 'rooms',
+    'update_room': 'rooms',
+    'update_room_later': 'coalesce',
+    'update_user': 'users',
+    'update_users': 'users',
+}
+
+__all__ = sorted(_LAZY)
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(importlib.import_module(f'.{_LAZY[name]}', __name__), name)
+
+    # cache the function, so that __getattr__ is not called for it again
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,187 @@
+import asyncio
+from contextlib import nullcontext
+import os
+import weakref
+
+import httpx
+
+from kabelwerk import config
+from kabelwerk.api.base import handle_response
+from kabelwerk.api.breaker import get_circuit_breaker
+from kabelwerk.api.client import get_client as get_kabelwerk_client
+from kabelwerk.api.codec import encode
+from kabelwerk.api.log import RequestLog
+from kabelwerk.api.metrics import record_attempt
+from kabelwerk.api.ratelimit import get_rate_limit_delay
+from kabelwerk.api.retry import get_retry_delay
+from kabelwerk.api.timeouts import (
+    get_remaining_time, get_timeout, is_expired,
+)
+from kabelwerk.exceptions import (
+    CircuitOpenError, ConnectionError, DeadlineExceededError, ServerError,
+)
+
+
+# the httpx clients, one per event loop — see get_client
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    """
+    Return the httpx client used for talking to the Kabelwerk API from the
+    running event loop.
+
+    Each event loop gets its own client, created on first use, because the
+    connections in the client's pool are bound to the loop that opened them.
+    Must be called from within a coroutine.
+    """
+    loop = asyncio.get_running_loop()
+
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = _create_client()
+
+    return client
+
+
+async def close_client():
+    """
+    Close the running event loop's httpx client and its pooled connections.
+
+    A new client will be created by the next API call from the loop.
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+
+    if client is not None:
+        await client.aclose()
+
+
+def _create_client():
+    """
+    Create an httpx client configured according to KABELWERK_POOL_SIZE and
+    KABELWERK_KEEP_ALIVE.
+
+    Helper for get_client.
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=config.KABELWERK_POOL_SIZE,
+            max_keepalive_connections=(
+                config.KABELWERK_POOL_SIZE if config.KABELWERK_KEEP_ALIVE
+                else 0
+            ),
+        ),
+    )
+
+
+def _reset_clients_after_fork():
+    """
+    Drop the parent process's clients in a newly forked child.
+    """
+    global _clients
+
+    _clients = weakref.WeakKeyDictionary()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_clients_after_fork)
+
+
+async def make_api_call(method, url_path, params=None, timeout=None,
+                        idempotency_key=None, client=None):
+    """
+    Send a request to the Kabelwerk API without blocking the event loop.
+
+    The async counterpart of kabelwerk.api.base.make_api_call — it takes the
+    same arguments, retries failed requests in the same way, writes the same
+    log entries, and returns or raises the same as the latter.
+
+    The URL, API token, and timeouts are taken from the given Client — or the
+    default client — but the requests are sent through the event loop's httpx
+    client rather than the client's transport.
+    """
+    if client is None:
+        client = get_kabelwerk_client()
+
+    url = client.api_url + url_path
+
+    log = RequestLog(method, url, url_path, params, client.api_token)
+
+    headers = client.get_headers(idempotency_key)
+
+    if timeout is None:
+        timeout = client.get_timeout(method, url_path)
+
+    data = encode(params) if params is not None else None
+
+    attempt = 1
+
+    while True:
+        try:
+            breaker = get_circuit_breaker(client.api_url)
+
+            with record_attempt(log), breaker or nullcontext():
+                delay = get_rate_limit_delay(method, url_path)
+                attempt_timeout = get_timeout(
+                    method, url_path, timeout, delay,
+                )
+                if delay:
+                    await asyncio.sleep(delay)
+
+                return await _send_request(
+                    method, url, headers, data, attempt_timeout, log,
+                )
+
+        except CircuitOpenError:
+            log.rejected()
+
+            raise
+
+        except DeadlineExceededError as error:
+            if error.cause is None:
+                log.expired()
+
+            raise
+
+        except (ConnectionError, ServerError) as error:
+            delay = get_retry_delay(method, attempt, error, idempotency_key)
+
+            if delay is None:
+                raise
+
+            remaining = get_remaining_time()
+            if remaining is not None and delay >= remaining:
+                raise
+
+        log.retry(delay)
+
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def _send_request(method, url, headers, data, timeout, log):
+    """
+    Make a single attempt at an API call.
+
+    Helper for make_api_call.
+    """
+    log.start()
+
+    try:
+        response = await get_client().request(
+            method,
+            url,
+            headers=headers,
+            content=data,
+            timeout=httpx.Timeout(timeout[1], connect=timeout[0]),
+        )
+
+    except httpx.RequestError as error:
+        log.error(error)
+
+        if isinstance(error, httpx.TimeoutException) and is_expired():
+            raise DeadlineExceededError(error)
+
+        raise ConnectionError(error)
+
+    return handle_response(log, response, response.reason_phrase)
@@ -0,0 +1,163 @@
+import asyncio
+import weakref
+
+from kabelwerk import config
+from kabelwerk.aio.rooms import update_room
+from kabelwerk.api.rooms import ROOM_FIELDS
+
+
+class RoomUpdateBuffer:
+    """
+    Buffers the changes to each room for a number of seconds and then applies
+    them with a single update_room call.
+
+    The async counterpart of kabelwerk.api.coalesce.RoomUpdateBuffer — the
+    buffered changes are sent by tasks in the event loop instead of by a
+    background thread. Each event loop has its own buffer.
+    """
+
+    def __init__(self, window=0.05):
+        self.window = window
+
+        # (hub, room, timeout, client) → (the call_later handle sending the
+        # changes, [(params, future)])
+        self._pending = {}
+
+        # keeps references to the tasks applying the changes
+        self._tasks = set()
+
+    def submit(self, hub, room, params, *, timeout=None, client=None):
+        """
+        Buffer the changes to the room and return an asyncio Future which
+        resolves to the updated Room — or to the exception raised by
+        update_room.
+
+        The timeout and the client are passed on to update_room; only the
+        changes made with the same ones are merged.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (hub, room, timeout, client)
+
+        if key not in self._pending:
+            handle = loop.call_later(self.window, self._spawn, key)
+            self._pending[key] = (handle, [])
+
+        self._pending[key][1].append((params, future))
+
+        return future
+
+    async def flush(self):
+        """
+        Send all the buffered changes right away and wait for them — as well
+        as for the changes already being sent — to be applied.
+        """
+        pending, self._pending = self._pending, {}
+
+        for handle, _ in pending.values():
+            handle.cancel()
+
+        await asyncio.gather(*self._tasks, *(
+            self._apply(*key, updates)
+            for key, (_, updates) in pending.items()
+        ))
+
+    def _spawn(self, key):
+        _, updates = self._pending.pop(key)
+
+        task = asyncio.create_task(self._apply(*key, updates))
+
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _apply(self, hub, room, timeout, client, updates):
+        """
+        Merge the changes and make the update_room call, resolving the futures
+        of the callers which have not cancelled theirs.
+
+        The futures are resolved even if the call is interrupted — to the
+        CancelledError if this coroutine is cancelled.
+        """
+        futures = []
+        params = {}
+
+        for update, future in updates:
+            if not future.cancelled():
+                futures.append(future)
+                params.update(update)
+
+        if not futures:
+            return
+
+        result, error = None, None
+
+        try:
+            result = await update_room(hub=hub, room=room, timeout=timeout,
+                                       client=client, **params)
+        except Exception as exception:
+            error = exception
+        except BaseException as exception:
+            error = exception
+            raise
+        finally:
+            for future in futures:
+                if future.done():
+                    continue
+
+                if isinstance(error, asyncio.CancelledError):
+                    future.cancel()
+                elif error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+
+# get_room_update_buffer
+_buffers = weakref.WeakKeyDictionary()
+
+
+def get_room_update_buffer():
+    """
+    Return the running event loop's buffer used by update_room_later.
+
+    The buffer is rebuilt whenever KABELWERK_COALESCE_WINDOW changes; the
+    changes in the old buffer are still sent when their window is over.
+    """
+    loop = asyncio.get_running_loop()
+
+    buffer = _buffers.get(loop)
+
+    if buffer is None or buffer.window != config.KABELWERK_COALESCE_WINDOW:
+        buffer = _buffers[loop] = RoomUpdateBuffer(
+            config.KABELWERK_COALESCE_WINDOW,
+        )
+
+    return buffer
+
+
+def update_room_later(*, hub='_', room, timeout=None, client=None,
+                      **kwargs):
+    """
+    Update a chat room in the background, merging the update with the other
+    updates of the same room made within KABELWERK_COALESCE_WINDOW seconds.
+
+    The async counterpart of kabelwerk.api.update_room_later — it has to be
+    called from a running event loop and returns an asyncio Future.
+
+
+    Examples
+    --------
+
+    >>> update_room_later(hub='section9', room='kusanagi', archived=False)
+    >>> await update_room_later(hub='section9', room='kusanagi',
+    ...                         hub_user='batou')
+    Room(id=42, archived=False, attributes={}, hub_user=User(key='batou'))
+
+    """
+    params = {
+        key: value for key, value in kwargs.items()
+        if key in ROOM_FIELDS
+    }
+
+    return get_room_update_buffer().submit(hub, room, params, timeout=timeout,
+                                           client=client)
@@ -0,0 +1,132 @@
+from kabelwerk import config
+from kabelwerk.aio.base import make_api_call
+from kabelwerk.aio.utils import run_concurrently
+from kabelwerk.api import rooms as api_rooms
+from kabelwerk.api.client import get_client
+from kabelwerk.api.decoders import decode_message, decode_room
+from kabelwerk.cache import cache_room, get_cached_room
+from kabelwerk.exceptions import KabelwerkException
+
+
+async def update_room(*, hub='_', room, timeout=None, client=None,
+                      **kwargs):
+    """
+    Update a chat room.
+
+    The async counterpart of kabelwerk.api.update_room — it takes the same
+    arguments and returns or raises the same as the latter.
+
+
+    Examples
+    --------
+
+    >>> await update_room(hub='section9', room='kusanagi', archived=True)
+    Room(id=42, archived=True, attributes={}, hub_user=None)
+
+    """
+    params = {
+        key: value for key, value in kwargs.items()
+        if key in api_rooms.ROOM_FIELDS
+    }
+
+    if client is None:
+        client = get_client()
+
+    cached = get_cached_room(hub, room, params, client.api_url)
+    if cached is not None:
+        return cached
+
+    data = await make_api_call('PATCH', f'/hubs/{hub}/rooms/{room}',
+                               params, timeout=timeout, client=client)
+
+    updated = decode_room(data)
+    cache_room(hub, room, updated, client.api_url)
+
+    return updated
+
+
+"""
+messages
+"""
+
+
+async def post_message(*, hub='_', room, user, text, idempotency_key=None,
+                       timeout=None, client=None):
+    """
+    Post a message in a chat room.
+
+    The async counterpart of kabelwerk.api.post_message — it takes the same
+    arguments and returns or raises the same as the latter.
+
+
+    Examples
+    --------
+
+    >>> await post_message(hub='section9', room='kusanagi', user='batou',
+    ...                    text='?')
+    Message(id=42, key='kusanagi', name='Motoko')
+
+    """
+    data = await make_api_call('POST', f'/hubs/{hub}/rooms/{room}/messages', {
+        'text': text,
+        'user': user,
+    }, timeout=timeout, idempotency_key=idempotency_key, client=client)
+
+    return decode_message(data)
+
+
+def broadcast_message(*, hub='_', rooms, user, text, concurrency=None,
+                      client=None):
+    """
+    Post the same message in many chat rooms.
+
+    The async counterpart of kabelwerk.api.broadcast_message — the API calls
+    run as concurrent tasks in the event loop and the returned Broadcast is an
+    async iterable. Unlike the other functions in this package, this is not a
+    coroutine function: the messages are posted while you iterate over the
+    Broadcast or await its wait method.
+
+
+    Examples
+    --------
+
+    >>> broadcast = broadcast_message(rooms=['kusanagi', 'aramaki'],
+    ...                               user='batou', text='!')
+    >>> async for room, message in broadcast:
+    ...     print(room, message.id)
+    kusanagi 42
+    >>> broadcast.failures
+    {DoesNotExist: ['aramaki']}
+
+    """
+    return Broadcast(run_concurrently(
+        lambda room: post_message(hub=hub, room=room, user=user, text=text,
+                                  client=client),
+        rooms,
+        concurrency or config.KABELWERK_POOL_SIZE,
+    ))
+
+
+class Broadcast(api_rooms.Broadcast):
+    """
+    The progress of an async broadcast_message call.
+    """
+
+    def __iter__(self):
+        raise TypeError('Use async for to iterate over an async Broadcast.')
+
+    async def __aiter__(self):
+        async for room, result in self._results:
+            if isinstance(result, KabelwerkException):
+                self.errors[room] = result
+            else:
+                yield room, result
+
+    async def wait(self):
+        """
+        Post the remaining messages and return the failures.
+        """
+        async for _ in self:
+            pass
+
+        return self.failures
@@ -0,0 +1,160 @@
+from kabelwerk import config
+from kabelwerk.aio.base import make_api_call
+from kabelwerk.aio.utils import run_concurrently
+from kabelwerk.api.client import get_client
+from kabelwerk.api.decoders import decode_user
+from kabelwerk.cache import cache_user, get_cached_user, uncache_user
+from kabelwerk.utils import check_arguments
+
+
+async def create_user(*, key, name, hub=None, idempotency_key=None,
+                      timeout=None, client=None):
+    """
+    Create a user with the given key and name.
+
+    The async counterpart of kabelwerk.api.create_user — it takes the same
+    arguments and returns or raises the same as the latter.
+
+
+    Examples
+    --------
+
+    >>> await create_user(key='kusanagi', name='Motoko')
+    User(id=42, key='kusanagi', name='Motoko')
+
+    """
+    if client is None:
+        client = get_client()
+
+    data = await make_api_call('POST', '/users', {
+        'hub': hub,
+        'key': key,
+        'name': name,
+    }, timeout=timeout, idempotency_key=idempotency_key, client=client)
+
+    user = decode_user(data)
+    cache_user(user, client.api_url)
+
+    return user
+
+
+async def update_user(*, key, name, timeout=None, client=None):
+    """
+    Update the user with the given key.
+
+    The async counterpart of kabelwerk.api.update_user — it takes the same
+    arguments and returns or raises the same as the latter.
+
+
+    Examples
+    --------
+
+    >>> await update_user(key='kusanagi', name='Motoko')
+    User(id=42, key='kusanagi', name='Motoko')
+
+    """
+    if client is None:
+        client = get_client()
+
+    user = get_cached_user(key, name, client.api_url)
+    if user is not None:
+        return user
+
+    data = await make_api_call('PATCH', f'/users/{key}', {
+        'name': name,
+    }, timeout=timeout, client=client)
+
+    user = decode_user(data)
+    cache_user(user, client.api_url)
+
+    return user
+
+
+async def delete_user(*, key, timeout=None, client=None):
+    """
+    Delete the user with the given key.
+
+    The async counterpart of kabelwerk.api.delete_user — it takes the same
+    arguments and returns or raises the same as the latter.
+
+
+    Examples
+    --------
+
+    >>> await delete_user(key='kusanagi')
+    None
+
+    """
+    if client is None:
+        client = get_client()
+
+    uncache_user(key, client.api_url)
+
+    await make_api_call('DELETE', f'/users/{key}', timeout=timeout,
+                        client=client)
+
+
+"""
+bulk operations
+"""
+
+
+async def create_users(users, *, concurrency=None, client=None):
+    """
+    Create many users at once.
+
+    The async counterpart of kabelwerk.api.create_users — the API calls run
+    as concurrent tasks in the event loop instead of in a pool of threads.
+    """
+    return await _run_in_bulk(create_user, users, concurrency, client)
+
+
+async def update_users(users, *, concurrency=None, client=None):
+    """
+    Update many users at once.
+
+    The async counterpart of kabelwerk.api.update_users — the API calls run
+    as concurrent tasks in the event loop instead of in a pool of threads.
+    """
+    return await _run_in_bulk(update_user, users, concurrency, client)
+
+
+async def delete_users(keys, *, concurrency=None, client=None):
+    """
+    Delete many users at once.
+
+    The async counterpart of kabelwerk.api.delete_users — the API calls run
+    as concurrent tasks in the event loop instead of in a pool of threads.
+    """
+    return await _run_in_bulk(
+        delete_user, ({'key': key} for key in keys), concurrency, client,
+    )
+
+
+async def _run_in_bulk(function, rows, concurrency, client):
+    """
+    Await the coroutine function with each of the rows — dicts of its
+    arguments — concurrently and return the list of results in the order of
+    the rows.
+
+    Helper for the bulk operations above.
+    """
+    async def call(pair):
+        row = pair[1]
+
+        error = check_arguments(function, row, client=client)
+        if error is not None:
+            return error
+
+        return await function(**row, client=client)
+
+    results = {}
+
+    async for (index, _), result in run_concurrently(
+        call,
+        enumerate(rows),
+        concurrency or config.KABELWERK_POOL_SIZE,
+    ):
+        results[index] = result
+
+    return [results[index] for index in range(len(results))]
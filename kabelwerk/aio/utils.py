@@ -0,0 +1,42 @@
+import asyncio
+from itertools import islice
+
+from kabelwerk.exceptions import KabelwerkException
+
+
+async def run_concurrently(function, items, concurrency):
+    """
+    Await the coroutine function with each of the items and yield (item,
+    result) pairs in the order in which the calls complete.
+
+    The async counterpart of kabelwerk.utils.run_concurrently: the calls run
+    as tasks in the running event loop instead of in a pool of threads.
+    """
+    items = iter(items)
+
+    async def call(item):
+        try:
+            return item, await function(item)
+        except KabelwerkException as error:
+            return item, error
+
+    pending = set()
+
+    try:
+        while True:
+            for item in islice(items, concurrency - len(pending)):
+                pending.add(asyncio.ensure_future(call(item)))
+
+            if not pending:
+                return
+
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED,
+            )
+
+            for task in done:
+                yield task.result()
+
+    finally:
+        for task in pending:
+            task.cancel()
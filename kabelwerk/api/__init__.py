@@ -1,2 +1,46 @@
-from .rooms import post_message, update_room
-from .users import create_user, delete_user, update_user
+"""
+The Kabelwerk API.
+
+The functions are imported from their modules on first access, so that
+importing this package stays cheap — see kabelwerk.api.base.
+"""
+
+import importlib
+
+
+# the public functions and classes of the package and the modules defining them
+_LAZY = {
+    'Client': 'client',
+    'broadcast_message': 'rooms',
+    'create_user': 'users',
+    'create_users': 'users',
+    'deadline': 'timeouts',
+    'delete_user': 'users',
+    'delete_users': 'users',
+    'dispatch': 'dispatcher',
+    'iter_messages': 'rooms',
+    'iter_rooms': 'rooms',
+    'post_message': 'rooms',
+    'update_room': 'rooms',
+    'update_room_later': 'coalesce',
+    'update_user': 'users',
+    'update_users': 'users',
+}
+
+__all__ = sorted(_LAZY)
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(importlib.import_module(f'.{_LAZY[name]}', __name__), name)
+
+    # cache the function, so that __getattr__ is not called for it again
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
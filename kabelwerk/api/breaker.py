@@ -0,0 +1,212 @@
+import threading
+import time
+
+from kabelwerk import config
+from kabelwerk.exceptions import (
+    CircuitOpenError, ConnectionError, DeadlineExceededError,
+    KabelwerkException, ServerError,
+)
+
+
+class CircuitBreaker:
+    """
+    A thread-safe circuit breaker guarding the API calls.
+
+    The breaker starts closed, letting all calls through. After `threshold`
+    consecutive failures — connection errors or 5xx responses — within
+    `window` seconds it opens, and every call fails fast with a
+    CircuitOpenError without sending a request. After `recovery_time` seconds
+    it becomes half-open and lets a single probe call through: if the probe
+    succeeds, the breaker closes again; if it fails, the breaker re-opens.
+
+    Use it as a context manager around each attempt at an API call.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, threshold=5, window=60, recovery_time=10,
+                 clock=time.monotonic):
+        self.threshold = threshold
+        self.window = window
+        self.recovery_time = recovery_time
+
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._probing = False
+
+        self._failures = 0
+        self._first_failure_at = None
+        self._last_error = None
+
+        self.counters = {
+            'successes': 0,
+            'failures': 0,
+            'rejections': 0,
+            'openings': 0,
+        }
+        """The number of successful, failed, and rejected calls, and the
+        number of times the breaker has opened."""
+
+    @property
+    def state(self):
+        """The breaker's state: 'closed', 'open', or 'half-open'."""
+        with self._lock:
+            if self._state == self.OPEN and self._is_recovered():
+                return self.HALF_OPEN
+
+            return self._state
+
+    @property
+    def consecutive_failures(self):
+        """The number of consecutive failures counting towards the
+        threshold."""
+        return self._failures
+
+    def __enter__(self):
+        with self._lock:
+            if self._state == self.OPEN and self._is_recovered():
+                self._state = self.HALF_OPEN
+
+            if self._state == self.OPEN or (
+                self._state == self.HALF_OPEN and self._probing
+            ):
+                self.counters['rejections'] += 1
+
+                raise CircuitOpenError(self._last_error)
+
+            if self._state == self.HALF_OPEN:
+                self._probing = True
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if isinstance(exc_value, DeadlineExceededError):
+            # the deadline is a limit of the caller, so hitting it says nothing
+            # about the health of the backend
+            with self._lock:
+                self._probing = False
+
+            return
+
+        status_code = None
+        if isinstance(exc_value, ServerError):
+            status_code = exc_value.response.status_code
+            failed = status_code >= 500
+        else:
+            failed = isinstance(exc_value, ConnectionError)
+
+        succeeded = status_code != 429 and (
+            exc_value is None or isinstance(exc_value, KabelwerkException)
+        )
+
+        with self._lock:
+            if failed:
+                self._record_failure(exc_value)
+            elif succeeded:
+                self._record_success()
+            else:
+                # the call was interrupted before getting a response — e.g. it
+                # was cancelled — or the backend is shedding load with a 429,
+                # neither of which says it is healthy, so just free the probe
+                # slot
+                self._probing = False
+
+    def reset(self):
+        """
+        Close the breaker and clear its failure count.
+        """
+        with self._lock:
+            self._close()
+
+    def _is_recovered(self):
+        return self._clock() - self._opened_at >= self.recovery_time
+
+    def _record_success(self):
+        self.counters['successes'] += 1
+        self._close()
+
+    def _record_failure(self, error):
+        now = self._clock()
+
+        self.counters['failures'] += 1
+        self._last_error = error
+
+        if self._state == self.HALF_OPEN:
+            self._open(now)
+            return
+
+        if self._failures and now - self._first_failure_at > self.window:
+            self._failures = 0
+
+        if not self._failures:
+            self._first_failure_at = now
+
+        self._failures += 1
+
+        if self._failures >= self.threshold:
+            self._open(now)
+
+    def _open(self, now):
+        self.counters['openings'] += 1
+
+        self._state = self.OPEN
+        self._opened_at = now
+        self._probing = False
+
+    def _close(self):
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._probing = False
+        self._failures = 0
+        self._first_failure_at = None
+
+
+# the KABELWERK_BREAKER_* settings and the circuit breakers built from them,
+# one per backend API URL — see get_circuit_breaker
+_breakers = (None, {})
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(api_url=None):
+    """
+    Return the circuit breaker guarding the API calls to the Kabelwerk backend
+    with the given API URL — by default the one of KABELWERK_URL — or None if
+    the breakers are turned off, i.e. if KABELWERK_BREAKER_THRESHOLD is 0.
+
+    Each backend has its own breaker, so that an outage of one backend does
+    not fail the calls to the others. The breakers are shared by all threads
+    and event loops in the process, and are rebuilt whenever one of the
+    KABELWERK_BREAKER_* settings changes.
+    """
+    global _breakers
+
+    settings = (
+        config.KABELWERK_BREAKER_THRESHOLD,
+        config.KABELWERK_BREAKER_WINDOW,
+        config.KABELWERK_BREAKER_RECOVERY_TIME,
+    )
+
+    if not settings[0]:
+        return None
+
+    if api_url is None:
+        api_url = config.get_api_url()
+
+    breaker = _breakers[1].get(api_url)
+
+    if _breakers[0] != settings or breaker is None:
+        with _breakers_lock:
+            if _breakers[0] != settings:
+                _breakers = (settings, {})
+
+            breaker = _breakers[1].get(api_url)
+
+            if breaker is None:
+                breaker = _breakers[1][api_url] = CircuitBreaker(*settings)
+
+    return breaker
@@ -0,0 +1,330 @@
+"""
+The clients of the Kabelwerk API.
+
+A client bundles everything needed in order to talk to one Kabelwerk
+backend — its URL and API token, validated once, and its transport and
+timeouts — so that a process can talk to several backends without touching
+the module-level configuration:
+
+    acme = Client('acme.kabelwerk.io', 'acme-token')
+    acme.post_message(room='kusanagi', user='batou', text='Hello!')
+
+The API functions take an optional client argument, and without it use the
+default client, which is built from KABELWERK_URL, KABELWERK_API_TOKEN, and the
+other settings, and is rebuilt whenever these change.
+
+Each backend has its own circuit breaker. The rate limits, the retry policy,
+the log, the metrics, and the cache are shared by all the clients of the
+process.
+"""
+
+import threading
+
+from kabelwerk import __version__, config
+from kabelwerk.api.timeouts import TimeoutRules
+
+
+class Client:
+    """
+    A client of the Kabelwerk API.
+
+    The arguments which are not given are taken from the configuration at the
+    time the client is created.
+
+
+    Arguments
+    ---------
+
+    url
+        The URL of the Kabelwerk backend. Defaults to KABELWERK_URL.
+
+    api_token
+        The API token of the Kabelwerk backend. Defaults to
+        KABELWERK_API_TOKEN.
+
+    transport
+        The name of one of the built-in transports or a transport object —
+        see kabelwerk.api.base.PooledTransport. Defaults to
+        KABELWERK_TRANSPORT.
+        A client given a name creates its own transport, with its own pool of
+        connections.
+
+    pool_size
+        The maximum number of connections to keep open, if the client creates
+        its own transport. Defaults to KABELWERK_POOL_SIZE.
+
+    keep_alive
+        Whether to keep the connections open for reuse, if the client creates
+        its own transport. Defaults to KABELWERK_KEEP_ALIVE.
+
+    connect_timeout
+        Defaults to KABELWERK_CONNECT_TIMEOUT.
+
+    read_timeout
+        Defaults to KABELWERK_READ_TIMEOUT.
+
+    timeouts
+        The per-endpoint timeouts, in the format of KABELWERK_TIMEOUTS.
+        Defaults to the latter.
+
+
+    Raises
+    ------
+
+    ValueError
+        If the URL is not a valid Kabelwerk URL or if the API token is empty.
+
+
+    Examples
+    --------
+
+    >>> acme = Client('acme.kabelwerk.io', 'acme-token', read_timeout=5)
+    >>> acme.update_user(key='kusanagi', name='Motoko')
+    User(id=42, key='kusanagi', name='Motoko')
+
+    """
+
+    def __init__(self, url=None, api_token=None, *, transport=None,
+                 pool_size=None, keep_alive=None, connect_timeout=None,
+                 read_timeout=None, timeouts=None):
+        from kabelwerk.api.base import TRANSPORTS
+
+        self.url = config.KABELWERK_URL if url is None else url
+        self.api_url = config.get_api_url(self.url)
+        self.socket_url = config.get_socket_url(self.url)
+
+        self.api_token = (
+            config.KABELWERK_API_TOKEN if api_token is None else api_token
+        )
+        if not self.api_token:
+            raise ValueError((
+                'You need to set the API token of the client '
+                'in order to make requests to the Kabelwerk API.'
+            ))
+
+        if transport is None:
+            transport = config.KABELWERK_TRANSPORT
+
+        if isinstance(transport, str):
+            if transport not in TRANSPORTS:
+                raise ValueError(f'{transport} is not a Kabelwerk transport.')
+
+            self.transport = TRANSPORTS[transport](
+                pool_size=pool_size, keep_alive=keep_alive,
+            )
+            self._owns_transport = True
+        else:
+            self.transport = transport
+            self._owns_transport = False
+
+        self.connect_timeout = (
+            config.KABELWERK_CONNECT_TIMEOUT if connect_timeout is None
+            else connect_timeout
+        )
+        self.read_timeout = (
+            config.KABELWERK_READ_TIMEOUT if read_timeout is None
+            else read_timeout
+        )
+
+        self._timeout_rules = TimeoutRules(
+            config.KABELWERK_TIMEOUTS if timeouts is None else timeouts
+        )
+
+        # the headers which are the same for all requests — see get_headers
+        self._headers = {
+            'Accept': 'application/json',
+            'Content-Type': 'application/json',
+            'Kabelwerk-Token': self.api_token,
+            'User-Agent': f'sdk-python/{__version__}',
+        }
+
+    def __repr__(self):
+        return f'Client({self.url!r})'
+
+    def get_headers(self, idempotency_key=None):
+        """
+        Return the HTTP headers to send with a request to the Kabelwerk API.
+
+        The returned dict may be shared between requests and must not be
+        modified.
+        """
+        if idempotency_key:
+            return {**self._headers, 'Idempotency-Key': idempotency_key}
+
+        return self._headers
+
+    def get_timeout(self, method, url_path):
+        """
+        Return the timeout of an API call — either a number of seconds or a
+        (connect, read) tuple — according to the client's timeouts.
+        """
+        timeout = self._timeout_rules.get(method, url_path)
+
+        if timeout is None:
+            return (self.connect_timeout, self.read_timeout)
+
+        return timeout
+
+    def close(self):
+        """
+        Close the pooled connections of the client's transport — unless the
+        transport was given to the client, in which case it is up to you.
+        """
+        if self._owns_transport:
+            self.transport.close()
+
+    def create_user(self, **kwargs):
+        """See kabelwerk.api.users.create_user."""
+        from kabelwerk.api.users import create_user
+
+        return create_user(client=self, **kwargs)
+
+    def update_user(self, **kwargs):
+        """See kabelwerk.api.users.update_user."""
+        from kabelwerk.api.users import update_user
+
+        return update_user(client=self, **kwargs)
+
+    def delete_user(self, **kwargs):
+        """See kabelwerk.api.users.delete_user."""
+        from kabelwerk.api.users import delete_user
+
+        return delete_user(client=self, **kwargs)
+
+    def create_users(self, users, **kwargs):
+        """See kabelwerk.api.users.create_users."""
+        from kabelwerk.api.users import create_users
+
+        return create_users(users, client=self, **kwargs)
+
+    def update_users(self, users, **kwargs):
+        """See kabelwerk.api.users.update_users."""
+        from kabelwerk.api.users import update_users
+
+        return update_users(users, client=self, **kwargs)
+
+    def delete_users(self, keys, **kwargs):
+        """See kabelwerk.api.users.delete_users."""
+        from kabelwerk.api.users import delete_users
+
+        return delete_users(keys, client=self, **kwargs)
+
+    def update_room(self, **kwargs):
+        """See kabelwerk.api.rooms.update_room."""
+        from kabelwerk.api.rooms import update_room
+
+        return update_room(client=self, **kwargs)
+
+    def post_message(self, **kwargs):
+        """See kabelwerk.api.rooms.post_message."""
+        from kabelwerk.api.rooms import post_message
+
+        return post_message(client=self, **kwargs)
+
+    def iter_rooms(self, **kwargs):
+        """See kabelwerk.api.rooms.iter_rooms."""
+        from kabelwerk.api.rooms import iter_rooms
+
+        return iter_rooms(client=self, **kwargs)
+
+    def iter_messages(self, **kwargs):
+        """See kabelwerk.api.rooms.iter_messages."""
+        from kabelwerk.api.rooms import iter_messages
+
+        return iter_messages(client=self, **kwargs)
+
+    def broadcast_message(self, **kwargs):
+        """See kabelwerk.api.rooms.broadcast_message."""
+        from kabelwerk.api.rooms import broadcast_message
+
+        return broadcast_message(client=self, **kwargs)
+
+
+"""
+the default and the named clients
+"""
+
+
+# the default client and the settings it was built from — see get_client
+_default = (None, None)
+
+# the named clients and the KABELWERK_CLIENTS dict they were built from
+_named = (None, {})
+
+_lock = threading.Lock()
+
+
+def get_client(name=None):
+    """
+    Return the client with the given name from KABELWERK_CLIENTS, or the
+    default client if no name is given.
+
+    The clients are created on first use. The default client uses the shared
+    transport — see kabelwerk.api.base.get_transport — and is rebuilt when
+    the settings it was built from change; the named clients are rebuilt when
+    KABELWERK_CLIENTS is replaced.
+
+
+    Raises
+    ------
+
+    ValueError
+        If there is no client with the given name, or if the client's URL or
+        API token is invalid.
+
+    """
+    if name is not None:
+        return _get_named_client(name)
+
+    global _default
+
+    settings = (
+        config.KABELWERK_URL,
+        config.KABELWERK_API_TOKEN,
+        config.KABELWERK_TRANSPORT,
+        config.KABELWERK_CONNECT_TIMEOUT,
+        config.KABELWERK_READ_TIMEOUT,
+        config.KABELWERK_TIMEOUTS,
+    )
+
+    if _default[0] != settings:
+        from kabelwerk.api.base import get_transport
+
+        with _lock:
+            if _default[0] != settings:
+                _default = (settings, Client(transport=get_transport()))
+
+    return _default[1]
+
+
+def _get_named_client(name):
+    """
+    Return the client with the given name from KABELWERK_CLIENTS.
+
+    Helper for get_client.
+    """
+    global _named
+
+    clients = config.KABELWERK_CLIENTS
+
+    if _named[0] is clients:
+        client = _named[1].get(name)
+        if client is not None:
+            return client
+
+    if name not in clients:
+        raise ValueError(f'{name} is not in KABELWERK_CLIENTS.')
+
+    with _lock:
+        if _named[0] is not clients:
+            for client in _named[1].values():
+                client.close()
+
+            _named = (clients, {})
+
+        client = _named[1].get(name)
+
+        if client is None:
+            client = _named[1][name] = Client(**clients[name])
+
+    return client
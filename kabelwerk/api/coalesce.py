@@ -0,0 +1,268 @@
+"""
+Write-behind coalescing of room updates.
+
+Parts of an app often update the same room in quick succession — e.g. one sets
+its attributes, another assigns it to a hub user. Instead of sending a PATCH
+for each of these, update_room_later buffers the changes to each room for
+KABELWERK_COALESCE_WINDOW seconds and then sends a single PATCH with all of
+them merged, resolving the future of each caller with the resulting room.
+
+The changes are merged so that the room ends up in the same state as if they
+had been sent one after the other: for each field, the last value wins.
+"""
+
+from concurrent.futures import Future
+import atexit
+import os
+import threading
+import time
+
+from kabelwerk import config
+from kabelwerk.api.rooms import ROOM_FIELDS, update_room
+
+
+class RoomUpdateBuffer:
+    """
+    Buffers the changes to each room for a number of seconds and then applies
+    them with a single update_room call.
+
+    The buffered changes are sent by a background thread when their window is
+    over, or when flush is called. The update_room calls are made by worker
+    threads of the buffer's own — not by a concurrent.futures executor, which
+    refuses new work once the interpreter starts shutting down, i.e. before
+    the atexit flush.
+
+
+    Arguments
+    ---------
+
+    window
+        The number of seconds to buffer the changes to a room for, counted
+        from the first change.
+
+    max_workers
+        The maximum number of update_room calls to make at the same time.
+        Defaults to KABELWERK_POOL_SIZE.
+
+    """
+
+    def __init__(self, window=0.05, max_workers=None):
+        self.window = window
+        self.max_workers = max_workers or config.KABELWERK_POOL_SIZE
+
+        # (hub, room, timeout, client) → (deadline, [(params, future)])
+        self._pending = {}
+        self._condition = threading.Condition()
+
+        self._thread = None
+
+        # the number of update_room calls being made, and the semaphore
+        # limiting it to max_workers
+        self._in_flight = 0
+        self._workers = threading.BoundedSemaphore(self.max_workers)
+
+    def submit(self, hub, room, params, *, timeout=None, client=None):
+        """
+        Buffer the changes to the room and return a Future which resolves to
+        the updated Room — or to the exception raised by update_room.
+
+        The timeout and the client are passed on to update_room; only the
+        changes made with the same ones are merged.
+        """
+        future = Future()
+        key = (hub, room, timeout, client)
+
+        with self._condition:
+            if key not in self._pending:
+                deadline = time.monotonic() + self.window
+                self._pending[key] = (deadline, [])
+                self._condition.notify()
+
+            self._pending[key][1].append((params, future))
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='kabelwerk-coalesce', daemon=True,
+                )
+                self._thread.start()
+
+        return future
+
+    def flush(self):
+        """
+        Send all the buffered changes right away and wait for them — as well
+        as for the changes already being sent — to be applied.
+        """
+        with self._condition:
+            pending, self._pending = self._pending, {}
+            self._in_flight += len(pending)
+
+        for key, (_, updates) in pending.items():
+            self._work(key, updates)
+
+        with self._condition:
+            while self._in_flight:
+                self._condition.wait()
+
+    def _run(self):
+        """
+        Hand the changes of each room to the executor once their window is
+        over.
+
+        Runs in the background thread.
+        """
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+
+                # not necessarily the first one, if the window has shrunk
+                key = min(self._pending, key=lambda key: self._pending[key][0])
+                deadline, updates = self._pending[key]
+                timeout = deadline - time.monotonic()
+
+                if timeout > 0:
+                    self._condition.wait(timeout)
+                    continue
+
+                del self._pending[key]
+                self._in_flight += 1
+
+            self._workers.acquire()
+
+            try:
+                threading.Thread(
+                    target=self._work, args=(key, updates, True),
+                    name='kabelwerk-coalesce-worker', daemon=True,
+                ).start()
+            except RuntimeError:
+                # no new threads at interpreter shutdown
+                self._work(key, updates, True)
+
+    def _work(self, key, updates, release=False):
+        """
+        Apply the changes and count them as no longer in flight, releasing the
+        worker's slot if it has one.
+        """
+        try:
+            self._apply(*key, updates)
+        finally:
+            if release:
+                self._workers.release()
+
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def _apply(self, hub, room, timeout, client, updates):
+        """
+        Merge the changes and make the update_room call, resolving the futures
+        of the callers which have not cancelled theirs.
+        """
+        futures = []
+        params = {}
+
+        for update, future in updates:
+            if future.set_running_or_notify_cancel():
+                futures.append(future)
+                params.update(update)
+
+        if not futures:
+            return
+
+        try:
+            result = update_room(hub=hub, room=room, timeout=timeout,
+                                 client=client, **params)
+        except Exception as error:
+            for future in futures:
+                future.set_exception(error)
+        else:
+            for future in futures:
+                future.set_result(result)
+
+
+# get_room_update_buffer
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_room_update_buffer():
+    """
+    Return the buffer used by update_room_later.
+
+    The buffer is shared by all threads in the process. When
+    KABELWERK_COALESCE_WINDOW changes, the buffer is kept — along with its
+    background thread — and the new window applies to the changes buffered
+    from then on.
+    """
+    global _buffer
+
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = RoomUpdateBuffer(config.KABELWERK_COALESCE_WINDOW)
+
+    if _buffer.window != config.KABELWERK_COALESCE_WINDOW:
+        _buffer.window = config.KABELWERK_COALESCE_WINDOW
+
+    return _buffer
+
+
+def update_room_later(*, hub='_', room, timeout=None, client=None,
+                      **kwargs):
+    """
+    Update a chat room in the background, merging the update with the other
+    updates of the same room made within KABELWERK_COALESCE_WINDOW seconds.
+
+    Takes the same arguments as update_room and does not block. Only the
+    updates made with the same timeout and client are merged.
+
+
+    Returns
+    -------
+
+    concurrent.futures.Future
+        A future which resolves to the updated Room — or to the exception
+        raised by update_room.
+
+
+    Examples
+    --------
+
+    >>> update_room_later(hub='section9', room='kusanagi', archived=False)
+    >>> future = update_room_later(hub='section9', room='kusanagi',
+    ...                            hub_user='batou')
+    >>> future.result()
+    Room(id=42, archived=False, attributes={}, hub_user=User(key='batou'))
+
+    """
+    params = {
+        key: value for key, value in kwargs.items()
+        if key in ROOM_FIELDS
+    }
+
+    return get_room_update_buffer().submit(hub, room, params, timeout=timeout,
+                                           client=client)
+
+
+def _flush_at_exit():
+    if _buffer is not None:
+        _buffer.flush()
+
+
+def _reset_buffer_after_fork():
+    """
+    Drop the parent process's buffer in a newly forked child — its changes
+    are sent by the parent and its background thread does not exist in the
+    child.
+    """
+    global _buffer, _buffer_lock
+
+    _buffer = None
+    _buffer_lock = threading.Lock()
+
+
+atexit.register(_flush_at_exit)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_buffer_after_fork)
@@ -0,0 +1,52 @@
+"""
+The JSON codec used for the request and response bodies of the API calls.
+
+If orjson is installed, it is used instead of the standard library's json
+module — except for the values which orjson cannot encode but json can (e.g.
+integers beyond 64 bits). You can also plug in any other codec by setting
+KABELWERK_JSON_CODEC.
+"""
+
+import json
+
+from kabelwerk import config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def encode(value):
+    """
+    Encode the value as JSON and return the bytes.
+
+    Raise a TypeError if the value cannot be encoded.
+    """
+    if config.KABELWERK_JSON_CODEC:
+        data = config.KABELWERK_JSON_CODEC[0](value)
+        return data.encode('utf-8') if isinstance(data, str) else data
+
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # orjson.JSONEncodeError — let json have a go at it
+            pass
+
+    return json.dumps(value).encode('utf-8')
+
+
+def decode(data):
+    """
+    Decode the JSON bytes and return the value.
+
+    Raise a ValueError if the data is not valid JSON.
+    """
+    if config.KABELWERK_JSON_CODEC:
+        return config.KABELWERK_JSON_CODEC[1](data)
+
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
@@ -0,0 +1,53 @@
+from functools import lru_cache
+
+from kabelwerk.models import Message, Room, User
+from kabelwerk.utils import parse_datetime
+
+
+# the maximum number of distinct users to keep interned
+USER_CACHE_SIZE = 4096
+
+
+def decode_user(data):
+    """
+    Build a User from its decoded API representation.
+
+    Users are interned: decoding the same user record again returns the same
+    User object, as long as it is still among the USER_CACHE_SIZE most
+    recently decoded users. Users are immutable, so this is safe to share.
+    """
+    return _intern_user(data['id'], data['key'], data['name'])
+
+
+@lru_cache(maxsize=USER_CACHE_SIZE)
+def _intern_user(id, key, name):
+    return User(id=id, key=key, name=name)
+
+
+def decode_room(data):
+    """
+    Build a Room from its decoded API representation.
+    """
+    return Room(
+        archived=data['archived'],
+        attributes=data['attributes'],
+        hub_user=decode_user(data['hub_user']) if data['hub_user'] else None,
+        id=data['id'],
+        user=decode_user(data['user']),
+    )
+
+
+def decode_message(data):
+    """
+    Build a Message from its decoded API representation.
+    """
+    return Message(
+        html=data['html'],
+        id=data['id'],
+        inserted_at=parse_datetime(data['inserted_at']),
+        room_id=data['room_id'],
+        text=data['text'],
+        type=data['type'],
+        updated_at=parse_datetime(data['updated_at']),
+        user=decode_user(data['user']),
+    )
@@ -0,0 +1,354 @@
+"""
+A background dispatcher for API calls whose results the caller does not need
+to wait for — e.g. posting a notification message from a web request.
+
+The calls are put in a bounded queue and made by a pool of worker threads. The
+caller gets a Future right away, to which it can attach a callback or which it
+can ignore altogether. At interpreter shutdown, the queued calls are drained
+for up to KABELWERK_DISPATCH_DRAIN_TIMEOUT seconds.
+"""
+
+from collections import deque
+from concurrent.futures import Future
+import atexit
+import logging
+import os
+import threading
+import time
+
+from kabelwerk import config
+from kabelwerk.exceptions import QueueFullError
+
+
+logger = logging.getLogger('kabelwerk.api')
+
+
+# the backpressure policies, i.e. what to do when the queue is full
+BLOCK = 'block'
+DROP_OLDEST = 'drop-oldest'
+RAISE = 'raise'
+
+
+class Dispatcher:
+    """
+    Makes API calls in the background, using a bounded queue and a pool of
+    worker threads.
+
+
+    Arguments
+    ---------
+
+    workers
+        The number of worker threads.
+
+    max_size
+        The maximum number of calls waiting in the queue.
+
+    policy
+        What to do when a call is submitted while the queue is full: BLOCK
+        waits for a free slot (for up to block_timeout seconds, then raises
+        QueueFullError), DROP_OLDEST cancels the oldest queued call to make
+        room, and RAISE raises QueueFullError right away.
+
+    block_timeout
+        The maximum number of seconds for which the BLOCK policy waits. None
+        means waiting for as long as needed.
+
+
+    Examples
+    --------
+
+    >>> dispatcher = Dispatcher(workers=4, max_size=1000)
+    >>> future = dispatcher.submit(post_message, room='kusanagi', user='batou',
+    ...                            text='Hello!')
+    >>> future.add_done_callback(print)
+    >>> dispatcher.stop(timeout=5)
+    0
+
+    """
+
+    def __init__(self, workers=4, max_size=1000, policy=BLOCK,
+                 block_timeout=None):
+        if policy not in (BLOCK, DROP_OLDEST, RAISE):
+            raise ValueError(f'Unknown backpressure policy: {policy!r}.')
+
+        self.workers = workers
+        self.max_size = max_size
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self.counters = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'dropped': 0,
+        }
+        """The numbers of calls submitted, completed, failed, and dropped."""
+
+        self._queue = deque()
+        self._condition = threading.Condition()
+
+        self._threads = []
+        self._stopping = False
+
+        # the number of calls being made at the moment
+        self._active = 0
+
+    @property
+    def pending(self):
+        """The number of calls waiting in the queue."""
+        return len(self._queue)
+
+    def start(self):
+        """
+        Start the worker threads — if not started yet.
+
+        There is no need to call this explicitly, as the workers are started
+        on the first submit.
+        """
+        with self._condition:
+            self._start()
+
+    def submit(self, function, /, *args, **kwargs):
+        """
+        Queue a call of the function with the given arguments and return a
+        Future which resolves to its result — or to the exception it raises.
+
+
+        Raises
+        ------
+
+        QueueFullError
+            If the queue is full and the policy is RAISE — or BLOCK with a
+            block_timeout which has run out.
+
+        RuntimeError
+            If the dispatcher has been stopped.
+
+        """
+        future = Future()
+
+        with self._condition:
+            if self._stopping:
+                raise RuntimeError('The dispatcher has been stopped.')
+
+            self._start()
+
+            if len(self._queue) >= self.max_size:
+                self._make_room()
+
+            self._queue.append((future, function, args, kwargs))
+            self.counters['submitted'] += 1
+
+            self._condition.notify_all()
+
+        return future
+
+    def stop(self, timeout=None):
+        """
+        Stop accepting new calls, wait for up to timeout seconds (or for as
+        long as needed if None) for the queued and ongoing calls to be made,
+        and cancel the queued calls which are left.
+
+        Return the number of the cancelled calls.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+
+            while self._queue or self._active:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+
+                self._condition.wait(remaining)
+
+            dropped = self._drop(len(self._queue))
+
+        if dropped:
+            logger.warning('dispatcher stopped → %d calls dropped', dropped)
+
+        return dropped
+
+    def _start(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._work, daemon=True,
+                name=f'kabelwerk-dispatch-{len(self._threads)}',
+            )
+            thread.start()
+
+            self._threads.append(thread)
+
+    def _make_room(self):
+        """
+        Apply the backpressure policy when the queue is full.
+
+        Helper for submit, called with the condition held.
+        """
+        if self.policy == DROP_OLDEST:
+            self._drop(1)
+            return
+
+        if self.policy == BLOCK:
+            if self._condition.wait_for(
+                lambda: len(self._queue) < self.max_size or self._stopping,
+                self.block_timeout,
+            ):
+                if self._stopping:
+                    raise RuntimeError('The dispatcher has been stopped.')
+                return
+
+        raise QueueFullError(self.max_size)
+
+    def _drop(self, count):
+        """
+        Cancel the oldest queued calls and return the number of them.
+
+        Called with the condition held.
+        """
+        for _ in range(count):
+            future, *_ = self._queue.popleft()
+            future.cancel()
+
+        self.counters['dropped'] += count
+        self._condition.notify_all()
+
+        return count
+
+    def _work(self):
+        """
+        Make the queued calls until the dispatcher is stopped and the queue is
+        empty.
+
+        Runs in each worker thread.
+        """
+        while True:
+            with self._condition:
+                while not self._queue:
+                    if self._stopping:
+                        return
+                    self._condition.wait()
+
+                future, function, args, kwargs = self._queue.popleft()
+                self._active += 1
+                self._condition.notify_all()
+
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = function(*args, **kwargs)
+                except Exception as error:
+                    self._count('failed')
+                    future.set_exception(error)
+                else:
+                    self._count('completed')
+                    future.set_result(result)
+
+            with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+    def _count(self, outcome):
+        with self._condition:
+            self.counters[outcome] += 1
+
+
+# get_dispatcher
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """
+    Return the dispatcher used by the dispatch function, creating it from the
+    KABELWERK_DISPATCH_* settings on first use.
+    """
+    global _dispatcher
+
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = Dispatcher(
+                    workers=config.KABELWERK_DISPATCH_WORKERS,
+                    max_size=config.KABELWERK_DISPATCH_QUEUE_SIZE,
+                    policy=config.KABELWERK_DISPATCH_POLICY,
+                )
+
+    return _dispatcher
+
+
+def dispatch(function, /, *args, **kwargs):
+    """
+    Call the function with the given arguments in the background and return
+    a Future which resolves to its result — or to the exception it raises.
+
+    The function is usually one of the kabelwerk.api functions.
+
+
+    Raises
+    ------
+
+    QueueFullError
+        If the dispatcher's queue is full and KABELWERK_DISPATCH_POLICY is
+        'raise'.
+
+
+    Examples
+    --------
+
+    >>> dispatch(post_message, room='kusanagi', user='batou', text='Hello!')
+    <Future at 0x7f0c4c3e5d50 state=pending>
+
+    """
+    return get_dispatcher().submit(function, *args, **kwargs)
+
+
+def start_dispatcher():
+    """
+    Start the worker threads of the dispatcher used by the dispatch function.
+    """
+    get_dispatcher().start()
+
+
+def stop_dispatcher(timeout=None):
+    """
+    Stop the dispatcher used by the dispatch function, waiting for up to
+    timeout seconds (defaults to KABELWERK_DISPATCH_DRAIN_TIMEOUT) for the
+    queued calls to be made. Return the number of dropped calls.
+
+    The next call to dispatch creates a new dispatcher.
+    """
+    global _dispatcher
+
+    with _dispatcher_lock:
+        dispatcher, _dispatcher = _dispatcher, None
+
+    if dispatcher is None:
+        return 0
+
+    if timeout is None:
+        timeout = config.KABELWERK_DISPATCH_DRAIN_TIMEOUT
+
+    return dispatcher.stop(timeout)
+
+
+def _reset_dispatcher_after_fork():
+    """
+    Drop the parent process's dispatcher in a newly forked child — its worker
+    threads do not exist in the child and its queued calls are made by the
+    parent.
+    """
+    global _dispatcher, _dispatcher_lock
+
+    _dispatcher = None
+    _dispatcher_lock = threading.Lock()
+
+
+atexit.register(stop_dispatcher)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_dispatcher_after_fork)
@@ -0,0 +1,190 @@
+import logging
+import time
+
+from kabelwerk import config
+
+
+logger = logging.getLogger('kabelwerk.api')
+
+
+# the placeholder for redacted values
+REDACTED = '[redacted]'
+
+# marks the absence of a response payload to log
+_NO_PAYLOAD = object()
+
+
+class RequestLog:
+    """
+    Writes the log entries of an API call.
+
+    Nothing is formatted unless a log entry is actually emitted: the messages
+    are %-style and the request and payload parts are objects whose __str__
+    is only called by the logging handlers. Each entry also carries the
+    structured details of the call in its `kabelwerk` attribute — a dict with
+    the method, path, status (if such), and elapsed milliseconds.
+    """
+
+    __slots__ = (
+        'method', 'url', 'url_path', 'params', 'api_token', 'started_at',
+        'status',
+    )
+
+    def __init__(self, method, url, url_path, params=None, api_token=None):
+        self.method = method
+        self.url = url
+        self.url_path = url_path
+        self.params = params
+        self.api_token = api_token
+        self.started_at = time.monotonic()
+        self.status = None
+
+    def __str__(self):
+        if not config.KABELWERK_LOG_PAYLOADS:
+            return f'{self.method} {self.url_path}'
+
+        if self.params:
+            return f'{self.method} {self.url} {format_payload(self.params)}'
+
+        return f'{self.method} {self.url}'
+
+    @property
+    def elapsed(self):
+        """The number of milliseconds since the current attempt started."""
+        return (time.monotonic() - self.started_at) * 1000
+
+    def start(self):
+        """
+        Mark the start of an attempt.
+        """
+        self.started_at = time.monotonic()
+
+    def response(self, level, status_code, reason, payload=_NO_PAYLOAD):
+        """
+        Write the log entry for a response.
+        """
+        self.status = status_code
+
+        if not logger.isEnabledFor(level):
+            return
+
+        extra = self._extra(status_code)
+
+        if not config.KABELWERK_LOG_PAYLOADS:
+            logger.log(level, '%s → %s %s (%.0f ms)', self, status_code,
+                       reason, extra['kabelwerk']['elapsed'], extra=extra)
+        elif payload is _NO_PAYLOAD:
+            logger.log(level, '%s → %s %s', self, status_code, reason,
+                       extra=extra)
+        else:
+            logger.log(level, '%s → %s %s %s', self, status_code, reason,
+                       _Payload(payload), extra=extra)
+
+    def error(self, error):
+        """
+        Write the log entry for a request which failed without a response.
+        """
+        logger.error('%s → %s', self, _Error(error, self.api_token),
+                     exc_info=error, extra=self._extra())
+
+    def retry(self, delay):
+        """
+        Write the log entry for scheduling a retry.
+        """
+        logger.info('%s → retrying in %.2fs', self, delay,
+                    extra=self._extra())
+
+    def rejected(self):
+        """
+        Write the log entry for a request rejected by the circuit breaker.
+        """
+        logger.error('%s → circuit breaker open', self, extra=self._extra())
+
+    def expired(self):
+        """
+        Write the log entry for a request not sent because of the deadline.
+        """
+        logger.error('%s → deadline exceeded', self, extra=self._extra())
+
+    def _extra(self, status_code=None):
+        return {
+            'kabelwerk': {
+                'method': self.method,
+                'path': self.url_path,
+                'status': status_code,
+                'elapsed': self.elapsed,
+            },
+        }
+
+
+class _Payload:
+    """
+    Formats a payload for a log entry when the entry is emitted.
+    """
+
+    __slots__ = ('payload',)
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def __str__(self):
+        return format_payload(self.payload)
+
+
+class _Error:
+    """
+    Formats an error for a log entry when the entry is emitted, making sure
+    that the API token — the client's or else KABELWERK_API_TOKEN — does not
+    end up in the logs.
+    """
+
+    __slots__ = ('error', 'api_token')
+
+    def __init__(self, error, api_token=None):
+        self.error = error
+        self.api_token = api_token or config.KABELWERK_API_TOKEN
+
+    def __str__(self):
+        text = str(self.error)
+
+        if self.api_token:
+            text = text.replace(self.api_token, REDACTED)
+
+        return text
+
+
+def format_payload(payload):
+    """
+    Return the repr of a request or response payload for the logs, with the
+    KABELWERK_LOG_REDACTED_FIELDS redacted and the whole truncated to
+    KABELWERK_LOG_MAX_LENGTH characters.
+    """
+    if config.KABELWERK_LOG_REDACTED_FIELDS:
+        payload = _redact(payload, config.KABELWERK_LOG_REDACTED_FIELDS)
+
+    text = repr(payload)
+
+    limit = config.KABELWERK_LOG_MAX_LENGTH
+    if limit and len(text) > limit:
+        text = f'{text[:limit]}… ({len(text)} characters)'
+
+    return text
+
+
+def _redact(value, fields):
+    """
+    Return a copy of the value with the given dict keys redacted, at any
+    level of nesting.
+
+    Helper for format_payload.
+    """
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if key in fields else _redact(item, fields)
+            for key, item in value.items()
+        }
+
+    if isinstance(value, list):
+        return [_redact(item, fields) for item in value]
+
+    return value
@@ -0,0 +1,242 @@
+"""
+In-process metrics of the API calls, exportable in the Prometheus text format.
+
+Each attempt at an API call is counted by method, endpoint template (e.g.
+/hubs/{hub}/rooms/{room}/messages rather than the actual path), status, and
+exception class, and its duration is recorded in a histogram with fixed
+buckets. The metrics can be turned off with KABELWERK_METRICS.
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+import threading
+
+from kabelwerk import config
+from kabelwerk.exceptions import CircuitOpenError
+
+
+# the upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# the path segments following these are replaced with placeholders in the
+# endpoint templates
+PLACEHOLDERS = {
+    'hubs': '{hub}',
+    'rooms': '{room}',
+    'users': '{key}',
+    'messages': '{message}',
+}
+
+
+class Registry:
+    """
+    Holds the counters and latency histograms of the API calls.
+
+    Recording an observation takes a single short-lived lock, so that the
+    registry can be shared by all threads and event loops in the process.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+
+        # (method, endpoint, status, exception) → count
+        self._calls = {}
+
+        # (method, endpoint) → [bucket counts..., count of the rest, sum]
+        self._durations = {}
+
+        self._lock = threading.Lock()
+
+    def observe(self, method, endpoint, status, exception, duration=None):
+        """
+        Record an attempt at an API call.
+
+
+        Arguments
+        ---------
+
+        method
+            The HTTP method.
+
+        endpoint
+            The endpoint template — see get_endpoint_template.
+
+        status
+            The HTTP status of the response, or None if there is no response.
+
+        exception
+            The name of the exception class raised by the attempt, or None if
+            the attempt succeeded.
+
+        duration
+            The number of seconds the attempt took, or None if it should not
+            be recorded in the latency histogram.
+
+        """
+        key = (method, endpoint, status, exception)
+
+        if duration is not None:
+            index = bisect_left(self.buckets, duration)
+
+        with self._lock:
+            self._calls[key] = self._calls.get(key, 0) + 1
+
+            if duration is not None:
+                histogram = self._durations.get((method, endpoint))
+
+                if histogram is None:
+                    histogram = [0] * (len(self.buckets) + 1) + [0.0]
+                    self._durations[(method, endpoint)] = histogram
+
+                histogram[index] += 1
+                histogram[-1] += duration
+
+    def reset(self):
+        """
+        Clear all the counters and histograms.
+        """
+        with self._lock:
+            self._calls.clear()
+            self._durations.clear()
+
+    def get_calls(self):
+        """
+        Return a dict mapping each (method, endpoint, status, exception) tuple
+        to the number of attempts so labelled.
+        """
+        with self._lock:
+            return dict(self._calls)
+
+    def render(self):
+        """
+        Return the metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            calls = sorted(self._calls.items(), key=_sort_key)
+            durations = sorted(
+                (key, list(histogram))
+                for key, histogram in self._durations.items()
+            )
+
+        lines = [
+            '# HELP kabelwerk_api_calls_total '
+            'The number of attempts at Kabelwerk API calls.',
+            '# TYPE kabelwerk_api_calls_total counter',
+        ]
+
+        for (method, endpoint, status, exception), count in calls:
+            labels = _format_labels(
+                method=method,
+                endpoint=endpoint,
+                status='' if status is None else str(status),
+                exception=exception or '',
+            )
+            lines.append(f'kabelwerk_api_calls_total{{{labels}}} {count}')
+
+        lines += [
+            '# HELP kabelwerk_api_call_duration_seconds '
+            'The duration of the attempts at Kabelwerk API calls.',
+            '# TYPE kabelwerk_api_call_duration_seconds histogram',
+        ]
+
+        name = 'kabelwerk_api_call_duration_seconds'
+
+        for (method, endpoint), histogram in durations:
+            labels = _format_labels(method=method, endpoint=endpoint)
+            cumulative = 0
+
+            for bound, count in zip(self.buckets + ('+Inf',), histogram):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+                )
+
+            lines.append(f'{name}_sum{{{labels}}} {histogram[-1]}')
+            lines.append(f'{name}_count{{{labels}}} {cumulative}')
+
+        return '\n'.join(lines) + '\n'
+
+
+"""
+the registry used by make_api_call
+"""
+
+
+registry = Registry()
+
+
+def render_prometheus():
+    """
+    Return the metrics of the API calls made by the process in the Prometheus
+    text exposition format.
+    """
+    return registry.render()
+
+
+def get_endpoint_template(url_path):
+    """
+    Return the URL path with the IDs replaced with placeholders.
+
+
+    Examples
+    --------
+
+    >>> get_endpoint_template('/hubs/section9/rooms/kusanagi/messages')
+    '/hubs/{hub}/rooms/{room}/messages'
+
+    """
+    segments = url_path.split('/')
+
+    for index in range(1, len(segments)):
+        placeholder = PLACEHOLDERS.get(segments[index - 1])
+
+        if placeholder and segments[index]:
+            segments[index] = placeholder
+
+    return '/'.join(segments)
+
+
+@contextmanager
+def record_attempt(log):
+    """
+    Record an attempt at an API call in the registry — unless the metrics are
+    turned off with KABELWERK_METRICS.
+
+    The attempt's status and duration are taken from the RequestLog. Attempts
+    rejected by the circuit breaker are counted but their duration is not
+    recorded, as no request is sent.
+    """
+    if not config.KABELWERK_METRICS:
+        yield
+        return
+
+    log.status = None
+
+    try:
+        yield
+    except BaseException as error:
+        duration = None
+        if not isinstance(error, CircuitOpenError):
+            duration = log.elapsed / 1000
+
+        registry.observe(log.method, get_endpoint_template(log.url_path),
+                         log.status, type(error).__name__, duration)
+        raise
+
+    registry.observe(log.method, get_endpoint_template(log.url_path),
+                     log.status, None, log.elapsed / 1000)
+
+
+def _format_labels(**labels):
+    return ','.join(
+        f'{name}="{_escape(value)}"' for name, value in labels.items()
+    )
+
+
+def _escape(value):
+    return (value.replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def _sort_key(item):
+    return tuple('' if value is None else str(value) for value in item[0])
@@ -0,0 +1,121 @@
+"""
+Reading the paginated lists of the Kabelwerk API.
+
+The list endpoints take a limit and a cursor in the query string and respond
+with a page of items and the cursor of the next page:
+
+    GET /api/hubs/section9/rooms?limit=100&cursor=42
+    {"data": [...], "next": "84"}
+
+The next cursor is null on the last page, and an empty response (e.g. a 204)
+also ends the list. The cursor is opaque: it is only ever taken from a
+response and sent back.
+
+The readers built on top of paginate — e.g. iter_rooms and iter_messages —
+fetch the next page in the background while the current one is consumed, and
+keep at most two pages in memory regardless of the length of the list.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+
+from kabelwerk.api.base import make_api_call
+from kabelwerk.api.client import get_client
+
+
+# the default number of items per page, which is also the most that the
+# Kabelwerk API returns in one page
+PAGE_SIZE = 100
+
+
+def paginate(url_path, decode, query=None, *, page_size=PAGE_SIZE,
+             prefetch=True, timeout=None, client=None):
+    """
+    Yield the decoded items of a paginated list, page by page.
+
+    Nothing is fetched until the iteration starts. If prefetch is on, the
+    next page is requested by a background thread as soon as the current page
+    arrives — so that fetching it overlaps with consuming the current page —
+    and the thread is let go when the iteration ends, including when the
+    generator is closed early.
+
+    A failed API call raises its exception from the generator once the items
+    of the pages before it have been consumed.
+
+
+    Arguments
+    ---------
+
+    url_path
+        The URL path of the list endpoint.
+
+    decode
+        The function building a model from an item's API representation.
+
+    query
+        The filters to add to the query string of each page's request.
+
+    page_size
+        The number of items per page.
+
+    prefetch
+        Whether to fetch the next page in the background.
+
+    timeout
+        The timeout of each page's API call — see make_api_call.
+
+    client
+        The Client to make the calls with. Defaults to the default client.
+
+    """
+    if client is None:
+        client = get_client()
+
+    def fetch(cursor):
+        page_query = {**(query or {}), 'limit': page_size}
+
+        if cursor is not None:
+            page_query['cursor'] = cursor
+
+        return make_api_call('GET', url_path, timeout=timeout, client=client,
+                             query=page_query)
+
+    executor = None
+    page = fetch(None)
+
+    try:
+        while True:
+            if not page:
+                return
+
+            cursor = page.get('next')
+            upcoming = None
+
+            if cursor is not None and prefetch:
+                if executor is None:
+                    executor = ThreadPoolExecutor(
+                        max_workers=1,
+                        thread_name_prefix='kabelwerk-prefetch',
+                    )
+
+                # the copy carries the current deadline over to the thread
+                upcoming = executor.submit(
+                    contextvars.copy_context().run, fetch, cursor,
+                )
+
+            items, page = page.get('data') or [], None
+
+            for item in items:
+                yield decode(item)
+
+            if cursor is None:
+                return
+
+            # let go of the consumed page before waiting for the next one
+            del items
+
+            page = upcoming.result() if upcoming else fetch(cursor)
+
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
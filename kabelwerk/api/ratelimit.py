@@ -0,0 +1,129 @@
+import re
+import threading
+import time
+
+from kabelwerk import config
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket holding up to `burst` tokens and refilled at
+    `rate` tokens per second.
+
+    Instead of blocking, the bucket hands out reservations: taking a token
+    always succeeds but may leave the bucket in debt, and the caller is told
+    how long to wait before the token is actually theirs. This way the waiting
+    happens outside of the lock and works the same in threads (time.sleep) and
+    in coroutines (asyncio.sleep), and callers are served in order.
+    """
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError('The rate of a token bucket must be positive.')
+
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1)
+
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token and return the number of seconds to wait before using it.
+        """
+        with self._lock:
+            now = time.monotonic()
+
+            self._tokens = min(
+                self.burst,
+                self._tokens + (now - self._updated_at) * self.rate,
+            )
+            self._updated_at = now
+
+            self._tokens -= 1
+
+            return max(-self._tokens / self.rate, 0)
+
+
+class RateLimiter:
+    """
+    A set of token buckets, each applied to the API calls matching a rule.
+
+    The rules are given as a dict mapping either an HTTP method (e.g. 'POST')
+    or an endpoint prefix (e.g. '/users' or '/hubs/{hub}/rooms', where {hub}
+    stands for any single path segment) to either a rate in calls per second
+    or a (rate, burst) tuple. An API call has to take a token from the bucket
+    of each rule it matches.
+    """
+
+    def __init__(self, limits):
+        self.rules = []
+
+        for key, value in limits.items():
+            rate, burst = value if isinstance(value, tuple) else (value, None)
+
+            if key.startswith('/'):
+                method, path_regex = None, compile_prefix(key)
+            else:
+                method, path_regex = key.upper(), None
+
+            self.rules.append((method, path_regex, TokenBucket(rate, burst)))
+
+    def reserve(self, method, url_path):
+        """
+        Take a token from each matching bucket and return the number of
+        seconds to wait before making the API call.
+        """
+        delay = 0
+
+        for rule_method, path_regex, bucket in self.rules:
+            if rule_method and rule_method != method.upper():
+                continue
+
+            if path_regex and not path_regex.match(url_path):
+                continue
+
+            delay = max(delay, bucket.reserve())
+
+        return delay
+
+
+def compile_prefix(prefix):
+    """
+    Compile an endpoint prefix such as '/hubs/{hub}/rooms' into a regex.
+
+    Used by RateLimiter and by the per-endpoint timeouts.
+    """
+    parts = re.split(r'\{[^/{}]*\}', prefix.rstrip('/'))
+
+    return re.compile(
+        '^' + '[^/]+'.join(re.escape(part) for part in parts) + '(/|$)'
+    )
+
+
+# the rate limiter built from KABELWERK_RATE_LIMITS — see get_rate_limit_delay
+_limiter = (None, None)
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limit_delay(method, url_path):
+    """
+    Take the tokens needed for an API call according to KABELWERK_RATE_LIMITS
+    and return the number of seconds to wait before making the call.
+
+    The rate limiter is rebuilt whenever KABELWERK_RATE_LIMITS is set to a new
+    dict.
+    """
+    global _limiter
+
+    limits = config.KABELWERK_RATE_LIMITS
+    if not limits:
+        return 0
+
+    if _limiter[0] is not limits:
+        with _limiter_lock:
+            if _limiter[0] is not limits:
+                _limiter = (limits, RateLimiter(limits))
+
+    return _limiter[1].reserve(method, url_path)
@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import random
+
+from kabelwerk import config
+from kabelwerk.exceptions import ConnectionError, ServerError
+
+
+# the HTTP methods which are safe to retry without an idempotency key
+IDEMPOTENT_METHODS = ['DELETE', 'GET', 'HEAD', 'OPTIONS', 'PATCH', 'PUT']
+
+# the HTTP status codes which indicate a transient failure
+RETRY_STATUS_CODES = [429, 502, 503, 504]
+
+
+def get_retry_delay(method, attempt, error, idempotency_key=None):
+    """
+    Return the number of seconds to wait before retrying a failed API call, or
+    None if the call should not be retried.
+
+    A call is retried if it failed with a ConnectionError or with a ServerError
+    caused by one of the RETRY_STATUS_CODES, if its method is idempotent or an
+    idempotency key is attached to it, and if it has not used up all of the
+    KABELWERK_MAX_ATTEMPTS.
+
+    The delay is computed using exponential backoff with full jitter, i.e. it
+    is a random number between 0 and KABELWERK_RETRY_BACKOFF * 2^(attempt-1),
+    capped at KABELWERK_RETRY_MAX_BACKOFF. If the response has a Retry-After
+    header, the delay is at least as long as the latter asks for — and if the
+    latter asks for more than KABELWERK_RETRY_MAX_BACKOFF, the call is not
+    retried at all.
+
+
+    Arguments
+    ---------
+
+    method
+        The HTTP method of the failed call.
+
+    attempt
+        The number of the failed attempt, starting at 1.
+
+    error
+        The exception raised by the failed attempt.
+
+    idempotency_key
+        The idempotency key attached to the call — if such.
+
+    """
+    if attempt >= config.KABELWERK_MAX_ATTEMPTS:
+        return None
+
+    if method.upper() not in IDEMPOTENT_METHODS and not idempotency_key:
+        return None
+
+    if isinstance(error, ServerError):
+        if error.response.status_code not in RETRY_STATUS_CODES:
+            return None
+    elif not isinstance(error, ConnectionError):
+        return None
+
+    delay = random.uniform(0, min(
+        config.KABELWERK_RETRY_MAX_BACKOFF,
+        config.KABELWERK_RETRY_BACKOFF * 2 ** (attempt - 1),
+    ))
+
+    if isinstance(error, ServerError):
+        retry_after = parse_retry_after(
+            error.response.headers.get('Retry-After'),
+        )
+
+        if retry_after is not None:
+            if retry_after > config.KABELWERK_RETRY_MAX_BACKOFF:
+                return None
+
+            delay = max(delay, retry_after)
+
+    return delay
+
+
+def parse_retry_after(value):
+    """
+    Parse the value of a Retry-After header and return the number of seconds
+    it asks to wait, or None if the value is missing or invalid.
+
+    The value can be either a number of seconds or an HTTP date.
+    """
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0)
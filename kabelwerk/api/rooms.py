@@ -1,9 +1,18 @@
+from kabelwerk import config
 from kabelwerk.api.base import make_api_call
-from kabelwerk.models import Message, Room, User
-from kabelwerk.utils import parse_datetime
+from kabelwerk.api.client import get_client
+from kabelwerk.api.decoders import decode_message, decode_room
+from kabelwerk.api.pagination import PAGE_SIZE, paginate
+from kabelwerk.cache import cache_room, get_cached_room
+from kabelwerk.exceptions import KabelwerkException
+from kabelwerk.utils import run_concurrently
 
 
-def update_room(*, hub='_', room, **kwargs):
+# the room fields which can be set with update_room
+ROOM_FIELDS = ['archived', 'attributes', 'hub_user']
+
+
+def update_room(*, hub='_', room, timeout=None, client=None, **kwargs):
     """
     Update a chat room.
 
@@ -30,6 +39,14 @@ def update_room(*, hub='_', room, **kwargs):
         Your unique ID of the hub user to assign the room to. Set to None if
         you want to unassign the room. Optional.
 
+    timeout
+        The number of seconds to wait for a response — a number or a
+        (connect, read) tuple. Optional, defaults to the client's timeouts.
+
+    client
+        The Client to make the call with. Optional, defaults to the default
+        client — see kabelwerk.api.client.get_client.
+
 
     Returns
     -------
@@ -94,26 +111,94 @@ def update_room(*, hub='_', room, **kwargs):
     """
     params = {
         key: value for key, value in kwargs.items()
-        if key in ['archived', 'attributes', 'hub_user']
+        if key in ROOM_FIELDS
     }
 
-    data = make_api_call('PATCH', f'/hubs/{hub}/rooms/{room}', params)
-
-    return Room(
-        archived=data['archived'],
-        attributes=data['attributes'],
-        hub_user=User(
-            id=data['hub_user']['id'],
-            key=data['hub_user']['key'],
-            name=data['hub_user']['name'],
-        ) if data['hub_user'] else None,
-        id=data['id'],
-        user=User(
-            id=data['user']['id'],
-            key=data['user']['key'],
-            name=data['user']['name'],
-        ),
-    )
+    if client is None:
+        client = get_client()
+
+    cached = get_cached_room(hub, room, params, client.api_url)
+    if cached is not None:
+        return cached
+
+    data = make_api_call('PATCH', f'/hubs/{hub}/rooms/{room}', params,
+                         timeout=timeout, client=client)
+
+    updated = decode_room(data)
+    cache_room(hub, room, updated, client.api_url)
+
+    return updated
+
+
+def iter_rooms(*, hub='_', page_size=PAGE_SIZE, prefetch=True, timeout=None,
+               client=None):
+    """
+    Iterate over the chat rooms of a hub, in the order of their IDs.
+
+    All arguments are named arguments. The rooms are fetched page by page as
+    you iterate, so memory use stays the same however many rooms there are;
+    the API call errors are raised during the iteration.
+
+
+    Arguments
+    ---------
+
+    hub
+        The slug identifying the hub. You can omit this argument if you only
+        have one hub.
+
+    page_size
+        The number of rooms to fetch with each API call. Optional, defaults
+        to 100, which is also the maximum.
+
+    prefetch
+        Whether to fetch the next page in the background while the current
+        one is being consumed. Optional, defaults to True.
+
+    timeout
+        The number of seconds to wait for each page — a number or a
+        (connect, read) tuple. Optional, defaults to the client's timeouts.
+
+    client
+        The Client to make the calls with. Optional, defaults to the default
+        client — see kabelwerk.api.client.get_client.
+
+
+    Yields
+    ------
+
+    typing.NamedTuple
+        Info about each room.
+
+
+    Raises
+    ------
+
+    DoesNotExist
+        If there is no such hub.
+
+    AuthenticationError
+        If the request is rejected because the authentication token is invalid.
+
+    ConnectionError
+        If there is a problem connecting to the Kabelwerk backend or if the
+        request times out.
+
+    ServerError
+        If the Kabelwerk backend fails to handle the request or behaves in an
+        unexpected way.
+
+
+    Examples
+    --------
+
+    >>> for room in iter_rooms(hub='section9'):
+    ...     print(room.user.key, room.archived)
+    kusanagi False
+
+    """
+    return paginate(f'/hubs/{hub}/rooms', decode_room, page_size=page_size,
+                    prefetch=prefetch, timeout=timeout, client=client)
 
 
 """
@@ -121,7 +206,8 @@ messages
 """
 
 
-def post_message(*, hub='_', room, user, text):
+def post_message(*, hub='_', room, user, text, idempotency_key=None,
+                 timeout=None, client=None):
     """
     Post a message in a chat room.
 
@@ -142,6 +228,18 @@ def post_message(*, hub='_', room, user, text):
     text
         The text of the message.
 
+    idempotency_key
+        A unique string identifying this message, which allows the request to
+        be safely retried on transient errors. Optional.
+
+    timeout
+        The number of seconds to wait for a response — a number or a
+        (connect, read) tuple. Optional, defaults to the client's timeouts.
+
+    client
+        The Client to make the call with. Optional, defaults to the default
+        client — see kabelwerk.api.client.get_client.
+
 
     Returns
     -------
@@ -184,19 +282,202 @@ def post_message(*, hub='_', room, user, text):
     data = make_api_call('POST', f'/hubs/{hub}/rooms/{room}/messages', {
         'text': text,
         'user': user,
-    })
-
-    return Message(
-        html=data['html'],
-        id=data['id'],
-        inserted_at=parse_datetime(data['inserted_at']),
-        room_id=data['room_id'],
-        text=data['text'],
-        type=data['type'],
-        updated_at=parse_datetime(data['updated_at']),
-        user=User(
-            id=data['user']['id'],
-            key=data['user']['key'],
-            name=data['user']['name'],
-        ),
-    )
+    }, timeout=timeout, idempotency_key=idempotency_key, client=client)
+
+    return decode_message(data)
+
+
+def iter_messages(*, hub='_', room, since=None, page_size=PAGE_SIZE,
+                  prefetch=True, timeout=None, client=None):
+    """
+    Iterate over the messages in a chat room, from the oldest to the newest.
+
+    All arguments are named arguments. The messages are fetched page by page
+    as you iterate, so memory use stays the same however long the room's
+    history is; the API call errors are raised during the iteration.
+
+
+    Arguments
+    ---------
+
+    hub
+        The slug identifying the hub to which the room belongs. You can omit
+        this argument if you only have one hub.
+
+    room
+        Your unique ID of the end user to which the room belongs.
+
+    since
+        Only yield the messages posted at or after this time — a datetime or
+        an ISO 8601 string. Optional.
+
+    page_size
+        The number of messages to fetch with each API call. Optional, defaults
+        to 100, which is also the maximum.
+
+    prefetch
+        Whether to fetch the next page in the background while the current
+        one is being consumed. Optional, defaults to True.
+
+    timeout
+        The number of seconds to wait for each page — a number or a
+        (connect, read) tuple. Optional, defaults to the client's timeouts.
+
+    client
+        The Client to make the calls with. Optional, defaults to the default
+        client — see kabelwerk.api.client.get_client.
+
+
+    Yields
+    ------
+
+    typing.NamedTuple
+        Info about each message.
+
+
+    Raises
+    ------
+
+    DoesNotExist
+        If there is no chat room for the given end user and hub.
+
+    AuthenticationError
+        If the request is rejected because the authentication token is invalid.
+
+    ConnectionError
+        If there is a problem connecting to the Kabelwerk backend or if the
+        request times out.
+
+    ServerError
+        If the Kabelwerk backend fails to handle the request or behaves in an
+        unexpected way.
+
+
+    Examples
+    --------
+
+    >>> for message in iter_messages(room='kusanagi', since='2023-01-01'):
+    ...     print(message.user.name, message.text)
+    Batou Hello!
+
+    """
+    query = {}
+
+    if since is not None:
+        query['since'] = (
+            since if isinstance(since, str) else since.isoformat()
+        )
+
+    return paginate(f'/hubs/{hub}/rooms/{room}/messages', decode_message,
+                    query, page_size=page_size, prefetch=prefetch,
+                    timeout=timeout, client=client)
+
+
+def broadcast_message(*, hub='_', rooms, user, text, concurrency=None,
+                      client=None):
+    """
+    Post the same message in many chat rooms.
+
+    All arguments are named arguments. The messages are posted concurrently
+    using a pool of threads, with each room requiring its own call to the
+    Kabelwerk API.
+
+    Nothing is posted until you iterate over the returned Broadcast or call
+    its wait method.
+
+
+    Arguments
+    ---------
+
+    hub
+        The slug identifying the hub to which the rooms belong. You can omit
+        this argument if you only have one hub.
+
+    rooms
+        An iterable of your unique IDs of the end users to which belong the
+        rooms where to post the message.
+
+    user
+        Your unique ID of the user to post the message as.
+
+    text
+        The text of the message.
+
+    concurrency
+        The maximum number of API calls to make at the same time. Defaults to
+        KABELWERK_POOL_SIZE.
+
+    client
+        The Client to make the call with. Optional, defaults to the default
+        client — see kabelwerk.api.client.get_client.
+
+
+    Returns
+    -------
+
+    Broadcast
+        An iterable of (room, Message) pairs in the order in which the
+        messages are posted.
+
+
+    Examples
+    --------
+
+    >>> broadcast = broadcast_message(hub='section9', rooms=['kusanagi',
+    ...                               'aramaki'], user='batou', text='!')
+    >>> for room, message in broadcast:
+    ...     print(room, message.id)
+    kusanagi 42
+    >>> broadcast.failures
+    {DoesNotExist: ['aramaki']}
+
+    """
+    return Broadcast(run_concurrently(
+        lambda room: post_message(hub=hub, room=room, user=user, text=text,
+                                  client=client),
+        rooms,
+        concurrency or config.KABELWERK_POOL_SIZE,
+    ))
+
+
+class Broadcast:
+    """
+    The progress of a broadcast_message call.
+
+    Iterating over it posts the messages and yields a (room, Message) pair for
+    each message as soon as it is posted. The rooms in which the message could
+    not be posted are collected in the errors and failures attributes instead.
+    """
+
+    def __init__(self, results):
+        self._results = results
+
+        self.errors = {}
+        """A dict mapping each failed room to the exception raised."""
+
+    @property
+    def failures(self):
+        """A dict mapping each exception class to the rooms which failed with
+        that exception."""
+        failures = {}
+
+        for room, error in self.errors.items():
+            failures.setdefault(type(error), []).append(room)
+
+        return failures
+
+    def __iter__(self):
+        for room, result in self._results:
+            if isinstance(result, KabelwerkException):
+                self.errors[room] = result
+            else:
+                yield room, result
+
+    def wait(self):
+        """
+        Post the remaining messages and return the failures.
+        """
+        for _ in self:
+            pass
+
+        return self.failures
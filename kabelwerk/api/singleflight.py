@@ -0,0 +1,212 @@
+"""
+Single-flight deduplication of identical API calls.
+
+Under load, several threads often make the same API call at the same moment —
+e.g. the same update_user on a duplicate webhook delivery. When
+KABELWERK_SINGLE_FLIGHT is turned on, an API call identical to one which is
+already in flight does not send a request of its own: it waits for the call in
+flight and gets the same result, or a copy of the same exception.
+
+The exceptions which depend on the caller rather than on the backend — the
+call in flight running out of its deadline or of its timeout — are not
+shared: the waiting calls are then made again, by one of them.
+
+Two API calls are identical if they are made by the same client and have the
+same method, URL path, query, and params. POST requests, which are not
+idempotent, are only deduplicated if they have the same idempotency key.
+"""
+
+import copy
+import json
+import os
+import threading
+
+from kabelwerk import config
+from kabelwerk.api.timeouts import get_remaining_time
+from kabelwerk.exceptions import DeadlineExceededError
+
+
+class SingleFlight:
+    """
+    A thread-safe group of API calls in flight, keyed by anything hashable.
+
+    The counters attribute is a dict with the number of calls made (leaders)
+    and the number of calls which got the result of another call (shared).
+    """
+
+    def __init__(self):
+        # key → the _Call in flight
+        self._calls = {}
+        self._lock = threading.Lock()
+
+        self.counters = {
+            'leaders': 0,
+            'shared': 0,
+        }
+
+    def do(self, key, function, is_shared=None):
+        """
+        Call the function and return its result — unless a call with the same
+        key is already in flight, in which case wait for it and return a deep
+        copy of its result or raise a copy of its exception.
+
+        The copies keep the callers from sharing mutable payloads and
+        tracebacks. If the call in flight is interrupted without a result or a
+        shared exception (e.g. by a KeyboardInterrupt in its thread, or by its
+        own deadline), the waiting calls start over: one of them becomes the
+        new call in flight, and the others wait for it.
+
+
+        Arguments
+        ---------
+
+        key
+            The hashable key of the call — see make_key.
+
+        function
+            The function making the call.
+
+        is_shared
+            The function telling whether an exception raised by the function
+            should be raised by the waiting calls too. By default all
+            exceptions are shared except for DeadlineExceededError.
+
+
+        Raises
+        ------
+
+        DeadlineExceededError
+            If the current deadline passes while waiting for the call in
+            flight — see kabelwerk.api.timeouts.deadline.
+
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+
+                if call is None:
+                    call = self._calls[key] = _Call()
+                    self.counters['leaders'] += 1
+                    leader = True
+                else:
+                    self.counters['shared'] += 1
+                    leader = False
+
+            if leader:
+                return self._lead(key, call, function, is_shared)
+
+            if not call.done.wait(get_remaining_time()):
+                raise DeadlineExceededError()
+
+            if call.error is not None:
+                raise copy.copy(call.error) from call.error
+
+            if call.finished:
+                return copy.deepcopy(call.result)
+
+    def _lead(self, key, call, function, is_shared):
+        try:
+            call.result = function()
+            call.finished = True
+
+            return call.result
+
+        except Exception as error:
+            if is_shared is None:
+                shared = not isinstance(error, DeadlineExceededError)
+            else:
+                shared = is_shared(error)
+
+            if shared:
+                call.error = error
+
+            raise
+
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+            call.done.set()
+
+
+class _Call:
+    """
+    An API call in flight.
+    """
+
+    __slots__ = ('done', 'finished', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.finished = False
+        self.result = None
+        self.error = None
+
+
+def make_key(client, method, url_path, params, idempotency_key,
+             query=None):
+    """
+    Return the single-flight key of an API call, or None if the call should
+    not be deduplicated — i.e. if it is a POST without an idempotency key.
+
+    The params and the query are serialised with sorted keys, so that the
+    order in which they are given does not matter.
+    """
+    if method == 'POST' and not idempotency_key:
+        return None
+
+    return (
+        client.api_url,
+        client.api_token,
+        method,
+        url_path,
+        _canonical(params),
+        idempotency_key,
+        _canonical(query),
+    )
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'),
+                      default=str)
+
+
+# the group shared by all threads — see get_single_flight
+_group = None
+_group_lock = threading.Lock()
+
+
+def get_single_flight():
+    """
+    Return the single-flight group of the API calls, or None if
+    KABELWERK_SINGLE_FLIGHT is turned off.
+
+    The group is shared by all threads in the process and is recreated in the
+    child process after os.fork.
+    """
+    global _group
+
+    if not config.KABELWERK_SINGLE_FLIGHT:
+        return None
+
+    if _group is None:
+        with _group_lock:
+            if _group is None:
+                _group = SingleFlight()
+
+    return _group
+
+
+def _reset_group_after_fork():
+    """
+    Drop the parent process's group in a newly forked child, as the threads
+    making its calls in flight do not exist there.
+    """
+    global _group, _group_lock
+
+    _group = None
+    _group_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_group_after_fork)
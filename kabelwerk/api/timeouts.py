@@ -0,0 +1,204 @@
+"""
+The timeouts of the API calls.
+
+Each attempt at an API call has a connect timeout and a read timeout, taken
+from the timeout argument of the call if given, or else from the matching rule
+in KABELWERK_TIMEOUTS, or else from KABELWERK_CONNECT_TIMEOUT and
+KABELWERK_READ_TIMEOUT.
+
+On top of that, a block of code can be given a deadline, which all the API
+calls made within it share — including their retries and rate limit waits:
+
+    with deadline(0.8):
+        update_room(room='kusanagi', archived=True)
+        post_message(room='kusanagi', user='batou', text='Closed.')
+
+The deadline is kept in a context variable, so it applies to the current
+thread or asyncio task and to the code called from it.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+import threading
+import time
+
+from kabelwerk import config
+from kabelwerk.api.ratelimit import compile_prefix
+from kabelwerk.exceptions import DeadlineExceededError
+
+
+# the time.monotonic value by which the current API calls have to be done
+_deadline = ContextVar('kabelwerk_deadline', default=None)
+
+
+@contextmanager
+def deadline(seconds):
+    """
+    Limit the API calls made within the context to the given number of
+    seconds in total.
+
+    The attempts at the API calls have their timeouts capped to the time left,
+    retries are only made if there is time left for them, and once the time is
+    up, the API calls raise DeadlineExceededError. A deadline nested within
+    another one cannot extend the latter.
+
+
+    Arguments
+    ---------
+
+    seconds
+        The number of seconds until the deadline.
+
+
+    Examples
+    --------
+
+    >>> with deadline(0.8):
+    ...     post_message(room='kusanagi', user='batou', text='Hello!')
+
+    """
+    at = time.monotonic() + seconds
+
+    current = _deadline.get()
+    if current is not None:
+        at = min(at, current)
+
+    token = _deadline.set(at)
+
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def get_remaining_time():
+    """
+    Return the number of seconds left until the current deadline, or None if
+    there is no deadline.
+    """
+    at = _deadline.get()
+
+    if at is None:
+        return None
+
+    return at - time.monotonic()
+
+
+def get_timeout(method, url_path, timeout=None, wait=0):
+    """
+    Return the (connect, read) timeout pair for an attempt at an API call,
+    capped to the time left until the current deadline — if such.
+
+
+    Arguments
+    ---------
+
+    method
+        The HTTP method.
+
+    url_path
+        The URL path of the endpoint.
+
+    timeout
+        The timeout passed to the API call — a number of seconds, a (connect,
+        read) tuple, or None for the configured timeouts.
+
+    wait
+        The number of seconds to wait before making the attempt, e.g. because
+        of the rate limits.
+
+
+    Raises
+    ------
+
+    DeadlineExceededError
+        If the deadline passes before the attempt can be made.
+
+    """
+    if timeout is None:
+        timeout = _get_configured_timeout(method, url_path)
+
+    connect, read = timeout if isinstance(timeout, tuple) else (timeout,) * 2
+
+    remaining = get_remaining_time()
+
+    if remaining is not None:
+        remaining -= wait
+
+        if remaining <= 0:
+            raise DeadlineExceededError()
+
+        connect, read = min(connect, remaining), min(read, remaining)
+
+    return connect, read
+
+
+def is_expired():
+    """
+    Return whether the current deadline — if such — has passed.
+    """
+    remaining = get_remaining_time()
+
+    return remaining is not None and remaining <= 0
+
+
+class TimeoutRules:
+    """
+    The per-endpoint timeouts, built from a dict such as KABELWERK_TIMEOUTS
+    which maps either an HTTP method or an endpoint prefix to either a timeout
+    in seconds or a (connect, read) tuple.
+
+    An endpoint prefix takes precedence over a method, and a longer prefix
+    over a shorter one.
+    """
+
+    def __init__(self, timeouts):
+        self.methods = {}
+        self.prefixes = []
+
+        for key, timeout in timeouts.items():
+            if key.startswith('/'):
+                self.prefixes.append((len(key), compile_prefix(key), timeout))
+            else:
+                self.methods[key.upper()] = timeout
+
+        self.prefixes.sort(key=lambda rule: rule[0], reverse=True)
+
+    def get(self, method, url_path):
+        """
+        Return the timeout of the most specific matching rule, or None.
+        """
+        for _, path_regex, timeout in self.prefixes:
+            if path_regex.match(url_path):
+                return timeout
+
+        return self.methods.get(method.upper())
+
+
+# the rules built from KABELWERK_TIMEOUTS — see _get_configured_timeout
+_rules = (None, None)
+_rules_lock = threading.Lock()
+
+
+def _get_configured_timeout(method, url_path):
+    """
+    Return the timeout of the API call according to KABELWERK_TIMEOUTS, or
+    KABELWERK_CONNECT_TIMEOUT and KABELWERK_READ_TIMEOUT.
+
+    Helper for get_timeout.
+    """
+    global _rules
+
+    timeouts = config.KABELWERK_TIMEOUTS
+
+    if timeouts:
+        if _rules[0] is not timeouts:
+            with _rules_lock:
+                if _rules[0] is not timeouts:
+                    _rules = (timeouts, TimeoutRules(timeouts))
+
+        timeout = _rules[1].get(method, url_path)
+        if timeout is not None:
+            return timeout
+
+    return (config.KABELWERK_CONNECT_TIMEOUT, config.KABELWERK_READ_TIMEOUT)
@@ -1,8 +1,13 @@
+from kabelwerk import config
+from kabelwerk.cache import cache_user, get_cached_user, uncache_user
 from kabelwerk.api.base import make_api_call
-from kabelwerk.models import User
+from kabelwerk.api.client import get_client
+from kabelwerk.api.decoders import decode_user
+from kabelwerk.utils import check_arguments, run_concurrently
 
 
-def create_user(*, key, name, hub=None):
+def create_user(*, key, name, hub=None, idempotency_key=None, timeout=None,
+                client=None):
     """
     Create a user with the given key and name.
 
@@ -22,6 +27,18 @@ def create_user(*, key, name, hub=None):
         The slug identifying the hub in which to create the user. Only set this
         if you want to create a hub user.
 
+    idempotency_key
+        A unique string identifying this request, which allows it to be safely
+        retried on transient errors. Optional.
+
+    timeout
+        The number of seconds to wait for a response — a number or a
+        (connect, read) tuple. Optional, defaults to the client's timeouts.
+
+    client
+        The Client to make the call with. Optional, defaults to the default
+        client — see kabelwerk.api.client.get_client.
+
 
     Returns
     -------
@@ -58,20 +75,22 @@ def create_user(*, key, name, hub=None):
     ValidationError
 
     """
+    if client is None:
+        client = get_client()
+
     data = make_api_call('POST', '/users', {
         'hub': hub,
         'key': key,
         'name': name,
-    })
+    }, timeout=timeout, idempotency_key=idempotency_key, client=client)
 
-    return User(
-        id=data['id'],
-        key=data['key'],
-        name=data['name'],
-    )
+    user = decode_user(data)
+    cache_user(user, client.api_url)
+
+    return user
 
 
-def update_user(*, key, name):
+def update_user(*, key, name, timeout=None, client=None):
     """
     Update the user with the given key.
 
@@ -87,6 +106,14 @@ def update_user(*, key, name):
     name
         The user's name.
 
+    timeout
+        The number of seconds to wait for a response — a number or a
+        (connect, read) tuple. Optional, defaults to the client's timeouts.
+
+    client
+        The Client to make the call with. Optional, defaults to the default
+        client — see kabelwerk.api.client.get_client.
+
 
     Returns
     -------
@@ -126,18 +153,24 @@ def update_user(*, key, name):
     ValidationError
 
     """
+    if client is None:
+        client = get_client()
+
+    user = get_cached_user(key, name, client.api_url)
+    if user is not None:
+        return user
+
     data = make_api_call('PATCH', f'/users/{key}', {
         'name': name,
-    })
+    }, timeout=timeout, client=client)
 
-    return User(
-        id=data['id'],
-        key=data['key'],
-        name=data['name'],
-    )
+    user = decode_user(data)
+    cache_user(user, client.api_url)
 
+    return user
 
-def delete_user(*, key):
+
+def delete_user(*, key, timeout=None, client=None):
     """
     Delete the user with the given key.
 
@@ -150,6 +183,14 @@ def delete_user(*, key):
     key
         Your unique ID for this user.
 
+    timeout
+        The number of seconds to wait for a response — a number or a
+        (connect, read) tuple. Optional, defaults to the client's timeouts.
+
+    client
+        The Client to make the call with. Optional, defaults to the default
+        client — see kabelwerk.api.client.get_client.
+
 
     Returns
     -------
@@ -185,4 +226,164 @@ def delete_user(*, key):
     DoesNotExist
 
     """
-    make_api_call('DELETE', f'/users/{key}')
+    if client is None:
+        client = get_client()
+
+    uncache_user(key, client.api_url)
+
+    make_api_call('DELETE', f'/users/{key}', timeout=timeout, client=client)
+
+
+"""
+bulk operations
+"""
+
+
+def create_users(users, *, concurrency=None, client=None):
+    """
+    Create many users at once.
+
+    The users are created concurrently using a pool of threads, with each user
+    requiring its own call to the Kabelwerk API.
+
+
+    Arguments
+    ---------
+
+    users
+        An iterable of dicts, each with the key, name, and optionally hub of a
+        user to create — i.e. the arguments to create_user. It is consumed
+        lazily, so it can be e.g. a database cursor.
+
+    concurrency
+        The maximum number of API calls to make at the same time. Defaults to
+        KABELWERK_POOL_SIZE.
+
+    client
+        The Client to make the call with. Optional, defaults to the default
+        client — see kabelwerk.api.client.get_client.
+
+
+    Returns
+    -------
+
+    list
+        For each of the given users and in the same order, either a User if
+        the user is created or the exception raised by create_user otherwise
+        — a TypeError, without an API call, if the dict has missing or
+        unexpected keys.
+
+
+    Examples
+    --------
+
+    >>> create_users([
+    ...     {'key': 'kusanagi', 'name': 'Motoko'},
+    ...     {'key': '', 'name': 'Batou'},
+    ...     {'key': 'togusa'},
+    ... ])
+    [User(id=42, key='kusanagi', name='Motoko'), ValidationError, TypeError]
+
+    """
+    return _run_in_bulk(create_user, users, concurrency, client)
+
+
+def update_users(users, *, concurrency=None, client=None):
+    """
+    Update many users at once.
+
+    The users are updated concurrently using a pool of threads, with each user
+    requiring its own call to the Kabelwerk API.
+
+
+    Arguments
+    ---------
+
+    users
+        An iterable of dicts, each with the key and name of a user to update —
+        i.e. the arguments to update_user.
+
+    concurrency
+        The maximum number of API calls to make at the same time. Defaults to
+        KABELWERK_POOL_SIZE.
+
+    client
+        The Client to make the call with. Optional, defaults to the default
+        client — see kabelwerk.api.client.get_client.
+
+
+    Returns
+    -------
+
+    list
+        For each of the given users and in the same order, either a User if
+        the user is updated or the exception raised by update_user otherwise
+        — a TypeError, without an API call, if the dict has missing or
+        unexpected keys.
+
+    """
+    return _run_in_bulk(update_user, users, concurrency, client)
+
+
+def delete_users(keys, *, concurrency=None, client=None):
+    """
+    Delete many users at once.
+
+    The users are deleted concurrently using a pool of threads, with each user
+    requiring its own call to the Kabelwerk API.
+
+
+    Arguments
+    ---------
+
+    keys
+        An iterable of your unique IDs of the users to delete.
+
+    concurrency
+        The maximum number of API calls to make at the same time. Defaults to
+        KABELWERK_POOL_SIZE.
+
+    client
+        The Client to make the call with. Optional, defaults to the default
+        client — see kabelwerk.api.client.get_client.
+
+
+    Returns
+    -------
+
+    list
+        For each of the given keys and in the same order, either None if the
+        user is deleted or the exception raised by delete_user otherwise.
+
+    """
+    return _run_in_bulk(
+        delete_user, ({'key': key} for key in keys), concurrency, client,
+    )
+
+
+def _run_in_bulk(function, rows, concurrency, client):
+    """
+    Call the function with each of the rows — dicts of its arguments —
+    concurrently and return the list of results in the order of the rows.
+
+    Helper for the bulk operations above.
+    """
+    def call(pair):
+        row = pair[1]
+
+        error = check_arguments(function, row, client=client)
+        if error is not None:
+            return error
+
+        return function(**row, client=client)
+
+    results = {}
+
+    for (index, _), result in run_concurrently(
+        call,
+        enumerate(rows),
+        concurrency or config.KABELWERK_POOL_SIZE,
+    ):
+        results[index] = result
+
+    return [results[index] for index in range(len(results))]
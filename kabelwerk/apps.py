@@ -10,6 +10,40 @@ from django.apps import AppConfig
 from django.conf import settings
 
 from . import config
+from .api.dispatcher import start_dispatcher
+
+
+# the Django settings which are copied over to the Kabelwerk config
+SETTINGS = [
+    'KABELWERK_URL',
+    'KABELWERK_API_TOKEN',
+    'KABELWERK_POOL_SIZE',
+    'KABELWERK_KEEP_ALIVE',
+    'KABELWERK_TRANSPORT',
+    'KABELWERK_CONNECT_TIMEOUT',
+    'KABELWERK_READ_TIMEOUT',
+    'KABELWERK_TIMEOUTS',
+    'KABELWERK_CLIENTS',
+    'KABELWERK_MAX_ATTEMPTS',
+    'KABELWERK_RETRY_BACKOFF',
+    'KABELWERK_RETRY_MAX_BACKOFF',
+    'KABELWERK_RATE_LIMITS',
+    'KABELWERK_BREAKER_THRESHOLD',
+    'KABELWERK_BREAKER_WINDOW',
+    'KABELWERK_BREAKER_RECOVERY_TIME',
+    'KABELWERK_LOG_PAYLOADS',
+    'KABELWERK_LOG_MAX_LENGTH',
+    'KABELWERK_LOG_REDACTED_FIELDS',
+    'KABELWERK_JSON_CODEC',
+    'KABELWERK_METRICS',
+    'KABELWERK_CACHE',
+    'KABELWERK_SINGLE_FLIGHT',
+    'KABELWERK_COALESCE_WINDOW',
+    'KABELWERK_DISPATCH_WORKERS',
+    'KABELWERK_DISPATCH_QUEUE_SIZE',
+    'KABELWERK_DISPATCH_POLICY',
+    'KABELWERK_DISPATCH_DRAIN_TIMEOUT',
+]
 
 
 class KabelwerkAppConfig(AppConfig):
@@ -17,10 +51,15 @@ class KabelwerkAppConfig(AppConfig):
 
     def ready(self):
         """
-        Update the Kabelwerk config from the Django settings.
+        Update the Kabelwerk config from the Django settings, and start the
+        background dispatcher if KABELWERK_DISPATCH_AUTOSTART is set.
+
+        The dispatcher is stopped — draining its queue for up to
+        KABELWERK_DISPATCH_DRAIN_TIMEOUT seconds — when the process exits.
         """
-        if hasattr(settings, 'KABELWERK_URL'):
-            config.KABELWERK_URL = settings.KABELWERK_URL
+        for name in SETTINGS:
+            if hasattr(settings, name):
+                setattr(config, name, getattr(settings, name))
 
-        if hasattr(settings, 'KABELWERK_API_TOKEN'):
-            config.KABELWERK_API_TOKEN = settings.KABELWERK_API_TOKEN
+        if getattr(settings, 'KABELWERK_DISPATCH_AUTOSTART', False):
+            start_dispatcher()
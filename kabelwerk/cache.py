@@ -0,0 +1,207 @@
+"""
+An optional write-through cache of the users and rooms returned by the API.
+
+When KABELWERK_CACHE is set to a cache backend, the users and rooms returned by
+the API functions are stored in it, and update_user and update_room calls which
+would not change anything — i.e. whose arguments match the cached state — are
+answered from the cache without making a request.
+
+The cache is only as accurate as what passes through the SDK: changes made in
+Kabelwerk by other means (e.g. by hub users in the Kabelwerk app) are not seen
+until the cached entries expire. Keep the TTL short if that matters to you.
+"""
+
+from collections import OrderedDict
+import copy
+from hashlib import blake2b
+import threading
+import time
+
+from kabelwerk import config
+
+
+class LocalCache:
+    """
+    An in-process cache backend which evicts the least recently used entries
+    once it holds max_size entries, and expires entries after ttl seconds.
+
+    It is thread-safe but not shared between processes.
+    """
+
+    def __init__(self, max_size=10000, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the value stored under the key, or None if there is no such
+        value or it has expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None
+
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+
+            return entry[1]
+
+    def set(self, key, value):
+        """
+        Store the value under the key.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """
+        Remove the value stored under the key — if such.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Remove all values.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoCache:
+    """
+    A cache backend storing the entries in one of the caches of the Django
+    cache framework, so that they can be shared between processes.
+
+    This class assumes that you have Django installed. It can be instantiated
+    in your Django settings, as the Django cache is only looked up on first
+    use.
+
+    The keys are hashed — they embed the API URL and your user keys, which
+    could be too long or contain characters that backends such as memcached
+    do not accept.
+
+    Unlike LocalCache, it has no clear method, as the Django cache can only
+    be cleared as a whole — including e.g. the sessions. In order to drop
+    the SDK's entries, change the prefix or wait for the entries to expire.
+    """
+
+    def __init__(self, alias='default', ttl=300, prefix='kabelwerk'):
+        self.alias = alias
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @property
+    def cache(self):
+        from django.core.cache import caches
+
+        return caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(self._make_key(key))
+
+    def set(self, key, value):
+        self.cache.set(self._make_key(key), value, self.ttl)
+
+    def delete(self, key):
+        self.cache.delete(self._make_key(key))
+
+    def _make_key(self, key):
+        digest = blake2b(key.encode(), digest_size=16).hexdigest()
+
+        return f'{self.prefix}:{digest}'
+
+
+"""
+helpers for the API functions
+"""
+
+
+def get_cached_user(key, name, namespace=''):
+    """
+    Return the cached user with the given key if updating its name to the
+    given one would not change anything, and None otherwise.
+
+    The namespace — the API URL of the client making the call — keeps apart
+    the entries of different Kabelwerk backends.
+    """
+    if config.KABELWERK_CACHE is None:
+        return None
+
+    user = config.KABELWERK_CACHE.get(f'{namespace}user:{key}')
+
+    if user is not None and user.name == name:
+        return user
+
+    return None
+
+
+def cache_user(user, namespace=''):
+    """
+    Store the user in the cache — if the cache is turned on.
+    """
+    if config.KABELWERK_CACHE is not None:
+        config.KABELWERK_CACHE.set(f'{namespace}user:{user.key}', user)
+
+
+def uncache_user(key, namespace=''):
+    """
+    Remove the user with the given key from the cache.
+    """
+    if config.KABELWERK_CACHE is not None:
+        config.KABELWERK_CACHE.delete(f'{namespace}user:{key}')
+
+
+def get_cached_room(hub, room, params, namespace=''):
+    """
+    Return the cached room if updating it with the given params would not
+    change anything, and None otherwise.
+    """
+    if config.KABELWERK_CACHE is None:
+        return None
+
+    cached = config.KABELWERK_CACHE.get(f'{namespace}room:{hub}:{room}')
+
+    if cached is None:
+        return None
+
+    hub_user = cached.hub_user.key if cached.hub_user else None
+
+    for name, value in params.items():
+        current = hub_user if name == 'hub_user' else getattr(cached, name)
+
+        if value != current:
+            return None
+
+    return _copy_room(cached)
+
+
+def cache_room(hub, room, value, namespace=''):
+    """
+    Store the room in the cache — if the cache is turned on.
+    """
+    if config.KABELWERK_CACHE is not None:
+        config.KABELWERK_CACHE.set(
+            f'{namespace}room:{hub}:{room}', _copy_room(value),
+        )
+
+
+def _copy_room(room):
+    """
+    Return a copy of the room with its own attributes dict, so that the dicts
+    handed out to the callers and the dicts in the cache do not affect each
+    other when mutated.
+    """
+    return room._replace(attributes=copy.deepcopy(room.attributes))
@@ -12,6 +12,197 @@ The API token to authenticate the requests to the Kabelwerk API with.
 """
 KABELWERK_API_TOKEN = os.getenv('KABELWERK_API_TOKEN', '')
 
+"""
+The maximum number of connections to the Kabelwerk backend to keep open in the
+connection pool. Only read when the pool is (re)created.
+"""
+KABELWERK_POOL_SIZE = int(os.getenv('KABELWERK_POOL_SIZE', '10'))
+
+"""
+Whether to keep the connections to the Kabelwerk backend open for reuse by
+subsequent requests.
+"""
+KABELWERK_KEEP_ALIVE = os.getenv('KABELWERK_KEEP_ALIVE', '1') != '0'
+
+"""
+The transport through which to send the HTTP requests to the Kabelwerk API:
+'requests' (the default) or 'urllib3', which skips the layers that requests
+adds on top of urllib3 and is thus lighter on the CPU. Can also be set to a
+custom transport object — see kabelwerk.api.base.RequestsTransport.
+"""
+KABELWERK_TRANSPORT = os.getenv('KABELWERK_TRANSPORT', 'requests')
+
+"""
+The number of seconds to wait for a connection to the Kabelwerk backend to be
+established before giving up on an attempt at an API call.
+"""
+KABELWERK_CONNECT_TIMEOUT = float(
+    os.getenv('KABELWERK_CONNECT_TIMEOUT', '2')
+)
+
+"""
+The number of seconds to wait for the Kabelwerk backend to send data — e.g. the
+response to an API call — before giving up on an attempt at an API call.
+"""
+KABELWERK_READ_TIMEOUT = float(os.getenv('KABELWERK_READ_TIMEOUT', '2'))
+
+"""
+The per-endpoint timeouts overriding the two above, as a dict mapping an HTTP
+method or an endpoint prefix to a timeout in seconds or a (connect, read) tuple
+— e.g. {'POST': 5, '/hubs/{hub}/rooms': (1, 3)}. An endpoint prefix takes
+precedence over a method, and a longer prefix over a shorter one. Empty by
+default.
+"""
+KABELWERK_TIMEOUTS = {}
+
+"""
+The named clients for talking to several Kabelwerk backends, as a dict mapping
+a name to a dict of the arguments of kabelwerk.api.Client — e.g. {'acme':
+{'url': 'acme.kabelwerk.io', 'api_token': '...'}}. The clients are created on
+first use by kabelwerk.api.client.get_client. Empty by default.
+"""
+KABELWERK_CLIENTS = {}
+
+"""
+The maximum number of attempts to make for an API call failing because of a
+transient error. Set to 1 in order to turn off retrying.
+"""
+KABELWERK_MAX_ATTEMPTS = int(os.getenv('KABELWERK_MAX_ATTEMPTS', '3'))
+
+"""
+The base number of seconds for the exponential backoff between retries.
+"""
+KABELWERK_RETRY_BACKOFF = float(os.getenv('KABELWERK_RETRY_BACKOFF', '0.1'))
+
+"""
+The maximum number of seconds to wait before retrying an API call.
+"""
+KABELWERK_RETRY_MAX_BACKOFF = float(
+    os.getenv('KABELWERK_RETRY_MAX_BACKOFF', '2')
+)
+
+"""
+The client-side rate limits to keep the API calls under, as a dict mapping an
+HTTP method or an endpoint prefix to a rate in calls per second or a (rate,
+burst) tuple — e.g. {'POST': 20, '/hubs/{hub}/rooms': (50, 100)}. API calls
+exceeding the limits wait for their turn. Empty by default.
+"""
+KABELWERK_RATE_LIMITS = {}
+
+"""
+The number of consecutive connection or server errors after which the circuit
+breaker opens and API calls start failing fast. Set to 0 (the default) in
+order to turn off the circuit breaker.
+"""
+KABELWERK_BREAKER_THRESHOLD = int(
+    os.getenv('KABELWERK_BREAKER_THRESHOLD', '0')
+)
+
+"""
+The number of seconds within which the consecutive errors have to occur in
+order to open the circuit breaker.
+"""
+KABELWERK_BREAKER_WINDOW = float(os.getenv('KABELWERK_BREAKER_WINDOW', '60'))
+
+"""
+The number of seconds after which an open circuit breaker lets a probe request
+through in order to check whether the Kabelwerk backend has recovered.
+"""
+KABELWERK_BREAKER_RECOVERY_TIME = float(
+    os.getenv('KABELWERK_BREAKER_RECOVERY_TIME', '10')
+)
+
+"""
+Whether to include the request and response payloads in the log entries of the
+API calls. If turned off, only the method, path, status, and elapsed time of
+each call are logged.
+"""
+KABELWERK_LOG_PAYLOADS = os.getenv('KABELWERK_LOG_PAYLOADS', '1') != '0'
+
+"""
+The maximum number of characters of a payload to include in a log entry; the
+rest is cut off. Set to 0 in order to log the payloads in full.
+"""
+KABELWERK_LOG_MAX_LENGTH = int(os.getenv('KABELWERK_LOG_MAX_LENGTH', '1000'))
+
+"""
+The payload fields whose values should be replaced with a placeholder in the
+log entries — by default the users' names and the messages' texts. The API
+token is always redacted.
+"""
+KABELWERK_LOG_REDACTED_FIELDS = [
+    field for field in os.getenv(
+        'KABELWERK_LOG_REDACTED_FIELDS', 'name,text',
+    ).split(',')
+    if field
+]
+
+"""
+The JSON codec to use for the request and response bodies, as a (dumps, loads)
+pair of functions. If None (the default), orjson is used if it is installed and
+the standard library's json module otherwise.
+"""
+KABELWERK_JSON_CODEC = None
+
+"""
+Whether to record the counts and durations of the API calls in the metrics
+registry — see kabelwerk.api.metrics.
+"""
+KABELWERK_METRICS = os.getenv('KABELWERK_METRICS', '1') != '0'
+
+"""
+The cache backend in which to keep the users and rooms returned by the API, so
+that updates which would not change anything can be skipped — e.g. an instance
+of kabelwerk.cache.LocalCache or kabelwerk.cache.DjangoCache. If None (the
+default), there is no caching.
+"""
+KABELWERK_CACHE = None
+
+"""
+Whether an API call identical to one already in flight should wait for the
+latter's result instead of sending a request of its own — see
+kabelwerk.api.singleflight. Off by default.
+"""
+KABELWERK_SINGLE_FLIGHT = os.getenv('KABELWERK_SINGLE_FLIGHT', '0') != '0'
+
+"""
+The number of seconds for which update_room_later buffers the changes to a room
+before merging them into a single update.
+"""
+KABELWERK_COALESCE_WINDOW = float(
+    os.getenv('KABELWERK_COALESCE_WINDOW', '0.05')
+)
+
+"""
+The number of worker threads making the API calls passed to dispatch. Only read
+when the dispatcher is (re)created.
+"""
+KABELWERK_DISPATCH_WORKERS = int(os.getenv('KABELWERK_DISPATCH_WORKERS', '4'))
+
+"""
+The maximum number of API calls waiting in the dispatcher's queue. Only read
+when the dispatcher is (re)created.
+"""
+KABELWERK_DISPATCH_QUEUE_SIZE = int(
+    os.getenv('KABELWERK_DISPATCH_QUEUE_SIZE', '1000')
+)
+
+"""
+What to do when an API call is dispatched while the dispatcher's queue is
+full: 'block' waits for a free slot, 'drop-oldest' cancels the oldest queued
+call, and 'raise' raises QueueFullError. Only read when the dispatcher is
+(re)created.
+"""
+KABELWERK_DISPATCH_POLICY = os.getenv('KABELWERK_DISPATCH_POLICY', 'block')
+
+"""
+The maximum number of seconds to wait at interpreter shutdown for the queued
+API calls to be made; the ones left after that are dropped.
+"""
+KABELWERK_DISPATCH_DRAIN_TIMEOUT = float(
+    os.getenv('KABELWERK_DISPATCH_DRAIN_TIMEOUT', '5')
+)
+
 
 # the compiled regex used to parse KABELWERK_URL
 _url_regex = re.compile(
@@ -20,19 +211,23 @@ _url_regex = re.compile(
 )
 
 
-def _parse_url():
+def _parse_url(url=None):
     """
-    Parse KABELWERK_URL and return its scheme, host, and path.
+    Parse the given Kabelwerk URL — KABELWERK_URL by default — and return its
+    scheme, host, and path.
 
     We use a regex instead of urllib.parse.urlparse or urllib3.util.parse_url
     because these are too permissive and do not do any validation.
 
     Helper for the get_*_url functions below.
     """
-    match = _url_regex.match(KABELWERK_URL)
+    if url is None:
+        url = KABELWERK_URL
+
+    match = _url_regex.match(url)
 
     if not match:
-        raise ValueError(f'{KABELWERK_URL} is not a valid Kabelwerk URL.')
+        raise ValueError(f'{url} is not a valid Kabelwerk URL.')
 
     return (
         match['scheme'].lower().strip(':/') if match['scheme'] else '',
@@ -41,18 +236,29 @@ def _parse_url():
     )
 
 
-def get_socket_url():
+def get_socket_url(url=None):
     """
-    Return the websocket URL.
+    Return the websocket URL of the given Kabelwerk URL — KABELWERK_URL by
+    default.
+
+    If the URL includes a socket path (e.g. wss://kabelwerk.io/socket/hub) this
+    is kept, otherwise the private API socket path is used.
     """
-    raise NotImplementedError
+    scheme, host, path = _parse_url(url)
+
+    scheme = 'ws' if scheme in ['http', 'ws'] else 'wss'
+
+    if not path.startswith('socket'):
+        path = 'socket/api'
+
+    return f'{scheme}://{host}/{path.rstrip("/")}/websocket'
 
 
-def get_api_url():
+def get_api_url(url=None):
     """
-    Return the API URL.
+    Return the API URL of the given Kabelwerk URL — KABELWERK_URL by default.
     """
-    scheme, host, _ = _parse_url()
+    scheme, host, _ = _parse_url(url)
 
     scheme = 'http' if scheme in ['http', 'ws'] else 'https'
 
@@ -14,7 +14,8 @@ class ConnectionError(KabelwerkException):
     ----------
 
     request
-        The failed request.
+        The failed request — or None if the error did not occur while making
+        an HTTP request, e.g. on the websocket.
 
     cause
         The underlying error.
@@ -22,10 +23,61 @@ class ConnectionError(KabelwerkException):
     """
 
     def __init__(self, error):
-        self.request = error.request
+        self.request = getattr(error, 'request', None)
         self.cause = error
 
 
+class CircuitOpenError(ConnectionError):
+    """
+    Raised without sending a request when the circuit breaker is open, i.e.
+    after too many consecutive failures to reach the Kabelwerk backend.
+
+    A subclass of ConnectionError, so that it is handled the same way.
+
+
+    Attributes
+    ----------
+
+    request
+        Always None, as no request is sent.
+
+    cause
+        The error which last tripped the circuit breaker — if such.
+
+    """
+
+    def __init__(self, cause=None):
+        self.request = None
+        self.cause = cause
+
+
+class DeadlineExceededError(ConnectionError):
+    """
+    Raised when an API call cannot be completed within the time left until the
+    deadline set with kabelwerk.api.deadline — either before sending the
+    request or when the request times out because of the deadline.
+
+    A subclass of ConnectionError, so that it is handled the same way.
+
+
+    Attributes
+    ----------
+
+    request
+        The timed out request — or None if the deadline had passed before
+        sending it.
+
+    cause
+        The underlying timeout error — or None if the deadline had passed
+        before sending the request.
+
+    """
+
+    def __init__(self, cause=None):
+        self.request = getattr(cause, 'request', None)
+        self.cause = cause
+
+
 class AuthenticationError(KabelwerkException):
     """
     Raised when the authentication token is rejected by the Kabelwerk backend.
@@ -35,7 +87,8 @@ class AuthenticationError(KabelwerkException):
     ----------
 
     request
-        The failed request.
+        The failed request — or None if the token was rejected when opening
+        the websocket.
 
     response
         The Kabelwerk backend's response.
@@ -43,7 +96,7 @@ class AuthenticationError(KabelwerkException):
     """
 
     def __init__(self, response):
-        self.request = response.request
+        self.request = getattr(response, 'request', None)
         self.response = response
 
 
@@ -118,3 +171,43 @@ class ServerError(KabelwerkException):
     def __init__(self, response):
         self.request = response.request
         self.response = response
+
+
+class ChannelError(KabelwerkException):
+    """
+    Raised when the Kabelwerk backend rejects joining a websocket channel or a
+    message pushed to a channel.
+
+
+    Attributes
+    ----------
+
+    topic
+        The topic of the channel.
+
+    response
+        The Kabelwerk backend's response payload.
+
+    """
+
+    def __init__(self, topic, response):
+        self.topic = topic
+        self.response = response
+
+
+class QueueFullError(KabelwerkException):
+    """
+    Raised when an API call cannot be dispatched in the background because the
+    dispatcher's queue is full.
+
+
+    Attributes
+    ----------
+
+    max_size
+        The maximum number of calls in the dispatcher's queue.
+
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
@@ -0,0 +1,641 @@
+"""
+A fake Kabelwerk backend for load tests and CI, which serves the endpoints used
+by the SDK from in-memory state — with the same payloads and error shapes as
+the real backend — and can inject latency and faults.
+
+Run it as a local server:
+
+    python -m kabelwerk.fake --latency lognormal:0.02,0.5 --error-rate 0.01
+
+and point the SDK at it with KABELWERK_URL=http://localhost:4000 and
+KABELWERK_API_TOKEN=fake-token. Or start it from the tests:
+
+    with FakeServer(latency=fixed(0.01)) as server:
+        config.KABELWERK_URL = server.url
+        ...
+"""
+
+import argparse
+from datetime import datetime, timezone
+import html
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import math
+import random
+import re
+import socket
+import threading
+import time
+from urllib.parse import parse_qsl
+
+from kabelwerk.utils import parse_datetime
+
+
+"""
+the backend
+"""
+
+
+class FakeKabelwerk:
+    """
+    The in-memory state and the request handling of the fake backend,
+    independent of the transport.
+
+
+    Arguments
+    ---------
+
+    token
+        The API token which the requests have to carry.
+
+    hubs
+        The slugs of the hubs which exist. The first one is also the hub
+        addressed by '_'.
+
+    """
+
+    def __init__(self, *, token='fake-token', hubs=('section9',)):
+        self.token = token
+        self.hubs = list(hubs)
+
+        # key → {'id', 'key', 'name', 'hub'}
+        self.users = {}
+
+        # (hub, end user key) → {'archived', 'attributes', 'hub_user', 'id'}
+        self.rooms = {}
+
+        # (room id) → [message dicts]
+        self.messages = {}
+
+        # idempotency key → (status, payload)
+        self.idempotent_responses = {}
+
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def handle(self, method, path, headers, body):
+        """
+        Handle a request and return a (status, payload) tuple; the payload is
+        None for empty responses.
+        """
+        if headers.get('Kabelwerk-Token') != self.token:
+            return 401, {'errors': {'detail': 'Unauthorized'}}
+
+        path, _, query = path.partition('?')
+
+        try:
+            params = json.loads(body) if body else {}
+        except ValueError:
+            return 400, {'errors': {'detail': ['is not valid JSON']}}
+
+        if not isinstance(params, dict):
+            return 400, {'errors': {'detail': ['is not a JSON object']}}
+
+        # the list endpoints take their params in the query string
+        params.update(parse_qsl(query))
+
+        for route_method, regex, handler in ROUTES:
+            match = regex.match(path)
+
+            if match and route_method == method:
+                break
+        else:
+            return 404, {'errors': {'detail': 'Not Found'}}
+
+        idempotency_key = headers.get('Idempotency-Key')
+
+        with self._lock:
+            if idempotency_key in self.idempotent_responses:
+                return self.idempotent_responses[idempotency_key]
+
+            response = handler(self, params, **match.groupdict())
+
+            if idempotency_key:
+                self.idempotent_responses[idempotency_key] = response
+
+        return response
+
+    # users
+
+    def create_user(self, params):
+        errors = self._validate(params, ['key', 'name'])
+
+        if params.get('key') in self.users:
+            errors.setdefault('key', []).append('has already been taken')
+
+        if errors:
+            return 400, {'errors': errors}
+
+        hub = params.get('hub')
+        if hub is not None and self._resolve_hub(hub) is None:
+            return 400, {'errors': {'hub': ['does not exist']}}
+
+        user = self.users[params['key']] = {
+            'id': next(self._ids),
+            'key': params['key'],
+            'name': params['name'],
+            'hub': self._resolve_hub(hub) if hub else None,
+        }
+
+        return 201, self._render_user(user)
+
+    def update_user(self, params, key):
+        user = self.users.get(key)
+        if user is None:
+            return 404, {'errors': {'detail': 'Not Found'}}
+
+        errors = self._validate(params, ['name'])
+        if errors:
+            return 400, {'errors': errors}
+
+        user['name'] = params['name']
+
+        return 200, self._render_user(user)
+
+    def delete_user(self, params, key):
+        if self.users.pop(key, None) is None:
+            return 404, {'errors': {'detail': 'Not Found'}}
+
+        return 204, None
+
+    # rooms
+
+    def update_room(self, params, hub, room):
+        found = self._get_room(hub, room)
+        if found is None:
+            return 404, {'errors': {'detail': 'Not Found'}}
+
+        hub, state = found
+        errors = {}
+
+        if 'archived' in params and not isinstance(params['archived'], bool):
+            errors['archived'] = ['is invalid']
+
+        if 'attributes' in params and not isinstance(params['attributes'],
+                                                     dict):
+            errors['attributes'] = ['is invalid']
+
+        if params.get('hub_user') is not None:
+            hub_user = self.users.get(params['hub_user'])
+
+            if hub_user is None or hub_user['hub'] != hub:
+                errors['hub_user'] = ['does not exist']
+
+        if errors:
+            return 400, {'errors': errors}
+
+        for field in ['archived', 'attributes', 'hub_user']:
+            if field in params:
+                state[field] = params[field]
+
+        return 200, self._render_room(hub, room, state)
+
+    def post_message(self, params, hub, room):
+        found = self._get_room(hub, room)
+        if found is None:
+            return 404, {'errors': {'detail': 'Not Found'}}
+
+        hub, state = found
+
+        errors = self._validate(params, ['text', 'user'])
+
+        user = self.users.get(params.get('user'))
+        if 'user' not in errors and (
+            user is None or (user['key'] != room and user['hub'] != hub)
+        ):
+            errors['user'] = ['does not exist']
+
+        if errors:
+            return 400, {'errors': errors}
+
+        now = _now()
+        message = {
+            'html': f'<p>{html.escape(params["text"])}</p>',
+            'id': next(self._ids),
+            'inserted_at': now,
+            'room_id': state['id'],
+            'text': params['text'],
+            'type': 'text',
+            'updated_at': now,
+            'upload': None,
+            'user': self._render_user(user),
+        }
+
+        self.messages.setdefault(state['id'], []).append(message)
+
+        return 201, message
+
+    def list_rooms(self, params, hub):
+        hub = self._resolve_hub(hub)
+        if hub is None:
+            return 404, {'errors': {'detail': 'Not Found'}}
+
+        rooms = sorted(
+            ((room, state) for (room_hub, room), state in self.rooms.items()
+             if room_hub == hub),
+            key=lambda pair: pair[1]['id'],
+        )
+
+        return self._paginate(
+            rooms, params, lambda pair: pair[1]['id'],
+            lambda pair: self._render_room(hub, *pair),
+        )
+
+    def list_messages(self, params, hub, room):
+        found = self._get_room(hub, room)
+        if found is None:
+            return 404, {'errors': {'detail': 'Not Found'}}
+
+        messages = self.messages.get(found[1]['id'], [])
+
+        if params.get('since'):
+            try:
+                since = parse_datetime(params['since'])
+                messages = [
+                    message for message in messages
+                    if parse_datetime(message['inserted_at']) >= since
+                ]
+            except (TypeError, ValueError):
+                return 400, {'errors': {'since': ['is invalid']}}
+
+        return self._paginate(
+            messages, params, lambda message: message['id'], dict,
+        )
+
+    # helpers
+
+    def _validate(self, params, required):
+        errors = {}
+
+        for field in required:
+            value = params.get(field)
+
+            if value is None or (isinstance(value, str) and not value.strip()):
+                errors[field] = ["can't be blank"]
+            elif not isinstance(value, str):
+                errors[field] = ['is invalid']
+
+        return errors
+
+    def _resolve_hub(self, hub):
+        if hub == '_':
+            return self.hubs[0] if self.hubs else None
+
+        return hub if hub in self.hubs else None
+
+    def _get_room(self, hub, room):
+        """
+        Return the (hub slug, room state) pair of the given end user's room
+        in the given hub — or None if there is no such room.
+
+        Each end user has a room in each hub, created on first access.
+        """
+        hub = self._resolve_hub(hub)
+        user = self.users.get(room)
+
+        if hub is None or user is None or user['hub'] is not None:
+            return None
+
+        state = self.rooms.get((hub, room))
+        if state is None:
+            state = self.rooms[(hub, room)] = {
+                'archived': False,
+                'attributes': {},
+                'hub_user': None,
+                'id': next(self._ids),
+            }
+
+        return hub, state
+
+    def _paginate(self, items, params, get_cursor, render):
+        """
+        Return the page of the items following the cursor in the params, with
+        the cursor of the next page — or an error response.
+        """
+        try:
+            limit = int(params.get('limit', 100))
+            after = int(params['cursor']) if 'cursor' in params else None
+        except ValueError:
+            return 400, {'errors': {'detail': ['is not a valid page']}}
+
+        if not 1 <= limit <= 100:
+            return 400, {'errors': {'limit': ['is invalid']}}
+
+        if after is not None:
+            items = [item for item in items if get_cursor(item) > after]
+
+        page = items[:limit]
+        more = len(items) > limit
+
+        return 200, {
+            'data': [render(item) for item in page],
+            'next': str(get_cursor(page[-1])) if more else None,
+        }
+
+    def _render_user(self, user):
+        return {'id': user['id'], 'key': user['key'], 'name': user['name']}
+
+    def _render_room(self, hub, room, state):
+        hub_user = self.users.get(state['hub_user'] or '')
+
+        return {
+            'archived': state['archived'],
+            'attributes': state['attributes'],
+            'hub_user': self._render_user(hub_user) if hub_user else None,
+            'id': state['id'],
+            'user': self._render_user(self.users[room]),
+        }
+
+
+# (method, path regex, handler)
+ROUTES = [
+    ('POST', re.compile(r'^/api/users$'), FakeKabelwerk.create_user),
+    ('PATCH', re.compile(r'^/api/users/(?P<key>[^/]+)$'),
+     FakeKabelwerk.update_user),
+    ('DELETE', re.compile(r'^/api/users/(?P<key>[^/]+)$'),
+     FakeKabelwerk.delete_user),
+    ('GET', re.compile(r'^/api/hubs/(?P<hub>[^/]+)/rooms$'),
+     FakeKabelwerk.list_rooms),
+    ('PATCH', re.compile(r'^/api/hubs/(?P<hub>[^/]+)/rooms/(?P<room>[^/]+)$'),
+     FakeKabelwerk.update_room),
+    ('GET', re.compile(
+        r'^/api/hubs/(?P<hub>[^/]+)/rooms/(?P<room>[^/]+)/messages$'
+    ), FakeKabelwerk.list_messages),
+    ('POST', re.compile(
+        r'^/api/hubs/(?P<hub>[^/]+)/rooms/(?P<room>[^/]+)/messages$'
+    ), FakeKabelwerk.post_message),
+]
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+"""
+latency distributions
+"""
+
+
+def fixed(seconds):
+    """Return a latency distribution always returning the given seconds."""
+    return lambda rng: seconds
+
+
+def uniform(low, high):
+    """Return a latency distribution uniform between low and high seconds."""
+    return lambda rng: rng.uniform(low, high)
+
+
+def exponential(mean):
+    """Return an exponential latency distribution with the given mean."""
+    return lambda rng: rng.expovariate(1 / mean)
+
+
+def lognormal(median, sigma):
+    """
+    Return a log-normal latency distribution with the given median and shape
+    — the usual model of service latencies, with a long tail.
+    """
+    return lambda rng: rng.lognormvariate(math.log(median), sigma)
+
+
+def parse_latency(spec):
+    """
+    Parse a latency distribution from the command line, e.g. 'fixed:0.01',
+    'uniform:0.005,0.05', 'exponential:0.02', or 'lognormal:0.02,0.5'.
+    """
+    name, _, args = spec.partition(':')
+    distributions = {
+        'fixed': fixed,
+        'uniform': uniform,
+        'exponential': exponential,
+        'lognormal': lognormal,
+    }
+
+    if name not in distributions:
+        raise ValueError(f'Unknown latency distribution: {name!r}.')
+
+    return distributions[name](*(float(arg) for arg in args.split(',')))
+
+
+"""
+the server
+"""
+
+
+class FakeServer:
+    """
+    Serves a FakeKabelwerk over HTTP on localhost in a background thread,
+    injecting latency and faults. Use as a context manager.
+
+
+    Arguments
+    ---------
+
+    backend
+        The FakeKabelwerk to serve. A new one is created if None.
+
+    port
+        The port to listen on — 0 to pick a free one.
+
+    latency
+        A latency distribution, e.g. lognormal(0.02, 0.5), or None.
+
+    error_rate
+        The probability of answering a request with a 500, 502, or 503.
+
+    drop_rate
+        The probability of closing the connection without answering.
+
+    burst
+        An (interval, duration) pair: in the first duration seconds of every
+        interval seconds, all requests are answered with a 429 and a
+        Retry-After header. None for no bursts.
+
+    seed
+        The seed of the random number generator, for reproducible faults.
+
+    """
+
+    def __init__(self, backend=None, *, host='127.0.0.1', port=0,
+                 latency=None, error_rate=0, drop_rate=0, burst=None,
+                 seed=None):
+        self.backend = backend or FakeKabelwerk()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.burst = burst
+
+        self.random = random.Random(seed)
+        self.started_at = time.monotonic()
+
+        self.counters = {'requests': 0, 'errors': 0, 'drops': 0, 'bursts': 0}
+        """The numbers of requests received and faults injected."""
+
+        self._lock = threading.Lock()
+
+        self.server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self.server.daemon_threads = True
+
+        host, port = self.server.server_address[:2]
+        self.url = f'http://{host}:{port}'
+        """The URL to set KABELWERK_URL to."""
+
+    def __enter__(self):
+        self.start()
+
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self.started_at = time.monotonic()
+
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_fault(self):
+        """
+        Decide which fault — if any — to inject into the next request and
+        return 'drop', 'error', 'burst', or None.
+        """
+        with self._lock:
+            return self._get_fault()
+
+    def _get_fault(self):
+        self.counters['requests'] += 1
+
+        if self.burst:
+            interval, duration = self.burst
+            if (time.monotonic() - self.started_at) % interval < duration:
+                self.counters['bursts'] += 1
+                return 'burst'
+
+        roll = self.random.random()
+
+        if roll < self.drop_rate:
+            self.counters['drops'] += 1
+            return 'drop'
+
+        if roll < self.drop_rate + self.error_rate:
+            self.counters['errors'] += 1
+            return 'error'
+
+        return None
+
+
+def _make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        # send the headers and the body of each response in one go, as
+        # otherwise the body waits for the client's delayed ACK
+        wbufsize = -1
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            self.respond()
+
+        def do_POST(self):
+            self.respond()
+
+        def do_PATCH(self):
+            self.respond()
+
+        def do_DELETE(self):
+            self.respond()
+
+        def respond(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+
+            if server.latency:
+                time.sleep(max(0, server.latency(server.random)))
+
+            fault = server.get_fault()
+            extra_headers = {}
+
+            if fault == 'drop':
+                self.close_connection = True
+                self.connection.shutdown(socket.SHUT_RDWR)
+                return
+
+            if fault == 'error':
+                status = server.random.choice([500, 502, 503])
+                payload = {'errors': {'detail': 'Internal Server Error'}}
+            elif fault == 'burst':
+                interval, duration = server.burst
+                elapsed = (time.monotonic() - server.started_at) % interval
+                status = 429
+                payload = {'errors': {'detail': 'Too Many Requests'}}
+                extra_headers['Retry-After'] = str(
+                    math.ceil(duration - elapsed),
+                )
+            else:
+                status, payload = server.backend.handle(
+                    self.command, self.path, self.headers, body,
+                )
+
+            data = json.dumps(payload).encode() if payload is not None else b''
+
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in extra_headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m kabelwerk.fake',
+        description='Run a fake Kabelwerk backend.',
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4000)
+    parser.add_argument('--token', default='fake-token',
+                        help='the API token to accept')
+    parser.add_argument('--hub', action='append', dest='hubs',
+                        help='the slug of a hub; can be repeated')
+    parser.add_argument('--latency', type=parse_latency,
+                        help='e.g. fixed:0.01 or lognormal:0.02,0.5')
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--drop-rate', type=float, default=0)
+    parser.add_argument('--burst', metavar='INTERVAL,DURATION',
+                        type=lambda value: tuple(map(float, value.split(','))),
+                        help='answer all requests with 429 for DURATION '
+                             'seconds every INTERVAL seconds')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    backend = FakeKabelwerk(token=args.token, hubs=args.hubs or ['section9'])
+    server = FakeServer(
+        backend, host=args.host, port=args.port, latency=args.latency,
+        error_rate=args.error_rate, drop_rate=args.drop_rate,
+        burst=args.burst, seed=args.seed,
+    )
+
+    print(f'Serving a fake Kabelwerk backend at {server.url}')
+
+    try:
+        server.started_at = time.monotonic()
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
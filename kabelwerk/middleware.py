@@ -0,0 +1,34 @@
+"""
+Django middleware for the Kabelwerk SDK.
+
+This module assumes that you have Django installed.
+"""
+
+from django.conf import settings
+
+from .api.timeouts import deadline
+
+
+class DeadlineMiddleware:
+    """
+    Set a deadline for the Kabelwerk API calls made while handling each
+    request, so that they cannot push the response past the timeout of your
+    gateway or load balancer.
+
+    The deadline is KABELWERK_REQUEST_DEADLINE seconds (defaults to 5) from
+    the moment the request reaches the middleware — so put it near the top of
+    your MIDDLEWARE setting. Set the setting to None in order to turn off the
+    middleware without removing it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        self.seconds = getattr(settings, 'KABELWERK_REQUEST_DEADLINE', 5)
+
+    def __call__(self, request):
+        if self.seconds is None:
+            return self.get_response(request)
+
+        with deadline(self.seconds):
+            return self.get_response(request)
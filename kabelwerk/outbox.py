@@ -0,0 +1,337 @@
+"""
+A durable outbox for messages, backed by an SQLite database on the local disk.
+
+Instead of posting a message right away — and losing it if the Kabelwerk
+backend cannot be reached — the message is first appended to the outbox,
+which survives process restarts. A delivery worker then posts the messages in
+the order in which they were appended to each room, retrying on failure, with
+each message carrying the same idempotency key on every attempt. Delivery is
+thus at least once, and exactly once as far as the backend's idempotency keys
+allow.
+
+Only one process at a time should deliver the messages of an outbox file,
+although any number of processes can append to it.
+"""
+
+from contextlib import contextmanager
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+from kabelwerk import config
+from kabelwerk.api import post_message
+from kabelwerk.exceptions import DoesNotExist, ValidationError
+from kabelwerk.utils import run_concurrently
+
+
+logger = logging.getLogger('kabelwerk.outbox')
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hub TEXT NOT NULL,
+    room TEXT NOT NULL,
+    user TEXT NOT NULL,
+    text TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS messages_room ON messages (hub, room, id)
+    WHERE NOT failed;
+'''
+
+
+class Outbox:
+    """
+    A durable outbox for messages stored in the SQLite database at the given
+    path — which is created if it does not exist.
+
+
+    Arguments
+    ---------
+
+    path
+        The path to the SQLite database file.
+
+    batch_size
+        The maximum number of messages to post in one delivery round.
+
+    retry_backoff
+        The base number of seconds for the exponential backoff (with full
+        jitter) between delivery attempts of a message.
+
+    retry_max_backoff
+        The maximum number of seconds between delivery attempts of a message.
+
+    poll_interval
+        The number of seconds for which the delivery worker sleeps when there
+        is nothing to deliver.
+
+
+    Examples
+    --------
+
+    >>> outbox = Outbox('/var/lib/myapp/kabelwerk.sqlite3')
+    >>> outbox.start()
+    >>> outbox.post_message(room='kusanagi', user='batou', text='Hello!')
+    1
+    >>> outbox.depth, outbox.age
+    (1, 0.002)
+    >>> outbox.stop()
+
+    """
+
+    def __init__(self, path, *, batch_size=100, retry_backoff=1,
+                 retry_max_backoff=60, poll_interval=1):
+        self.path = path
+        self.batch_size = batch_size
+        self.retry_backoff = retry_backoff
+        self.retry_max_backoff = retry_max_backoff
+        self.poll_interval = poll_interval
+
+        self._connection = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False,
+        )
+        self._lock = threading.Lock()
+
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode = WAL')
+            self._connection.execute('PRAGMA synchronous = FULL')
+            self._connection.execute('PRAGMA busy_timeout = 5000')
+            self._connection.executescript(SCHEMA)
+
+        self._thread = None
+        self._stopping = threading.Event()
+
+    # appending
+
+    def post_message(self, *, hub='_', room, user, text):
+        """
+        Append a message to the outbox and return its ID in the outbox.
+
+        Takes the same arguments as kabelwerk.api.post_message. When this
+        returns, the message is safely on disk.
+        """
+        return self.post_messages([{
+            'hub': hub,
+            'room': room,
+            'user': user,
+            'text': text,
+        }])[0]
+
+    def post_messages(self, messages):
+        """
+        Append many messages to the outbox in a single transaction and return
+        the list of their IDs in the outbox.
+
+        The messages are dicts with the arguments of post_message.
+        """
+        now = time.time()
+
+        with self._transaction() as cursor:
+            ids = []
+
+            for message in messages:
+                cursor.execute(
+                    'INSERT INTO messages'
+                    ' (hub, room, user, text, idempotency_key, created_at)'
+                    ' VALUES (?, ?, ?, ?, ?, ?)',
+                    (message.get('hub', '_'), message['room'],
+                     message['user'], message['text'], str(uuid.uuid4()),
+                     now),
+                )
+                ids.append(cursor.lastrowid)
+
+        return ids
+
+    # delivering
+
+    def deliver(self):
+        """
+        Post the messages which are due — i.e. the oldest message of each room
+        which is not waiting for a retry — and return the number of messages
+        posted.
+
+        The messages of different rooms are posted concurrently, but those of
+        the same room are posted one at a time and in order: a message which
+        cannot be posted holds back the later messages in its room.
+
+        A message which is rejected as invalid or whose room does not exist is
+        marked as failed and is not retried; it can be found with
+        failed_messages.
+        """
+        with self._transaction() as cursor:
+            rows = cursor.execute(
+                'SELECT id, hub, room, user, text, idempotency_key, attempts'
+                ' FROM messages WHERE id IN ('
+                '  SELECT MIN(id) FROM messages WHERE NOT failed'
+                '  GROUP BY hub, room'
+                ' ) AND next_attempt_at <= ? ORDER BY id LIMIT ?',
+                (time.time(), self.batch_size),
+            ).fetchall()
+
+        if not rows:
+            return 0
+
+        delivered, retried, failed = [], [], []
+
+        for row, result in run_concurrently(
+            self._post, rows, config.KABELWERK_POOL_SIZE,
+        ):
+            if not isinstance(result, Exception):
+                delivered.append((row[0],))
+            elif isinstance(result, (DoesNotExist, ValidationError)):
+                logger.error('message %d → failed: %r', row[0], result)
+                failed.append((repr(result), row[0]))
+            else:
+                delay = self._get_retry_delay(row[6] + 1)
+                logger.warning('message %d → retrying in %.2fs: %r',
+                               row[0], delay, result)
+                retried.append((time.time() + delay, repr(result), row[0]))
+
+        with self._transaction() as cursor:
+            cursor.executemany('DELETE FROM messages WHERE id = ?', delivered)
+            cursor.executemany(
+                'UPDATE messages SET failed = 1, attempts = attempts + 1,'
+                ' last_error = ? WHERE id = ?',
+                failed,
+            )
+            cursor.executemany(
+                'UPDATE messages SET attempts = attempts + 1,'
+                ' next_attempt_at = ?, last_error = ? WHERE id = ?',
+                retried,
+            )
+
+        return len(delivered)
+
+    def start(self):
+        """
+        Start the delivery worker in a background thread — if not started yet.
+        """
+        if self._thread is None:
+            self._stopping.clear()
+
+            self._thread = threading.Thread(
+                target=self._run, name='kabelwerk-outbox', daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stop the delivery worker, waiting for up to timeout seconds for its
+        current delivery round to finish.
+
+        The undelivered messages stay in the outbox until the next start.
+        """
+        thread, self._thread = self._thread, None
+
+        if thread is not None:
+            self._stopping.set()
+            thread.join(timeout)
+
+    def close(self):
+        """
+        Stop the delivery worker and close the database connection.
+        """
+        self.stop()
+
+        with self._lock:
+            self._connection.close()
+
+    # metrics
+
+    @property
+    def depth(self):
+        """The number of messages waiting to be delivered."""
+        return self._query_one(
+            'SELECT COUNT(*) FROM messages WHERE NOT failed',
+        )
+
+    @property
+    def age(self):
+        """The number of seconds since the oldest undelivered message was
+        appended — or 0 if there are no such messages."""
+        created_at = self._query_one(
+            'SELECT MIN(created_at) FROM messages WHERE NOT failed',
+        )
+
+        return time.time() - created_at if created_at is not None else 0
+
+    @property
+    def failed(self):
+        """The number of messages which failed and will not be retried."""
+        return self._query_one('SELECT COUNT(*) FROM messages WHERE failed')
+
+    def failed_messages(self):
+        """
+        Return a list of dicts with the messages which failed and will not be
+        retried, including their last_error.
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                'SELECT id, hub, room, user, text, attempts, last_error'
+                ' FROM messages WHERE failed ORDER BY id',
+            )
+            names = [column[0] for column in cursor.description]
+
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    # helpers
+
+    def _run(self):
+        """
+        Deliver the messages until stopped.
+
+        Runs in the background thread.
+        """
+        while not self._stopping.is_set():
+            try:
+                delivered = self.deliver()
+            except Exception:
+                logger.exception('delivery round failed')
+                delivered = 0
+
+            if not delivered:
+                self._stopping.wait(self.poll_interval)
+
+    def _post(self, row):
+        _, hub, room, user, text, idempotency_key, _ = row
+
+        return post_message(hub=hub, room=room, user=user, text=text,
+                            idempotency_key=idempotency_key)
+
+    def _get_retry_delay(self, attempt):
+        return random.uniform(0, min(
+            self.retry_max_backoff,
+            self.retry_backoff * 2 ** (attempt - 1),
+        ))
+
+    def _query_one(self, sql):
+        with self._lock:
+            return self._connection.execute(sql).fetchone()[0]
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Run a block of statements in an immediate transaction, holding the
+        lock of the connection.
+        """
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+
+            try:
+                yield self._connection.cursor()
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+
+            self._connection.execute('COMMIT')
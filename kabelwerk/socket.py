@@ -0,0 +1,542 @@
+"""
+An asyncio client for the Kabelwerk backend's websocket, which lets you receive
+new messages and room updates as they happen instead of polling for them.
+
+A single Socket multiplexes any number of channel subscriptions over one
+connection, sends heartbeats to keep the connection alive, and reconnects with
+backoff (rejoining all channels) whenever the connection is lost.
+
+This module assumes that you have websockets installed, which you can get with:
+pip install kabelwerk[socket]
+"""
+
+import asyncio
+import inspect
+import itertools
+import json
+import logging
+import random
+from urllib.parse import urlencode
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import InvalidStatus, WebSocketException
+
+from kabelwerk import __version__
+from kabelwerk.config import get_api_token, get_socket_url
+from kabelwerk.exceptions import (
+    AuthenticationError, ChannelError, ConnectionError, KabelwerkException,
+)
+
+
+logger = logging.getLogger('kabelwerk.socket')
+
+
+class Socket:
+    """
+    A connection to the Kabelwerk backend's websocket.
+
+
+    Arguments
+    ---------
+
+    heartbeat_interval
+        The number of seconds between two heartbeats. If a heartbeat is not
+        answered by the time the next one is due, the connection is considered
+        lost and is re-established.
+
+    reconnect_backoff
+        The base number of seconds for the exponential backoff (with full
+        jitter) between reconnection attempts.
+
+    reconnect_max_backoff
+        The maximum number of seconds to wait before a reconnection attempt.
+
+    timeout
+        The number of seconds to wait for the backend to reply to a join or a
+        push before raising a ConnectionError.
+
+    connect_attempts
+        The number of attempts at opening the connection which connect makes
+        before raising a ConnectionError. Once the connection has been opened,
+        it is re-established for as long as it takes.
+
+    client
+        The kabelwerk.api.Client whose URL and API token to connect with.
+        Optional, defaults to KABELWERK_URL and KABELWERK_API_TOKEN.
+
+
+    Examples
+    --------
+
+    >>> socket = Socket()
+    >>> await socket.connect()
+    >>> channel = await socket.join('room:42')
+    >>> channel.on('message_posted', print)
+    >>> ...
+    >>> await socket.disconnect()
+
+    """
+
+    def __init__(self, *, heartbeat_interval=30, reconnect_backoff=1,
+                 reconnect_max_backoff=30, timeout=10, connect_attempts=5,
+                 client=None):
+        self.client = client
+        self.connect_attempts = connect_attempts
+        self.heartbeat_interval = heartbeat_interval
+        self.reconnect_backoff = reconnect_backoff
+        self.reconnect_max_backoff = reconnect_max_backoff
+        self.timeout = timeout
+
+        self.channels = {}
+        """A dict mapping each joined topic to its Channel."""
+
+        self.url = None
+        """The websocket URL, set when connecting."""
+
+        self._websocket = None
+        self._connected = asyncio.Event()
+        self._task = None
+
+        self._refs = itertools.count(1)
+        self._replies = {}
+        self._heartbeat_ref = None
+
+        # keeps references to the tasks spawned by the socket
+        self._tasks = set()
+
+    @property
+    def connected(self):
+        """Whether the socket is currently connected."""
+        return self._websocket is not None
+
+    async def connect(self):
+        """
+        Open the connection and keep it open in the background until
+        disconnect is called.
+
+        Wait until the connection is established — retrying with backoff if
+        needed — and return.
+
+
+        Raises
+        ------
+
+        ValueError
+            If KABELWERK_URL or KABELWERK_API_TOKEN are not valid — unless
+            the socket has a client.
+
+        AuthenticationError
+            If the backend rejects the API token.
+
+        ConnectionError
+            If the connection cannot be opened within connect_attempts
+            attempts.
+
+        """
+        if self._task is None:
+            if self.client is None:
+                token, url = get_api_token(), get_socket_url()
+            else:
+                token, url = self.client.api_token, self.client.socket_url
+
+            query = urlencode({'token': token, 'vsn': '2.0.0'})
+            self.url = f'{url}?{query}'
+
+            self._task = asyncio.create_task(self._run())
+            self._task.add_done_callback(self._log_failure)
+
+        task = self._task
+        connected = asyncio.ensure_future(self._connected.wait())
+
+        try:
+            await asyncio.wait(
+                [connected, task], return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            connected.cancel()
+
+        if not self._connected.is_set() and task.done():
+            if self._task is task:
+                self._task = None
+
+            # raises the AuthenticationError or ConnectionError
+            task.result()
+
+    async def disconnect(self):
+        """
+        Close the connection and stop reconnecting.
+        """
+        task, self._task = self._task, None
+
+        if task is not None:
+            task.cancel()
+
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        for task in list(self._tasks):
+            task.cancel()
+
+    async def join(self, topic, params=None):
+        """
+        Join the channel with the given topic and return it.
+
+        The channel is automatically rejoined whenever the connection is
+        re-established. If the socket is not connected yet, the channel is
+        joined once it connects.
+
+
+        Raises
+        ------
+
+        ChannelError
+            If the backend rejects joining the channel.
+
+        ConnectionError
+            If the backend does not reply in time.
+
+        """
+        channel = self.channels.get(topic)
+
+        if channel is None:
+            channel = self.channels[topic] = Channel(self, topic, params or {})
+
+        if self.connected and not channel.joined:
+            try:
+                await channel._join()
+            except ChannelError:
+                self.channels.pop(topic, None)
+                raise
+
+        return channel
+
+    async def _run(self):
+        """
+        Keep the connection open, reconnecting with backoff when it is lost.
+
+        Raise AuthenticationError if the backend rejects the API token, and
+        ConnectionError if the first connect_attempts attempts at opening the
+        connection all fail.
+        """
+        attempt = 0
+        has_connected = False
+
+        url = self.url.split('?')[0]
+
+        while True:
+            try:
+                async with connect(
+                    self.url,
+                    user_agent_header=f'sdk-python/{__version__}',
+                ) as websocket:
+                    logger.info('%s → connected', url)
+
+                    attempt = 0
+                    has_connected = True
+                    await self._serve(websocket)
+
+                logger.warning('%s → disconnected', url)
+
+            except InvalidStatus as error:
+                if error.response.status_code in (401, 403):
+                    logger.error('%s → %s', url, error)
+                    raise AuthenticationError(error.response) from error
+
+                logger.warning('%s → %s', url, error)
+
+                if not has_connected and attempt + 1 >= self.connect_attempts:
+                    raise ConnectionError(error) from error
+
+            except (OSError, asyncio.TimeoutError,
+                    WebSocketException) as error:
+                logger.warning('%s → %s', url, error)
+
+                if not has_connected and attempt + 1 >= self.connect_attempts:
+                    raise ConnectionError(error) from error
+
+            delay = random.uniform(0, min(
+                self.reconnect_max_backoff,
+                self.reconnect_backoff * 2 ** attempt,
+            ))
+            attempt += 1
+
+            await asyncio.sleep(delay)
+
+    def _log_failure(self, task):
+        """
+        Log why the connection was given up on — so that the exception is
+        retrieved even if no connect call is waiting for it.
+
+        Helper for connect.
+        """
+        if not task.cancelled() and task.exception() is not None:
+            logger.error('%s → gave up: %r', self.url.split('?')[0],
+                         task.exception())
+
+    async def _serve(self, websocket):
+        """
+        Handle an established connection until it is closed.
+
+        Helper for _run.
+        """
+        self._websocket = websocket
+        self._heartbeat_ref = None
+        self._connected.set()
+
+        for channel in self.channels.values():
+            self._spawn(channel._rejoin())
+
+        heartbeat = asyncio.create_task(self._heartbeat())
+
+        try:
+            async for data in websocket:
+                self._dispatch(data)
+
+        finally:
+            heartbeat.cancel()
+
+            self._websocket = None
+            self._connected.clear()
+
+            for channel in self.channels.values():
+                channel.joined = False
+
+            for future in self._replies.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(
+                        ConnectionResetError('The websocket was closed.'),
+                    ))
+
+            self._replies.clear()
+
+    async def _heartbeat(self):
+        """
+        Send a heartbeat every heartbeat_interval seconds and close the
+        connection if the previous one has not been answered.
+
+        Helper for _serve.
+        """
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+
+            if self._heartbeat_ref is not None:
+                logger.warning('heartbeat timeout → reconnecting')
+
+                await self._websocket.close()
+                return
+
+            self._heartbeat_ref = str(next(self._refs))
+
+            try:
+                await self._send(None, self._heartbeat_ref, 'phoenix',
+                                 'heartbeat', {})
+            except ConnectionError as error:
+                # the connection is lost, which _run deals with
+                logger.warning('heartbeat → %s', error.cause)
+                return
+
+    def _dispatch(self, data):
+        """
+        Handle a message received from the backend.
+
+        Helper for _serve.
+        """
+        try:
+            join_ref, ref, topic, event, payload = json.loads(data)
+        except ValueError:
+            logger.error('Could not decode a websocket message: %r', data)
+            return
+
+        if event == 'phx_reply':
+            if topic == 'phoenix' and ref == self._heartbeat_ref:
+                self._heartbeat_ref = None
+
+            future = self._replies.pop(ref, None)
+            if future is not None and not future.done():
+                future.set_result(payload)
+
+            return
+
+        channel = self.channels.get(topic)
+
+        if channel is None or (join_ref and join_ref != channel.join_ref):
+            return
+
+        if event == 'phx_error':
+            logger.warning('%s → channel error, rejoining', topic)
+
+            channel.joined = False
+            self._spawn(channel._rejoin())
+
+        elif event == 'phx_close':
+            channel.joined = False
+
+        else:
+            channel._trigger(event, payload)
+
+    async def _push(self, topic, event, payload, join_ref=None, join=False):
+        """
+        Send a message and wait for the backend's reply.
+
+        Helper for the Channel methods.
+        """
+        ref = str(next(self._refs))
+        if join:
+            join_ref = ref
+
+        future = asyncio.get_running_loop().create_future()
+        self._replies[ref] = future
+
+        try:
+            await self._send(join_ref, ref, topic, event, payload)
+            reply = await asyncio.wait_for(future, self.timeout)
+
+        except asyncio.TimeoutError as error:
+            raise ConnectionError(error)
+
+        finally:
+            self._replies.pop(ref, None)
+
+        if reply.get('status') != 'ok':
+            raise ChannelError(topic, reply.get('response'))
+
+        return join_ref, reply.get('response')
+
+    async def _send(self, join_ref, ref, topic, event, payload):
+        """
+        Encode and send a message.
+        """
+        if self._websocket is None:
+            raise ConnectionError(
+                ConnectionRefusedError('The websocket is not connected.'),
+            )
+
+        try:
+            await self._websocket.send(
+                json.dumps([join_ref, ref, topic, event, payload]),
+            )
+        except WebSocketException as error:
+            raise ConnectionError(error)
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        return task
+
+
+class Channel:
+    """
+    A channel subscription multiplexed over a Socket.
+
+    Do not instantiate directly — use Socket.join instead.
+    """
+
+    def __init__(self, socket, topic, params):
+        self.topic = topic
+        """The channel's topic, e.g. 'room:42'."""
+
+        self.params = params
+        """The params sent when joining the channel."""
+
+        self.joined = False
+        """Whether the channel is currently joined."""
+
+        self.join_ref = None
+
+        self._socket = socket
+        self._handlers = {}
+
+    def on(self, event, callback):
+        """
+        Register a callback for the given event.
+
+        The callback is called with the event's payload. It can be a plain
+        function or a coroutine function. Return the callback, so that this
+        can be used as a decorator factory.
+        """
+        self._handlers.setdefault(event, []).append(callback)
+
+        return callback
+
+    def off(self, event, callback=None):
+        """
+        Unregister a callback — or all callbacks — for the given event.
+        """
+        if callback is None:
+            self._handlers.pop(event, None)
+        elif callback in self._handlers.get(event, []):
+            self._handlers[event].remove(callback)
+
+    async def push(self, event, payload=None):
+        """
+        Push an event to the channel and return the backend's reply.
+
+
+        Raises
+        ------
+
+        ChannelError
+            If the backend rejects the event.
+
+        ConnectionError
+            If the socket is not connected or the backend does not reply in
+            time.
+
+        """
+        _, response = await self._socket._push(
+            self.topic, event, payload or {}, self.join_ref,
+        )
+
+        return response
+
+    async def leave(self):
+        """
+        Leave the channel and stop rejoining it on reconnect.
+        """
+        self._socket.channels.pop(self.topic, None)
+
+        if self.joined:
+            self.joined = False
+
+            try:
+                await self._socket._push(
+                    self.topic, 'phx_leave', {}, self.join_ref,
+                )
+            except KabelwerkException:
+                pass
+
+    async def _join(self):
+        self.join_ref, _ = await self._socket._push(
+            self.topic, 'phx_join', self.params, join=True,
+        )
+        self.joined = True
+
+        logger.info('%s → joined', self.topic)
+
+    async def _rejoin(self):
+        try:
+            await self._join()
+        except KabelwerkException as error:
+            logger.error('%s → could not rejoin: %r', self.topic, error)
+
+    def _trigger(self, event, payload):
+        for callback in list(self._handlers.get(event, [])):
+            try:
+                result = callback(payload)
+            except Exception:
+                logger.exception('%s → %s callback failed', self.topic, event)
+                continue
+
+            if inspect.isawaitable(result):
+                self._socket._spawn(self._await_callback(event, result))
+
+    async def _await_callback(self, event, awaitable):
+        try:
+            await awaitable
+        except Exception:
+            logger.exception('%s → %s callback failed', self.topic, event)
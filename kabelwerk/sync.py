@@ -0,0 +1,343 @@
+"""
+Mirror the users of your own database into Kabelwerk.
+
+The SyncEngine keeps a fingerprint (a hash of the name) and the hub of each
+user it has pushed to Kabelwerk in a local SQLite database. A sync streams
+through your users, compares each one with what is stored, and only makes the
+API calls which are needed: creating the new users, updating the changed ones,
+and — once the stream is exhausted — deleting the users which are gone.
+
+The hub of a user cannot be updated. A user whose hub has changed is reported
+as an error — unless the sync is told to delete and re-create such users, which
+also deletes their rooms and messages in Kabelwerk.
+
+Each user is marked as seen in the current run as soon as it is handled, so an
+interrupted sync can simply be started again: the run is resumed, and the
+users handled before the interruption are skipped without API calls.
+"""
+
+from hashlib import blake2b
+from itertools import islice
+import sqlite3
+import time
+from typing import NamedTuple
+
+from kabelwerk import config
+from kabelwerk.api import create_user, delete_user, update_user
+from kabelwerk.exceptions import DoesNotExist, ValidationError
+from kabelwerk.utils import run_concurrently
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS users (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    hub TEXT,
+    seen INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    finished_at REAL
+);
+'''
+
+
+class SyncResult(NamedTuple):
+    created: int
+    """The number of users created."""
+
+    updated: int
+    """The number of users updated, including those re-created in another
+    hub if the sync was told to."""
+
+    deleted: int
+    """The number of users deleted."""
+
+    unchanged: int
+    """The number of users skipped because they have not changed."""
+
+    errors: dict
+    """A dict mapping the key of each user which could not be synced to the
+    exception raised by the API call. These users are retried on the next
+    sync."""
+
+
+class SyncEngine:
+    """
+    Syncs a stream of users into Kabelwerk, keeping the fingerprints of the
+    synced users in the SQLite database at the given path — which is created
+    if it does not exist.
+
+
+    Arguments
+    ---------
+
+    path
+        The path to the SQLite database file.
+
+    concurrency
+        The maximum number of API calls to make at the same time. Defaults to
+        KABELWERK_POOL_SIZE.
+
+    batch_size
+        The number of users to look up and to checkpoint at a time.
+
+
+    Examples
+    --------
+
+    >>> engine = SyncEngine('/var/lib/myapp/kabelwerk-sync.sqlite3')
+    >>> engine.sync(
+    ...     (user.username, user.get_full_name(), None)
+    ...     for user in User.objects.iterator()
+    ... )
+    SyncResult(created=2, updated=40, deleted=1, unchanged=99957, errors={})
+
+    """
+
+    def __init__(self, path, *, concurrency=None, batch_size=500):
+        self.path = path
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+
+        self._connection = sqlite3.connect(path)
+        self._connection.execute('PRAGMA journal_mode = WAL')
+        self._connection.executescript(SCHEMA)
+
+    def sync(self, records, *, delete=True, recreate=False):
+        """
+        Sync the given users into Kabelwerk and return a SyncResult.
+
+
+        Arguments
+        ---------
+
+        records
+            An iterable of (key, name, hub) tuples, one for each user which
+            should exist in Kabelwerk; hub is None for end users. It is
+            consumed lazily, so it can be e.g. a Django QuerySet.iterator().
+            If a key occurs more than once within a batch, the last record
+            wins.
+
+        delete
+            Whether to delete the previously synced users which are not among
+            the records. The deletes are only made if the records are consumed
+            without errors.
+
+        recreate
+            Whether to delete and create anew the users whose hub has changed,
+            as the hub of a user cannot be updated. This deletes their rooms
+            and messages in Kabelwerk too. If False (the default), such users
+            are left as they are and reported in the errors of the result,
+            with a ValueError.
+
+        """
+        run = self._start_run()
+        counts = {'create': 0, 'update': 0, 'delete': 0, 'unchanged': 0}
+        errors = {}
+
+        checkpoint, failed = [], []
+
+        for (action, key, details), result in run_concurrently(
+            self._apply,
+            self._diff(iter(records), run, counts, recreate),
+            self.concurrency or config.KABELWERK_POOL_SIZE,
+        ):
+            if isinstance(result, Exception):
+                errors[key] = result
+                failed.append((run, key))
+            else:
+                counts['update' if action == 'recreate' else action] += 1
+                checkpoint.append((key, result, details[2], run))
+
+            if len(checkpoint) + len(failed) >= self.batch_size:
+                self._save(checkpoint, failed)
+                checkpoint, failed = [], []
+
+        self._save(checkpoint, failed)
+
+        if delete:
+            keys = [row[0] for row in self._connection.execute(
+                'SELECT key FROM users WHERE seen != ?', (run,),
+            )]
+            deleted = []
+
+            for (_, key, _), result in run_concurrently(
+                self._apply,
+                (('delete', key, None) for key in keys),
+                self.concurrency or config.KABELWERK_POOL_SIZE,
+            ):
+                if isinstance(result, Exception):
+                    errors[key] = result
+                else:
+                    deleted.append((key,))
+
+            counts['delete'] = len(deleted)
+
+            with self._connection:
+                self._connection.executemany(
+                    'DELETE FROM users WHERE key = ?', deleted,
+                )
+
+        with self._connection:
+            self._connection.execute(
+                'UPDATE runs SET finished_at = ? WHERE id = ?',
+                (time.time(), run),
+            )
+
+        return SyncResult(
+            created=counts['create'],
+            updated=counts['update'],
+            deleted=counts['delete'],
+            unchanged=counts['unchanged'],
+            errors=errors,
+        )
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self._connection.close()
+
+    def _start_run(self):
+        """
+        Return the ID of the unfinished run — if such — or of a new one.
+        """
+        row = self._connection.execute(
+            'SELECT id FROM runs WHERE finished_at IS NULL'
+            ' ORDER BY id DESC LIMIT 1',
+        ).fetchone()
+
+        if row is not None:
+            return row[0]
+
+        with self._connection:
+            return self._connection.execute(
+                'INSERT INTO runs (started_at) VALUES (?)', (time.time(),),
+            ).lastrowid
+
+    def _diff(self, records, run, counts, recreate):
+        """
+        Yield an (action, key, details) tuple for each record which needs an
+        API call — or which is to be reported, if its hub has changed and
+        recreate is off — and mark the other records as seen.
+
+        Helper for sync.
+        """
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                return
+
+            # a key which occurs more than once is synced once, as its last
+            # record — otherwise its API calls would race each other
+            batch = {record[0]: record for record in batch}
+
+            stored = {
+                key: (fingerprint, hub)
+                for key, fingerprint, hub in self._connection.execute(
+                    'SELECT key, fingerprint, hub FROM users'
+                    ' WHERE key IN ({})'.format(', '.join('?' * len(batch))),
+                    list(batch),
+                )
+            }
+
+            unchanged = []
+
+            for key, name, hub in batch.values():
+                fingerprint = get_fingerprint(name)
+
+                if key not in stored:
+                    yield 'create', key, (fingerprint, name, hub)
+                elif stored[key][1] != hub:
+                    action = 'recreate' if recreate else 'reject'
+                    yield action, key, (fingerprint, name, hub)
+                elif stored[key][0] != fingerprint:
+                    yield 'update', key, (fingerprint, name, hub)
+                else:
+                    unchanged.append((run, key))
+
+            counts['unchanged'] += len(unchanged)
+
+            with self._connection:
+                self._connection.executemany(
+                    'UPDATE users SET seen = ? WHERE key = ?', unchanged,
+                )
+
+    def _apply(self, item):
+        """
+        Make the API call for an (action, key, details) tuple and return the
+        fingerprint to store — or the ValueError of a rejected hub change.
+
+        Runs in the pool of threads.
+        """
+        action, key, details = item
+
+        if action == 'delete':
+            try:
+                delete_user(key=key)
+            except DoesNotExist:
+                pass
+
+            return None
+
+        fingerprint, name, hub = details
+
+        if action == 'reject':
+            return ValueError((
+                f'The hub of the user {key} cannot be changed to {hub} '
+                'unless the sync is made with recreate=True.'
+            ))
+
+        if action == 'recreate':
+            # the hub of a user cannot be updated
+            try:
+                delete_user(key=key)
+            except DoesNotExist:
+                pass
+
+            create_user(key=key, name=name, hub=hub)
+
+        elif action == 'create':
+            try:
+                create_user(key=key, name=name, hub=hub)
+            except ValidationError as error:
+                # the user may exist already, e.g. if the fingerprints have
+                # been lost — in which case updating it is enough
+                try:
+                    update_user(key=key, name=name)
+                except DoesNotExist:
+                    raise error
+        else:
+            update_user(key=key, name=name)
+
+        return fingerprint
+
+    def _save(self, checkpoint, failed):
+        """
+        Store the fingerprints of the synced users, and mark the users which
+        could not be synced as seen — so that they are not deleted.
+
+        Helper for sync.
+        """
+        with self._connection:
+            self._connection.executemany(
+                'INSERT INTO users (key, fingerprint, hub, seen)'
+                ' VALUES (?, ?, ?, ?)'
+                ' ON CONFLICT (key) DO UPDATE SET'
+                '  fingerprint = excluded.fingerprint, hub = excluded.hub,'
+                '  seen = excluded.seen',
+                checkpoint,
+            )
+            self._connection.executemany(
+                'UPDATE users SET seen = ? WHERE key = ?', failed,
+            )
+
+
+def get_fingerprint(name):
+    """
+    Return the hash of the updatable fields of a user.
+    """
+    return blake2b(name.encode(), digest_size=16).hexdigest()
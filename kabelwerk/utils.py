@@ -1,4 +1,9 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+from inspect import signature
+from itertools import islice
+
+from kabelwerk.exceptions import KabelwerkException
 
 
 def parse_datetime(value):
@@ -12,3 +17,61 @@ def parse_datetime(value):
     except ValueError:
         value = value.replace('Z', '+00:00')
         return datetime.fromisoformat(value)
+
+
+def run_concurrently(function, items, concurrency):
+    """
+    Call the function with each of the items in a pool of threads and yield
+    (item, result) pairs in the order in which the calls complete.
+
+    The result is either the function's return value or the KabelwerkException
+    it raised — so that one failed call does not abort the rest. Other
+    exceptions are propagated.
+
+    At most `concurrency` calls are in flight at any time and the items are
+    consumed lazily, so the items can be an arbitrarily long iterator.
+    """
+    items = iter(items)
+
+    def call(item):
+        try:
+            return item, function(item)
+        except KabelwerkException as error:
+            return item, error
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = set()
+
+        try:
+            while True:
+                for item in islice(items, concurrency - len(pending)):
+                    pending.add(executor.submit(call, item))
+
+                if not pending:
+                    return
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    yield future.result()
+
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def check_arguments(function, row, **kwargs):
+    """
+    Return the TypeError which calling the function with the items of the
+    row (and the kwargs) as keyword arguments would raise — e.g. because of a
+    missing or an unexpected key — or None if the call would be valid.
+
+    Used by the bulk operations, so that a malformed row fails on its own
+    instead of aborting the whole batch.
+    """
+    try:
+        signature(function).bind(**row, **kwargs)
+    except TypeError as error:
+        return error
+
+    return None
@@ -0,0 +1,23 @@
+"""
+Django views exposing the state of the Kabelwerk SDK.
+
+This module assumes that you have Django installed.
+"""
+
+from django.http import HttpResponse
+
+from .api.metrics import render_prometheus
+
+
+def metrics(request):
+    """
+    Return the metrics of the API calls in the Prometheus text exposition
+    format.
+
+    The view does not check who is asking — restrict access to it as you do
+    for your other metrics endpoints.
+    """
+    return HttpResponse(
+        render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
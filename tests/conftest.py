@@ -1,10 +1,25 @@
 import logging
 
+import httpx
 import pytest
 import responses
 from responses.matchers import header_matcher
 
 from kabelwerk import __version__, config
+from kabelwerk.aio import base as aio_base
+
+
+@pytest.fixture(autouse=True)
+def restore_config():
+    settings = {
+        name: value for name, value in vars(config).items()
+        if name.startswith('KABELWERK_')
+    }
+
+    yield
+
+    for name, value in settings.items():
+        setattr(config, name, value)
 
 
 @pytest.fixture
@@ -47,7 +62,76 @@ def mock_response(api_url, api_token, mock_api):
     return function
 
 
+class AsyncAPIMock:
+    """
+    Stand-in for responses.RequestsMock for the httpx-based async API.
+
+    Requests which do not match any of the added responses fail with a
+    connection error, as they do with responses.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.responses = []
+
+    def add(self, method, url, headers, status, payload=None):
+        self.responses.append((method, url, headers, status, payload))
+
+    def handle(self, request):
+        self.calls.append(request)
+
+        matches = [
+            item for item in self.responses
+            if request.method == item[0] and str(request.url) == item[1]
+            and all(
+                request.headers.get(name) == value
+                for name, value in item[2].items()
+            )
+        ]
+
+        if matches:
+            # like responses, use the matching responses in the order they
+            # were added and keep repeating the last one
+            if len(matches) > 1:
+                self.responses.remove(matches[0])
+
+            return httpx.Response(matches[0][3], json=matches[0][4])
+
+        raise httpx.ConnectError('Connection refused by the mock',
+                                 request=request)
+
+
+@pytest.fixture
+def mock_async_api(monkeypatch):
+    mock = AsyncAPIMock()
+
+    monkeypatch.setattr(aio_base, '_create_client', lambda: httpx.AsyncClient(
+        transport=httpx.MockTransport(mock.handle),
+    ))
+
+    return mock
+
+
+@pytest.fixture
+def mock_async_response(api_url, api_token, mock_async_api):
+    def function(method, url_path, status, payload=None):
+        mock_async_api.add(
+            method,
+            api_url + url_path,
+            {
+                'Accept': 'application/json',
+                'Content-Type': 'application/json',
+                'Kabelwerk-Token': api_token,
+                'User-Agent': f'sdk-python/{__version__}',
+            },
+            status,
+            payload,
+        )
+
+    return function
+
+
 @pytest.fixture
 def logs(caplog):
-    caplog.set_level(logging.INFO)
+    caplog.set_level(logging.INFO, logger='kabelwerk')
     return caplog
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import logging
+
+import httpx
+import pytest
+
+from kabelwerk.aio.base import make_api_call
+from kabelwerk.exceptions import (
+    AuthenticationError, ConnectionError, DoesNotExist, ServerError,
+    ValidationError,
+)
+
+
+TEST_PARAMS = {'ghost': True}
+
+
+def test_make_api_call_200(mock_async_api, mock_async_response, logs):
+    """
+    The async make_api_call function should return the decoded response
+    payload if the endpoint accepts the request.
+    """
+    mock_async_response('GET', '/test', 200, {'code': 2107})
+
+    assert asyncio.run(make_api_call('GET', '/test')) == {'code': 2107}
+
+    assert len(mock_async_api.calls) == 1
+    assert mock_async_api.calls[0].content == b''
+
+    assert len(logs.records) == 1
+    assert logs.records[0].levelno == logging.INFO
+    assert logs.records[0].message == (
+        "GET https://hubdemo.kabelwerk.io/api/test "
+        "→ 200 OK {'code': 2107}"
+    )
+
+
+def test_make_api_call_204(mock_async_api, mock_async_response, logs):
+    """
+    The async make_api_call function should return None if the endpoint
+    accepts the request but there is no response payload.
+    """
+    mock_async_response('POST', '/test', 204)
+
+    assert asyncio.run(make_api_call('POST', '/test', TEST_PARAMS)) is None
+
+    assert len(mock_async_api.calls) == 1
+    assert json.loads(mock_async_api.calls[0].content) == TEST_PARAMS
+
+    assert len(logs.records) == 1
+    assert logs.records[0].levelno == logging.INFO
+    assert logs.records[0].message == (
+        "POST https://hubdemo.kabelwerk.io/api/test {'ghost': True} "
+        "→ 204 No Content"
+    )
+
+
+def test_make_api_call_400(mock_async_api, mock_async_response, logs):
+    """
+    The async make_api_call function should raise if the endpoint rejects the
+    request because its payload fails the validation.
+    """
+    mock_async_response('POST', '/test', 400, {
+        'errors': {'field': ['message']},
+    })
+
+    with pytest.raises(ValidationError) as exc_info:
+        asyncio.run(make_api_call('POST', '/test', TEST_PARAMS))
+
+    error = exc_info.value
+    assert isinstance(error.request, httpx.Request)
+    assert isinstance(error.response, httpx.Response)
+    assert error.response.status_code == 400
+    assert error.field == 'field'
+    assert error.error_message == 'message'
+
+    assert len(logs.records) == 1
+    assert logs.records[0].levelno == logging.WARNING
+    assert logs.records[0].message == (
+        "POST https://hubdemo.kabelwerk.io/api/test {'ghost': True} "
+        "→ 400 Bad Request {'errors': {'field': ['message']}}"
+    )
+
+
+def test_make_api_call_errors(mock_async_api, mock_async_response):
+    """
+    The async make_api_call function should raise the same exceptions as its
+    sync counterpart for the other error responses.
+    """
+    for status, exception_class in [
+        (401, AuthenticationError),
+        (403, AuthenticationError),
+        (404, DoesNotExist),
+        (500, ServerError),
+        (503, ServerError),
+    ]:
+        mock_async_response('POST', f'/test/{status}', status)
+
+        with pytest.raises(exception_class) as exc_info:
+            asyncio.run(make_api_call('POST', f'/test/{status}'))
+
+        assert exc_info.value.response.status_code == status
+
+
+def test_make_api_call_connection_error(api_token, mock_async_api, logs):
+    """
+    The async make_api_call function should raise if there is an issue
+    connecting to the backend.
+    """
+    with pytest.raises(ConnectionError) as exc_info:
+        asyncio.run(make_api_call('POST', '/test', TEST_PARAMS))
+
+    error = exc_info.value
+    assert isinstance(error.request, httpx.Request)
+    assert isinstance(error.cause, httpx.RequestError)
+
+    assert len(mock_async_api.calls) == 1
+
+    assert len(logs.records) == 1
+    assert logs.records[0].levelno == logging.ERROR
+    assert logs.records[0].message == (
+        "POST https://hubdemo.kabelwerk.io/api/test {'ghost': True} "
+        "→ Connection refused by the mock"
+    )
+
+
+def test_make_api_call_retry(monkeypatch, mock_async_api,
+                             mock_async_response):
+    """
+    The async make_api_call function should retry idempotent requests which
+    fail because of a transient error.
+    """
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr('asyncio.sleep', sleep)
+
+    mock_async_response('PATCH', '/test', 429)
+    mock_async_response('PATCH', '/test', 200, {'code': 2107})
+
+    assert asyncio.run(make_api_call('PATCH', '/test')) == {'code': 2107}
+
+    assert len(mock_async_api.calls) == 2
+    assert len(sleeps) == 1
@@ -0,0 +1,215 @@
+import asyncio
+from datetime import datetime, timezone
+import json
+
+from kabelwerk.aio import (
+    broadcast_message, coalesce, post_message, update_room,
+    update_room_later,
+)
+from kabelwerk.exceptions import DoesNotExist
+from kabelwerk.models import Message, Room, User
+
+
+def test_update_room_archived(mock_async_api, mock_async_response):
+    """
+    One should be able to archive a room with the async update_room function.
+    """
+    mock_async_response('PATCH', '/hubs/section9/rooms/kusanagi', 200, {
+        'archived': True,
+        'attributes': {},
+        'hub_user': {
+            'id': 49448,
+            'key': 'batou',
+            'name': 'Batou',
+        },
+        'id': 22833,
+        'user': {
+            'id': 49447,
+            'key': 'kusanagi',
+            'name': 'Motoko',
+        },
+    })
+
+    room = asyncio.run(update_room(
+        hub='section9',
+        room='kusanagi',
+        archived=True,
+    ))
+
+    assert len(mock_async_api.calls) == 1
+    assert json.loads(mock_async_api.calls[0].content) == {
+        'archived': True,
+    }
+
+    assert isinstance(room, Room)
+    assert room.archived is True
+    assert room.id == 22833
+    assert room.hub_user == User(id=49448, key='batou', name='Batou')
+    assert room.user == User(id=49447, key='kusanagi', name='Motoko')
+
+
+def test_post_message_text(mock_async_api, mock_async_response):
+    """
+    One should be able to post a text message with the async post_message
+    function.
+    """
+    mock_async_response('POST', '/hubs/_/rooms/kusanagi/messages', 201, {
+        'html': "<p>And where does the newborn go from here?</p>",
+        'id': 16947,
+        'inserted_at': '2023-07-22T09:46:57Z',
+        'room_id': 22818,
+        'text': "And where does the newborn go from here?",
+        'type': 'text',
+        'updated_at': '2023-07-22T09:46:57Z',
+        'upload': None,
+        'user': {
+            'id': 49421,
+            'key': 'batou',
+            'name': 'Batou',
+        },
+    })
+
+    message = asyncio.run(post_message(
+        room='kusanagi',
+        user='batou',
+        text='And where does the newborn go from here?'
+    ))
+
+    assert len(mock_async_api.calls) == 1
+    assert json.loads(mock_async_api.calls[0].content) == {
+        'text': 'And where does the newborn go from here?',
+        'user': 'batou',
+    }
+
+    assert isinstance(message, Message)
+    assert message.id == 16947
+    assert message.inserted_at == datetime(2023, 7, 22, 9, 46, 57,
+                                           tzinfo=timezone.utc)
+    assert message.user == User(id=49421, key='batou', name='Batou')
+
+
+def test_broadcast_message(mock_async_api, mock_async_response):
+    """
+    One should be able to post the same message in many rooms with the async
+    broadcast_message function.
+    """
+    mock_async_response('POST', '/hubs/_/rooms/kusanagi/messages', 201, {
+        'html': "<p>Meeting at noon.</p>",
+        'id': 16947,
+        'inserted_at': '2023-07-22T09:46:57Z',
+        'room_id': 22818,
+        'text': "Meeting at noon.",
+        'type': 'text',
+        'updated_at': '2023-07-22T09:46:57Z',
+        'upload': None,
+        'user': {
+            'id': 49421,
+            'key': 'batou',
+            'name': 'Batou',
+        },
+    })
+    mock_async_response('POST', '/hubs/_/rooms/aramaki/messages', 404)
+
+    async def run():
+        broadcast = broadcast_message(
+            rooms=['kusanagi', 'aramaki'],
+            user='batou',
+            text='Meeting at noon.',
+        )
+
+        messages = [pair async for pair in broadcast]
+
+        return messages, await broadcast.wait()
+
+    messages, failures = asyncio.run(run())
+
+    assert len(mock_async_api.calls) == 2
+
+    assert len(messages) == 1
+    assert messages[0][0] == 'kusanagi'
+    assert messages[0][1].id == 16947
+
+    assert failures == {DoesNotExist: ['aramaki']}
+
+
+def test_update_room_later(mock_async_api, mock_async_response):
+    """
+    The async update_room_later should merge the updates of the same room
+    into a single PATCH and resolve all the futures to the resulting room.
+    """
+    mock_async_response('PATCH', '/hubs/section9/rooms/kusanagi', 200, {
+        'archived': True,
+        'attributes': {},
+        'hub_user': None,
+        'id': 22833,
+        'user': {
+            'id': 49447,
+            'key': 'kusanagi',
+            'name': 'Motoko',
+        },
+    })
+
+    async def main():
+        return await asyncio.gather(
+            update_room_later(hub='section9', room='kusanagi', archived=True),
+            update_room_later(hub='section9', room='kusanagi', hub_user=None),
+        )
+
+    rooms = asyncio.run(main())
+
+    assert len(mock_async_api.calls) == 1
+    assert json.loads(mock_async_api.calls[0].content) == {
+        'archived': True,
+        'hub_user': None,
+    }
+
+    assert rooms[0].id == 22833
+    assert rooms[1] is rooms[0]
+
+
+def test_room_update_buffer_flush(mock_async_api, mock_async_response,
+                                  monkeypatch):
+    """
+    Flushing the async buffer should send the buffered changes once — not
+    again when their window is over — and cancelling the flush should cancel
+    the futures waiting for it.
+    """
+    mock_async_response('PATCH', '/hubs/section9/rooms/kusanagi', 200, {
+        'archived': True,
+        'attributes': {},
+        'hub_user': None,
+        'id': 22833,
+        'user': {
+            'id': 49447,
+            'key': 'kusanagi',
+            'name': 'Motoko',
+        },
+    })
+
+    async def main():
+        buffer = coalesce.RoomUpdateBuffer(window=0.05)
+
+        first = buffer.submit('section9', 'kusanagi', {'archived': True})
+        await buffer.flush()
+
+        buffer.window = 10
+        second = buffer.submit('section9', 'kusanagi', {'archived': True})
+        await asyncio.sleep(0.1)
+
+        assert first.result().id == 22833
+        assert not second.done()
+        assert len(mock_async_api.calls) == 1
+
+        async def hang(**kwargs):
+            await asyncio.sleep(10)
+
+        monkeypatch.setattr(coalesce, 'update_room', hang)
+
+        flush = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0.01)
+        flush.cancel()
+
+        await asyncio.gather(flush, return_exceptions=True)
+        assert second.cancelled()
+
+    asyncio.run(main())
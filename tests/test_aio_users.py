@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+from kabelwerk.aio import (
+    create_user, create_users, delete_user, delete_users, update_user,
+)
+from kabelwerk.exceptions import DoesNotExist, ValidationError
+from kabelwerk.models import User
+
+
+def test_create_user_works(mock_async_api, mock_async_response):
+    """
+    The async create_user function should return a User named tuple if the
+    endpoint accepts the request.
+    """
+    mock_async_response('POST', '/users', 201, {
+        'id': 2,
+        'key': 'kusanagi',
+        'name': 'Motoko',
+    })
+
+    user = asyncio.run(create_user(name='Motoko', key='kusanagi'))
+
+    assert len(mock_async_api.calls) == 1
+    assert json.loads(mock_async_api.calls[0].content) == {
+        'hub': None,
+        'key': 'kusanagi',
+        'name': 'Motoko',
+    }
+
+    assert user == User(id=2, key='kusanagi', name='Motoko')
+
+
+def test_update_user_works(mock_async_api, mock_async_response):
+    """
+    The async update_user function should return a User named tuple if the
+    endpoint accepts the request.
+    """
+    mock_async_response('PATCH', '/users/kusanagi', 200, {
+        'id': 2,
+        'key': 'kusanagi',
+        'name': 'Motoko',
+    })
+
+    user = asyncio.run(update_user(key='kusanagi', name='Motoko'))
+
+    assert len(mock_async_api.calls) == 1
+    assert json.loads(mock_async_api.calls[0].content) == {
+        'name': 'Motoko',
+    }
+
+    assert user == User(id=2, key='kusanagi', name='Motoko')
+
+
+def test_delete_user_works(mock_async_api, mock_async_response):
+    """
+    The async delete_user function should return None if the endpoint accepts
+    the request.
+    """
+    mock_async_response('DELETE', '/users/kusanagi', 204)
+
+    output = asyncio.run(delete_user(key='kusanagi'))
+
+    assert len(mock_async_api.calls) == 1
+    assert output is None
+
+
+"""
+bulk operations
+"""
+
+
+def test_create_users_works(mock_async_api, mock_async_response):
+    """
+    The async create_users function should return, in the order of the input,
+    the created users and the exceptions of the failed calls.
+    """
+    mock_async_response('POST', '/users', 201, {
+        'id': 2,
+        'key': 'kusanagi',
+        'name': 'Motoko',
+    })
+    mock_async_response('POST', '/users', 400, {
+        'errors': {'name': ["can't be blank"]},
+    })
+
+    results = asyncio.run(create_users([
+        {'key': 'kusanagi', 'name': 'Motoko'},
+        {'key': 'batou', 'name': '', 'hub': 'section9'},
+    ], concurrency=1))
+
+    assert len(mock_async_api.calls) == 2
+
+    assert results[0] == User(id=2, key='kusanagi', name='Motoko')
+    assert isinstance(results[1], ValidationError)
+
+
+def test_bulk_malformed_rows(mock_async_api, mock_async_response):
+    """
+    A row with missing or unexpected keys should result in a TypeError of
+    its own, without aborting the other rows.
+    """
+    mock_async_response('POST', '/users', 201, {
+        'id': 2,
+        'key': 'kusanagi',
+        'name': 'Motoko',
+    })
+
+    results = asyncio.run(create_users([
+        {'key': 'togusa'},
+        {'key': 'kusanagi', 'name': 'Motoko'},
+        {'key': 'batou', 'name': 'Batou', 'rank': 'sergeant'},
+    ]))
+
+    assert len(mock_async_api.calls) == 1
+
+    assert isinstance(results[0], TypeError)
+    assert results[1] == User(id=2, key='kusanagi', name='Motoko')
+    assert isinstance(results[2], TypeError)
+
+
+def test_delete_users_works(mock_async_api, mock_async_response):
+    """
+    The async delete_users function should return None for each deleted user
+    and the exception for each user that could not be deleted.
+    """
+    mock_async_response('DELETE', '/users/kusanagi', 204)
+    mock_async_response('DELETE', '/users/batou', 404)
+
+    results = asyncio.run(delete_users(['kusanagi', 'batou'], concurrency=1))
+
+    assert len(mock_async_api.calls) == 2
+
+    assert results[0] is None
+    assert isinstance(results[1], DoesNotExist)
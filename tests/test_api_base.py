@@ -4,7 +4,9 @@ import pytest
 import requests
 from responses.matchers import json_params_matcher
 
-from kabelwerk.api.base import make_api_call
+from kabelwerk import config
+from kabelwerk.api import base
+from kabelwerk.api.base import close_session, get_session, make_api_call
 from kabelwerk.exceptions import (
     AuthenticationError, ConnectionError, DoesNotExist, ServerError,
     ValidationError,
@@ -200,3 +202,138 @@ def test_make_api_call_connection_error(api_token, mock_api, logs):
         "POST https://hubdemo.kabelwerk.io/api/test {'ghost': True} "
         "→ Connection refused by Responses"
     ))
+
+
+"""
+session
+"""
+
+
+def test_session_is_reused(mock_api, mock_response):
+    """
+    The make_api_call function should send all requests through the same
+    pooled session.
+    """
+    mock_response('GET', '/test', 200, {'code': 2107})
+    mock_response('GET', '/test', 200, {'code': 2107})
+
+    session = get_session()
+
+    make_api_call('GET', '/test')
+    make_api_call('GET', '/test')
+
+    assert len(mock_api.calls) == 2
+    assert get_session() is session
+
+
+def test_session_pool_size():
+    """
+    The get_session function should size the connection pool according to
+    KABELWERK_POOL_SIZE.
+    """
+    config.KABELWERK_POOL_SIZE = 42
+    close_session()
+
+    adapter = get_session().get_adapter('https://hubdemo.kabelwerk.io/api')
+    assert adapter._pool_maxsize == 42
+
+    config.KABELWERK_POOL_SIZE = 10
+    close_session()
+
+
+def test_session_keep_alive():
+    """
+    The get_session function should ask for the connections to be closed if
+    KABELWERK_KEEP_ALIVE is turned off.
+    """
+    assert get_session().headers['Connection'] == 'keep-alive'
+
+    config.KABELWERK_KEEP_ALIVE = False
+    close_session()
+
+    assert get_session().headers['Connection'] == 'close'
+
+    config.KABELWERK_KEEP_ALIVE = True
+    close_session()
+
+
+def test_session_after_fork():
+    """
+    A forked child process should not reuse the session of its parent.
+    """
+    session = get_session()
+
+    base._reset_session_after_fork()
+
+    assert get_session() is not session
+
+
+"""
+retries
+"""
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr('time.sleep', sleeps.append)
+    return sleeps
+
+
+def test_make_api_call_retry(mock_api, mock_response, sleeps, logs):
+    """
+    The make_api_call function should retry idempotent requests which fail
+    because of a transient error.
+    """
+    mock_response('PATCH', '/test', 503)
+    mock_response('PATCH', '/test', 200, {'code': 2107})
+
+    assert make_api_call('PATCH', '/test', TEST_PARAMS) == {'code': 2107}
+
+    assert len(mock_api.calls) == 2
+    assert len(sleeps) == 1
+
+    assert [record.levelno for record in logs.records] == [
+        logging.ERROR, logging.INFO, logging.INFO,
+    ]
+    assert logs.records[1].message.startswith((
+        "PATCH https://hubdemo.kabelwerk.io/api/test {'ghost': True} "
+        "→ retrying in "
+    ))
+
+
+def test_make_api_call_retry_gives_up(mock_api, mock_response, sleeps):
+    """
+    The make_api_call function should raise the last error once it runs out of
+    attempts.
+    """
+    mock_response('DELETE', '/test', 502)
+
+    with pytest.raises(ServerError):
+        make_api_call('DELETE', '/test')
+
+    assert len(mock_api.calls) == config.KABELWERK_MAX_ATTEMPTS
+    assert len(sleeps) == config.KABELWERK_MAX_ATTEMPTS - 1
+
+
+def test_make_api_call_retry_post(mock_api, mock_response, sleeps):
+    """
+    The make_api_call function should only retry POST requests if they have an
+    idempotency key.
+    """
+    mock_response('POST', '/test', 503)
+    mock_response('POST', '/test', 503)
+    mock_response('POST', '/test', 201, {'code': 2107})
+
+    with pytest.raises(ServerError):
+        make_api_call('POST', '/test', TEST_PARAMS)
+
+    assert len(mock_api.calls) == 1
+
+    assert make_api_call(
+        'POST', '/test', TEST_PARAMS, idempotency_key='2107',
+    ) == {'code': 2107}
+
+    assert len(mock_api.calls) == 3
+    assert mock_api.calls[1].request.headers['Idempotency-Key'] == '2107'
+    assert mock_api.calls[2].request.headers['Idempotency-Key'] == '2107'
@@ -0,0 +1,200 @@
+import pytest
+import requests
+
+from kabelwerk import config
+from kabelwerk.api.base import make_api_call
+from kabelwerk.api.breaker import CircuitBreaker, get_circuit_breaker
+from kabelwerk.exceptions import (
+    CircuitOpenError, ConnectionError, DoesNotExist, ServerError,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def make_error(status_code=None):
+    if status_code is None:
+        return ConnectionError(requests.ConnectionError())
+
+    response = requests.Response()
+    response.status_code = status_code
+
+    if status_code == 404:
+        return DoesNotExist(response)
+
+    return ServerError(response)
+
+
+def call(breaker, error=None):
+    try:
+        with breaker:
+            if error:
+                raise error
+    except CircuitOpenError:
+        raise
+    except Exception:
+        pass
+
+
+def test_breaker_opens():
+    """
+    The circuit breaker should open after the given number of consecutive
+    connection or server errors, and then reject all calls.
+    """
+    breaker = CircuitBreaker(threshold=3, clock=Clock())
+
+    call(breaker, make_error())
+    call(breaker, make_error(500))
+    assert breaker.state == 'closed'
+    assert breaker.consecutive_failures == 2
+
+    call(breaker, make_error(503))
+    assert breaker.state == 'open'
+
+    with pytest.raises(CircuitOpenError) as exc_info:
+        call(breaker)
+
+    assert exc_info.value.request is None
+    assert isinstance(exc_info.value.cause, ServerError)
+
+    assert breaker.counters == {
+        'successes': 0,
+        'failures': 3,
+        'rejections': 1,
+        'openings': 1,
+    }
+
+
+def test_breaker_consecutive():
+    """
+    The circuit breaker should only count consecutive failures within the
+    window, and not count client errors as failures.
+    """
+    clock = Clock()
+    breaker = CircuitBreaker(threshold=2, window=10, clock=clock)
+
+    call(breaker, make_error())
+    call(breaker)
+    call(breaker, make_error())
+    call(breaker, make_error(404))
+    call(breaker, make_error(429))
+    assert breaker.state == 'closed'
+
+    call(breaker, make_error())
+    clock.now = 11
+    call(breaker, make_error())
+    assert breaker.state == 'closed'
+
+    call(breaker, make_error())
+    assert breaker.state == 'open'
+
+
+def test_breaker_recovers():
+    """
+    The circuit breaker should let a single probe through after the recovery
+    time, and close if the probe succeeds or re-open if it fails.
+    """
+    clock = Clock()
+    breaker = CircuitBreaker(threshold=1, recovery_time=5, clock=clock)
+
+    call(breaker, make_error())
+    assert breaker.state == 'open'
+
+    clock.now = 5
+    assert breaker.state == 'half-open'
+
+    # the probe fails
+    call(breaker, make_error())
+    assert breaker.state == 'open'
+
+    clock.now = 10
+
+    # the probe succeeds, while a concurrent call is rejected
+    with breaker:
+        with pytest.raises(CircuitOpenError):
+            call(breaker)
+
+    assert breaker.state == 'closed'
+    assert breaker.counters['openings'] == 2
+
+
+def test_breaker_ignores_rate_limiting():
+    """
+    A 429 response should neither count as a failure nor close a half-open
+    breaker, as the backend is shedding load.
+    """
+    clock = Clock()
+    breaker = CircuitBreaker(threshold=2, recovery_time=5, clock=clock)
+
+    call(breaker, make_error())
+    call(breaker, make_error(429))
+    assert breaker.consecutive_failures == 1
+
+    call(breaker, make_error())
+    assert breaker.state == 'open'
+
+    clock.now = 5
+
+    # the probe is rate limited, which frees the probe slot
+    call(breaker, make_error(429))
+    assert breaker.state == 'half-open'
+    assert breaker.counters['successes'] == 0
+
+    call(breaker)
+    assert breaker.state == 'closed'
+
+
+def test_get_circuit_breaker():
+    """
+    The get_circuit_breaker function should follow the KABELWERK_BREAKER_*
+    settings and return a breaker per backend.
+    """
+    assert get_circuit_breaker() is None
+
+    config.KABELWERK_BREAKER_THRESHOLD = 3
+    breaker = get_circuit_breaker()
+    assert breaker.threshold == 3
+    assert get_circuit_breaker() is breaker
+
+    config.KABELWERK_BREAKER_THRESHOLD = 4
+    assert get_circuit_breaker() is not breaker
+    assert get_circuit_breaker().threshold == 4
+
+    other = get_circuit_breaker('https://acme.kabelwerk.io/api')
+    assert other is not get_circuit_breaker()
+    assert get_circuit_breaker('https://acme.kabelwerk.io/api') is other
+
+    config.KABELWERK_BREAKER_THRESHOLD = 0
+    assert get_circuit_breaker() is None
+
+
+def test_make_api_call_breaker(mock_api, mock_response, logs):
+    """
+    The make_api_call function should fail fast without sending a request
+    while the circuit breaker is open.
+    """
+    config.KABELWERK_BREAKER_THRESHOLD = 2
+    config.KABELWERK_MAX_ATTEMPTS = 1
+
+    mock_response('POST', '/test', 502)
+
+    for _ in range(2):
+        with pytest.raises(ServerError):
+            make_api_call('POST', '/test')
+
+    with pytest.raises(CircuitOpenError):
+        make_api_call('POST', '/test')
+
+    assert len(mock_api.calls) == 2
+
+    assert logs.records[-1].message == (
+        'POST https://hubdemo.kabelwerk.io/api/test → circuit breaker open'
+    )
+
+    config.KABELWERK_BREAKER_THRESHOLD = 0
+    config.KABELWERK_MAX_ATTEMPTS = 3
@@ -0,0 +1,156 @@
+import subprocess
+import sys
+
+from responses.matchers import header_matcher, json_params_matcher
+
+from kabelwerk import config
+from kabelwerk.api import update_room_later
+from kabelwerk.api.client import Client
+from kabelwerk.api.coalesce import RoomUpdateBuffer, get_room_update_buffer
+from kabelwerk.exceptions import DoesNotExist
+from kabelwerk.models import Room
+
+
+ROOM = {
+    'archived': True,
+    'attributes': {'tags': ['vip']},
+    'hub_user': {'id': 49448, 'key': 'batou', 'name': 'Batou'},
+    'id': 22833,
+    'user': {'id': 49447, 'key': 'kusanagi', 'name': 'Motoko'},
+}
+
+
+def test_update_room_later_merges(mock_api, mock_response):
+    """
+    The updates of the same room made within the window should be sent as a
+    single PATCH, with the last value of each field winning, and all callers
+    should get the resulting room.
+    """
+    mock_response('PATCH', '/hubs/section9/rooms/kusanagi', 200, ROOM)
+    config.KABELWERK_COALESCE_WINDOW = 0.05
+
+    futures = [
+        update_room_later(hub='section9', room='kusanagi',
+                          attributes={'tags': []}),
+        update_room_later(hub='section9', room='kusanagi', archived=True),
+        update_room_later(hub='section9', room='kusanagi',
+                          attributes={'tags': ['vip']}, hub_user='batou'),
+    ]
+
+    rooms = [future.result(timeout=2) for future in futures]
+
+    assert len(mock_api.calls) == 1
+    assert json_params_matcher({
+        'archived': True,
+        'attributes': {'tags': ['vip']},
+        'hub_user': 'batou',
+    })(mock_api.calls[0].request)
+
+    assert isinstance(rooms[0], Room)
+    assert rooms[0].id == 22833
+    assert rooms[1] is rooms[0] and rooms[2] is rooms[0]
+
+
+def test_update_room_later_separate_rooms(mock_api, mock_response):
+    """
+    The updates of different rooms should not be merged, and a failed update
+    should resolve the futures of its callers to the exception.
+    """
+    mock_response('PATCH', '/hubs/section9/rooms/kusanagi', 200, ROOM)
+    mock_response('PATCH', '/hubs/section9/rooms/togusa', 404)
+
+    buffer = RoomUpdateBuffer(window=60)
+
+    first = buffer.submit('section9', 'kusanagi', {'archived': True})
+    second = buffer.submit('section9', 'togusa', {'archived': True})
+    cancelled = buffer.submit('section9', 'togusa', {'archived': False})
+    cancelled.cancel()
+
+    assert not first.done()
+
+    buffer.flush()
+
+    assert len(mock_api.calls) == 2
+    assert json_params_matcher({
+        'archived': True,
+    })(mock_api.calls[1].request)
+
+    assert first.result().id == 22833
+    assert isinstance(second.exception(), DoesNotExist)
+
+
+def test_room_update_buffer_window_changes():
+    """
+    The shared buffer should be kept — along with its background thread —
+    when the window setting changes, and should use the new window.
+    """
+    config.KABELWERK_COALESCE_WINDOW = 0.1
+    buffer = get_room_update_buffer()
+
+    assert get_room_update_buffer() is buffer
+
+    config.KABELWERK_COALESCE_WINDOW = 0.2
+
+    assert get_room_update_buffer() is buffer
+    assert buffer.window == 0.2
+
+
+def test_update_room_later_client_and_timeout(mock_api):
+    """
+    The client and the timeout should be passed on to update_room, and only
+    the updates made with the same ones should be merged.
+    """
+    acme = Client('acme.kabelwerk.io', 'acme-token')
+    mock_api.add('PATCH', acme.api_url + '/hubs/_/rooms/kusanagi', json=ROOM,
+                 match=[header_matcher({'Kabelwerk-Token': 'acme-token'})])
+
+    config.KABELWERK_COALESCE_WINDOW = 60
+
+    first = update_room_later(room='kusanagi', archived=True, client=acme)
+    second = update_room_later(room='kusanagi', archived=False, client=acme,
+                               timeout=5)
+
+    get_room_update_buffer().flush()
+
+    assert len(mock_api.calls) == 2
+    assert first.result().id == 22833
+    assert second.result().id == 22833
+
+
+EXIT_SCRIPT = '''
+import atexit
+import time
+
+from kabelwerk import config
+from kabelwerk.api import create_user, update_room_later
+from kabelwerk.fake import FakeServer
+
+server = FakeServer()
+server.start()
+atexit.register(lambda: print(server.backend.rooms['section9', 'kusanagi']))
+
+config.KABELWERK_URL = server.url
+config.KABELWERK_API_TOKEN = 'fake-token'
+config.KABELWERK_COALESCE_WINDOW = 0.05
+
+create_user(key='kusanagi', name='Motoko')
+update_room_later(room='kusanagi', archived=True)
+
+# keeps the process from exiting until the window is over
+atexit.register(time.sleep, 0.2)
+'''
+
+
+def test_update_room_later_at_exit():
+    """
+    The buffered changes should be sent before the process exits — also if
+    their window is over only once the interpreter has started shutting
+    down.
+    """
+    output = subprocess.run(
+        [sys.executable, '-c', EXIT_SCRIPT],
+        capture_output=True, check=True, text=True,
+    )
+
+    assert "'archived': True" in output.stdout
+    assert output.stderr == ''
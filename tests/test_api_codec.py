@@ -0,0 +1,98 @@
+import json
+
+import pytest
+from responses.matchers import json_params_matcher
+
+from kabelwerk import config
+from kabelwerk.api import codec
+from kabelwerk.api.base import make_api_call
+from kabelwerk.exceptions import ServerError
+
+
+def test_codec_orjson():
+    """
+    The codec should use orjson if it is installed.
+    """
+    pytest.importorskip('orjson')
+
+    assert codec.encode({'a': [1, None], 2: 'b'}) == b'{"a":[1,null],"2":"b"}'
+    assert codec.decode(b'{"a":[1,null]}') == {'a': [1, None]}
+
+
+def test_codec_orjson_fallback():
+    """
+    The codec should fall back to the json module for the values which orjson
+    cannot encode, and raise TypeError for those which neither can.
+    """
+    pytest.importorskip('orjson')
+
+    assert codec.encode({'id': 2**64}) == b'{"id": 18446744073709551616}'
+
+    with pytest.raises(TypeError):
+        codec.encode({'id': object()})
+
+
+def test_codec_fallback(monkeypatch):
+    """
+    The codec should fall back to the json module if orjson is not installed.
+    """
+    monkeypatch.setattr(codec, 'orjson', None)
+
+    assert codec.encode({'a': [1, None]}) == b'{"a": [1, null]}'
+    assert codec.decode(b'{"a":[1,null]}') == {'a': [1, None]}
+
+    with pytest.raises(ValueError):
+        codec.decode(b'<html>')
+
+
+def test_codec_custom():
+    """
+    The codec should use the (dumps, loads) pair in KABELWERK_JSON_CODEC if
+    such is set.
+    """
+    calls = []
+
+    def dumps(value):
+        calls.append('dumps')
+        return json.dumps(value)
+
+    def loads(data):
+        calls.append('loads')
+        return json.loads(data)
+
+    config.KABELWERK_JSON_CODEC = (dumps, loads)
+
+    assert codec.encode({'a': 1}) == b'{"a": 1}'
+    assert codec.decode(b'{"a": 1}') == {'a': 1}
+    assert calls == ['dumps', 'loads']
+
+
+def test_make_api_call_codec(monkeypatch, mock_api, mock_response):
+    """
+    The make_api_call function should encode and decode the payloads with the
+    codec, whichever one is in use.
+    """
+    mock_response('POST', '/test', 201, {'code': 2107})
+
+    assert make_api_call('POST', '/test', {'ghost': True}) == {'code': 2107}
+
+    monkeypatch.setattr(codec, 'orjson', None)
+
+    assert make_api_call('POST', '/test', {'ghost': True}) == {'code': 2107}
+
+    assert len(mock_api.calls) == 2
+    for call in mock_api.calls:
+        assert json_params_matcher({'ghost': True})(call.request)
+
+
+def test_make_api_call_invalid_json(api_url, api_token, mock_api):
+    """
+    The make_api_call function should raise a ServerError if the response
+    payload is not valid JSON.
+    """
+    mock_api.add('GET', api_url + '/test', status=200, body='<html>')
+
+    with pytest.raises(ServerError) as exc_info:
+        make_api_call('GET', '/test')
+
+    assert exc_info.value.response.status_code == 200
@@ -0,0 +1,107 @@
+from datetime import datetime, timezone
+
+from kabelwerk.api.decoders import decode_message, decode_room, decode_user
+from kabelwerk.models import Message, Room, User
+
+
+MESSAGE = {
+    'html': "<p>And where does the newborn go from here?</p>",
+    'id': 16947,
+    'inserted_at': '2023-07-22T09:46:57Z',
+    'room_id': 22818,
+    'text': "And where does the newborn go from here?",
+    'type': 'text',
+    'updated_at': '2023-07-22T09:48:12Z',
+    'upload': None,
+    'user': {
+        'id': 49421,
+        'key': 'batou',
+        'name': 'Batou',
+    },
+}
+
+
+def test_decode_user_interns():
+    """
+    Decoding the same user record twice should return the same User object,
+    but a changed record should result in a new User.
+    """
+    user = decode_user({'id': 1, 'key': 'kusanagi', 'name': 'Motoko'})
+
+    assert user == User(id=1, key='kusanagi', name='Motoko')
+    assert decode_user({'id': 1, 'key': 'kusanagi', 'name': 'Motoko'}) is user
+
+    renamed = decode_user({'id': 1, 'key': 'kusanagi', 'name': 'Major'})
+    assert renamed is not user
+    assert renamed.name == 'Major'
+
+
+def test_decode_room():
+    """
+    The decode_room function should build a Room with interned users.
+    """
+    room = decode_room({
+        'archived': False,
+        'attributes': {},
+        'hub_user': None,
+        'id': 22833,
+        'user': {'id': 49447, 'key': 'kusanagi', 'name': 'Motoko'},
+    })
+
+    assert isinstance(room, Room)
+    assert room.hub_user is None
+    assert room.user is decode_user(
+        {'id': 49447, 'key': 'kusanagi', 'name': 'Motoko'},
+    )
+
+
+def test_decode_message():
+    """
+    The decode_message function should build a Message with parsed
+    timestamps and an interned user.
+    """
+    message = decode_message(MESSAGE)
+
+    assert isinstance(message, Message)
+    assert message.inserted_at == datetime(2023, 7, 22, 9, 46, 57,
+                                           tzinfo=timezone.utc)
+    assert message.updated_at == datetime(2023, 7, 22, 9, 48, 12,
+                                          tzinfo=timezone.utc)
+
+    assert message.user is decode_message(MESSAGE).user
+
+
+def test_message_behaves_like_a_named_tuple():
+    """
+    A decoded Message should be equal to one built from the same values, and
+    its timestamps should be datetimes however they are accessed.
+    """
+    message = decode_message(MESSAGE)
+
+    inserted_at = datetime(2023, 7, 22, 9, 46, 57, tzinfo=timezone.utc)
+    updated_at = datetime(2023, 7, 22, 9, 48, 12, tzinfo=timezone.utc)
+    user = User(id=49421, key='batou', name='Batou')
+
+    assert message == Message(
+        id=16947,
+        html=MESSAGE['html'],
+        inserted_at=inserted_at,
+        room_id=22818,
+        text=MESSAGE['text'],
+        type='text',
+        updated_at=updated_at,
+        user=user,
+    )
+
+    assert message[2] == inserted_at
+    assert list(message)[6] == updated_at
+
+    _, _, unpacked_inserted_at, *_, unpacked_updated_at, _ = message
+    assert unpacked_inserted_at == inserted_at
+    assert unpacked_updated_at == updated_at
+
+    assert 'inserted_at=datetime.datetime(2023, 7, 22, 9, 46, 57' in (
+        repr(message)
+    )
+    assert message._asdict()['updated_at'] == updated_at
+    assert message._replace(text='').id == 16947
@@ -0,0 +1,123 @@
+import threading
+
+import pytest
+
+from kabelwerk import config
+from kabelwerk.api import dispatch, post_message
+from kabelwerk.api.dispatcher import (
+    BLOCK, DROP_OLDEST, RAISE, Dispatcher, get_dispatcher, stop_dispatcher,
+)
+from kabelwerk.exceptions import QueueFullError, ServerError
+
+
+@pytest.fixture
+def gate():
+    """
+    An event which the dispatched calls wait for, so that they pile up in the
+    queue.
+    """
+    event = threading.Event()
+
+    yield event
+
+    event.set()
+
+
+def test_dispatch_post_message(mock_api, mock_response):
+    """
+    The dispatch function should make the API call in the background and
+    resolve the future with its result or exception.
+    """
+    mock_response('POST', '/hubs/_/rooms/kusanagi/messages', 201, {
+        'id': 1,
+        'html': '<p>Hello!</p>',
+        'inserted_at': '2023-08-12T12:00:00Z',
+        'room_id': 42,
+        'text': 'Hello!',
+        'type': 'text',
+        'updated_at': '2023-08-12T12:00:00Z',
+        'upload': None,
+        'user': {'id': 2, 'key': 'batou', 'name': 'Batou'},
+    })
+    mock_response('POST', '/hubs/_/rooms/togusa/messages', 500)
+
+    config.KABELWERK_MAX_ATTEMPTS = 1
+
+    try:
+        first = dispatch(post_message, room='kusanagi', user='batou',
+                         text='Hello!')
+        second = dispatch(post_message, room='togusa', user='batou',
+                          text='Hello!')
+
+        assert first.result(timeout=2).text == 'Hello!'
+        assert isinstance(second.exception(timeout=2), ServerError)
+
+        assert get_dispatcher().counters['completed'] == 1
+        assert get_dispatcher().counters['failed'] == 1
+    finally:
+        assert stop_dispatcher(timeout=2) == 0
+
+
+def test_dispatcher_drop_oldest(gate):
+    """
+    With the drop-oldest policy, submitting to a full queue should cancel the
+    oldest queued call.
+    """
+    dispatcher = Dispatcher(workers=1, max_size=2, policy=DROP_OLDEST)
+
+    running = dispatcher.submit(gate.wait)
+    while dispatcher.pending:
+        pass
+
+    futures = [dispatcher.submit(lambda i=i: i) for i in range(3)]
+
+    assert futures[0].cancelled()
+    assert dispatcher.counters['dropped'] == 1
+
+    gate.set()
+
+    assert running.result(timeout=2) is True
+    assert [future.result(timeout=2) for future in futures[1:]] == [1, 2]
+
+    dispatcher.stop()
+
+
+def test_dispatcher_raise_and_block(gate):
+    """
+    With the raise policy — and with the block policy once its timeout runs
+    out — submitting to a full queue should raise QueueFullError.
+    """
+    for policy in (RAISE, BLOCK):
+        dispatcher = Dispatcher(workers=1, max_size=1, policy=policy,
+                                block_timeout=0.01)
+
+        dispatcher.submit(gate.wait)
+        while dispatcher.pending:
+            pass
+
+        dispatcher.submit(gate.wait)
+
+        with pytest.raises(QueueFullError):
+            dispatcher.submit(gate.wait)
+
+        assert dispatcher.stop(timeout=0.01) == 1
+
+
+def test_dispatcher_stop_drains():
+    """
+    Stopping the dispatcher should wait for the queued calls to be made and
+    refuse new ones.
+    """
+    dispatcher = Dispatcher(workers=2)
+    futures = [dispatcher.submit(lambda i=i: i * i) for i in range(20)]
+
+    assert dispatcher.stop(timeout=2) == 0
+    assert [future.result() for future in futures] == [
+        i * i for i in range(20)
+    ]
+
+    with pytest.raises(RuntimeError):
+        dispatcher.submit(print)
+
+    with pytest.raises(ValueError):
+        Dispatcher(policy='whatever')
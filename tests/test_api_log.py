@@ -0,0 +1,109 @@
+import logging
+
+import requests
+
+from kabelwerk import config
+from kabelwerk.api.base import make_api_call
+from kabelwerk.api.log import RequestLog, format_payload
+
+
+class Payload(dict):
+    """
+    A dict which counts how many times it has been repr'd.
+    """
+
+    reprs = 0
+
+    def __repr__(self):
+        Payload.reprs += 1
+        return super().__repr__()
+
+
+def test_format_payload_truncates():
+    """
+    The format_payload function should cut off payloads longer than
+    KABELWERK_LOG_MAX_LENGTH.
+    """
+    config.KABELWERK_LOG_MAX_LENGTH = 10
+
+    assert format_payload({'a': 1}) == "{'a': 1}"
+    assert format_payload({'attributes': 'x' * 100}) == (
+        "{'attribut… (118 characters)"
+    )
+
+    config.KABELWERK_LOG_MAX_LENGTH = 0
+
+    assert len(format_payload({'attributes': 'x' * 100})) == 118
+
+
+def test_format_payload_redacts():
+    """
+    The format_payload function should redact the configured fields at any
+    level of nesting.
+    """
+    config.KABELWERK_LOG_REDACTED_FIELDS = ['name', 'text']
+
+    assert format_payload({
+        'id': 1,
+        'text': 'Secret',
+        'user': {'key': 'kusanagi', 'name': 'Motoko'},
+        'items': [{'name': 'Batou'}],
+    }) == (
+        "{'id': 1, 'text': '[redacted]', "
+        "'user': {'key': 'kusanagi', 'name': '[redacted]'}, "
+        "'items': [{'name': '[redacted]'}]}"
+    )
+
+
+def test_make_api_call_logs_lazily(mock_api, mock_response, caplog):
+    """
+    The make_api_call function should not format the payloads if the log
+    entries are not emitted.
+    """
+    caplog.set_level(logging.ERROR, logger='kabelwerk')
+
+    mock_response('POST', '/test', 201, {'code': 2107})
+
+    make_api_call('POST', '/test', Payload(ghost=True))
+
+    assert Payload.reprs == 0
+    assert len(caplog.records) == 0
+
+
+def test_make_api_call_logs_compact(mock_api, mock_response, logs):
+    """
+    The make_api_call function should log only the method, path, status, and
+    elapsed time if KABELWERK_LOG_PAYLOADS is turned off.
+    """
+    config.KABELWERK_LOG_PAYLOADS = False
+
+    mock_response('PATCH', '/users/kusanagi', 200, {'name': 'Motoko'})
+
+    make_api_call('PATCH', '/users/kusanagi', {'name': 'Motoko'})
+
+    assert len(logs.records) == 1
+    assert logs.records[0].message.startswith(
+        'PATCH /users/kusanagi → 200 OK ('
+    )
+    assert logs.records[0].message.endswith(' ms)')
+    assert 'Motoko' not in logs.records[0].message
+
+    details = logs.records[0].kabelwerk
+    assert details['method'] == 'PATCH'
+    assert details['path'] == '/users/kusanagi'
+    assert details['status'] == 200
+    assert details['elapsed'] >= 0
+
+
+def test_request_log_hides_token(api_token, logs):
+    """
+    The API token should not end up in the logs, even if it is part of an
+    error message.
+    """
+    log = RequestLog('GET', 'https://kabelwerk.io/api/test', '/test')
+
+    log.error(requests.ConnectionError(f'Bad header: {api_token}'))
+
+    assert logs.records[0].message == (
+        'GET https://kabelwerk.io/api/test → Bad header: [redacted]'
+    )
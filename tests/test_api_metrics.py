@@ -0,0 +1,101 @@
+import pytest
+
+from kabelwerk import config
+from kabelwerk.api import delete_user, post_message, update_user
+from kabelwerk.api.metrics import (
+    Registry, get_endpoint_template, registry, render_prometheus,
+)
+from kabelwerk.exceptions import DoesNotExist
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    registry.reset()
+
+    yield
+
+    registry.reset()
+
+
+def test_endpoint_template():
+    """
+    The IDs in the URL paths should be replaced with placeholders.
+    """
+    assert get_endpoint_template('/users') == '/users'
+    assert get_endpoint_template('/users/kusanagi') == '/users/{key}'
+    assert get_endpoint_template(
+        '/hubs/section9/rooms/kusanagi/messages',
+    ) == '/hubs/{hub}/rooms/{room}/messages'
+
+
+def test_api_calls_recorded(mock_api, mock_response):
+    """
+    Each attempt at an API call should be counted by method, endpoint
+    template, status, and exception.
+    """
+    config.KABELWERK_RETRY_BACKOFF = 0
+
+    mock_response('PATCH', '/users/kusanagi', 503)
+    mock_response('PATCH', '/users/kusanagi', 200, {
+        'id': 2,
+        'key': 'kusanagi',
+        'name': 'Motoko',
+    })
+    mock_response('POST', '/hubs/_/rooms/batou/messages', 404)
+
+    update_user(key='kusanagi', name='Motoko')
+
+    with pytest.raises(DoesNotExist):
+        post_message(room='batou', user='kusanagi', text='Hello!')
+
+    assert registry.get_calls() == {
+        ('PATCH', '/users/{key}', 503, 'ServerError'): 1,
+        ('PATCH', '/users/{key}', 200, None): 1,
+        ('POST', '/hubs/{hub}/rooms/{room}/messages', 404, 'DoesNotExist'): 1,
+    }
+
+    text = render_prometheus()
+
+    assert ('kabelwerk_api_calls_total{method="PATCH",endpoint="/users/{key}",'
+            'status="503",exception="ServerError"} 1') in text
+    assert ('kabelwerk_api_call_duration_seconds_count{method="PATCH",'
+            'endpoint="/users/{key}"} 2') in text
+
+
+def test_api_calls_not_recorded(mock_api, mock_response):
+    """
+    No metrics should be recorded if KABELWERK_METRICS is turned off.
+    """
+    config.KABELWERK_METRICS = False
+
+    mock_response('DELETE', '/users/kusanagi', 204)
+
+    delete_user(key='kusanagi')
+
+    assert registry.get_calls() == {}
+
+
+def test_registry_histogram():
+    """
+    The latency histogram should be exported with cumulative buckets.
+    """
+    metrics = Registry(buckets=(0.1, 1))
+
+    metrics.observe('GET', '/users', 200, None, 0.05)
+    metrics.observe('GET', '/users', 200, None, 0.1)
+    metrics.observe('GET', '/users', 200, None, 0.5)
+    metrics.observe('GET', '/users', None, 'ConnectionError', 2)
+    metrics.observe('GET', '/users', None, 'CircuitOpenError')
+
+    lines = metrics.render().splitlines()
+    name = 'kabelwerk_api_call_duration_seconds'
+    labels = 'method="GET",endpoint="/users"'
+
+    assert f'{name}_bucket{{{labels},le="0.1"}} 2' in lines
+    assert f'{name}_bucket{{{labels},le="1"}} 3' in lines
+    assert f'{name}_bucket{{{labels},le="+Inf"}} 4' in lines
+    assert f'{name}_sum{{{labels}}} 2.65' in lines
+    assert f'{name}_count{{{labels}}} 4' in lines
+
+    assert ('kabelwerk_api_calls_total{' + labels +
+            ',status="",exception="CircuitOpenError"} 1') in lines
@@ -0,0 +1,133 @@
+from datetime import datetime, timezone
+import threading
+import time
+
+import pytest
+
+from kabelwerk import config
+from kabelwerk.api import (
+    create_user, deadline, iter_messages, iter_rooms, post_message,
+    update_room,
+)
+from kabelwerk.exceptions import DeadlineExceededError, DoesNotExist
+from kabelwerk.fake import FakeServer, fixed
+from kabelwerk.models import Message, Room
+
+
+@pytest.fixture
+def fake_server():
+    with FakeServer() as server:
+        config.KABELWERK_URL = server.url
+        config.KABELWERK_API_TOKEN = 'fake-token'
+        config.KABELWERK_MAX_ATTEMPTS = 1
+
+        for index in range(5):
+            create_user(key=f'user{index}', name=f'User {index}')
+            update_room(room=f'user{index}', archived=index == 3)
+
+        for index in range(7):
+            post_message(room='user0', user='user0', text=f'{index}')
+
+        yield server
+
+
+def wait_for(condition, seconds=2):
+    """
+    Wait until the condition is met or the number of seconds passes.
+    """
+    until = time.monotonic() + seconds
+
+    while not condition() and time.monotonic() < until:
+        time.sleep(0.01)
+
+    return condition()
+
+
+def test_iter_rooms(fake_server):
+    """
+    The iter_rooms function should yield the Rooms of the hub across pages.
+    """
+    requests = fake_server.counters['requests']
+
+    rooms = list(iter_rooms(hub='section9', page_size=2))
+
+    assert fake_server.counters['requests'] == requests + 3
+    assert all(isinstance(room, Room) for room in rooms)
+    assert [room.user.key for room in rooms] == [
+        'user0', 'user1', 'user2', 'user3', 'user4',
+    ]
+    assert [room.archived for room in rooms].count(True) == 1
+
+
+def test_iter_messages(fake_server):
+    """
+    The iter_messages function should yield the Messages of the room from the
+    oldest to the newest, optionally only those posted since a given time.
+    """
+    messages = list(iter_messages(room='user0', page_size=3))
+
+    assert all(isinstance(message, Message) for message in messages)
+    assert [message.text for message in messages] == list('0123456')
+
+    since = datetime(2000, 1, 1, tzinfo=timezone.utc)
+    assert len(list(iter_messages(room='user0', since=since))) == 7
+
+    since = datetime(3000, 1, 1, tzinfo=timezone.utc)
+    assert list(iter_messages(room='user0', since=since)) == []
+
+    assert list(iter_messages(room='user1')) == []
+
+
+def test_next_page_is_prefetched(fake_server):
+    """
+    The next page should be requested while the current one is consumed —
+    unless prefetching is turned off — and no more requests should be made
+    once the iteration is abandoned.
+    """
+    requests = fake_server.counters['requests']
+
+    messages = iter_messages(room='user0', page_size=2)
+    assert fake_server.counters['requests'] == requests
+
+    next(messages)
+    assert wait_for(lambda: fake_server.counters['requests'] == requests + 2)
+
+    messages.close()
+    time.sleep(0.1)
+    assert fake_server.counters['requests'] == requests + 2
+    assert wait_for(lambda: not any(
+        thread.name.startswith('kabelwerk-prefetch')
+        for thread in threading.enumerate()
+    ))
+
+    messages = iter_messages(room='user0', page_size=2, prefetch=False)
+    next(messages)
+    time.sleep(0.1)
+    assert fake_server.counters['requests'] == requests + 3
+
+
+def test_pagination_errors(fake_server):
+    """
+    The errors of the API calls should be raised from the iteration, and the
+    prefetching thread should keep to the deadline of the iteration.
+    """
+    with pytest.raises(DoesNotExist):
+        next(iter_messages(room='nobody'))
+
+    with pytest.raises(DoesNotExist):
+        next(iter_rooms(hub='laughing-man'))
+
+    fake_server.latency = fixed(0.3)
+
+    with pytest.raises(DeadlineExceededError):
+        with deadline(0.45):
+            list(iter_messages(room='user0', page_size=2))
+
+
+def test_empty_page(mock_response):
+    """
+    An empty response should end the iteration rather than crash it.
+    """
+    mock_response('GET', '/hubs/_/rooms', 204)
+
+    assert list(iter_rooms(prefetch=False)) == []
@@ -0,0 +1,126 @@
+import threading
+
+import pytest
+
+from kabelwerk import config
+from kabelwerk.api.base import make_api_call
+from kabelwerk.api.ratelimit import (
+    RateLimiter, TokenBucket, get_rate_limit_delay,
+)
+
+
+@pytest.fixture
+def rate_limits():
+    def function(limits):
+        config.KABELWERK_RATE_LIMITS = limits
+
+    yield function
+
+    config.KABELWERK_RATE_LIMITS = {}
+
+
+def test_token_bucket_burst():
+    """
+    A token bucket should allow a burst of calls and then space out the rest
+    according to the rate.
+    """
+    bucket = TokenBucket(10, 3)
+
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+
+    delays = [bucket.reserve() for _ in range(3)]
+    assert delays[0] == pytest.approx(0.1, abs=0.01)
+    assert delays[1] == pytest.approx(0.2, abs=0.01)
+    assert delays[2] == pytest.approx(0.3, abs=0.01)
+
+
+def test_token_bucket_threads():
+    """
+    A token bucket should hand out each token once when shared by threads.
+    """
+    bucket = TokenBucket(1, 50)
+    delays = []
+
+    def run():
+        for _ in range(10):
+            delays.append(bucket.reserve())
+
+    threads = [threading.Thread(target=run) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert delays.count(0) == 50
+    assert sorted(round(delay) for delay in delays)[50:] == list(range(1, 51))
+
+
+def test_token_bucket_invalid_rate():
+    """
+    A token bucket should not accept a rate which is not positive.
+    """
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_rate_limiter_rules():
+    """
+    A rate limiter should apply each rule to the matching API calls only.
+    """
+    limiter = RateLimiter({
+        'post': 1,
+        '/hubs/{hub}/rooms': (1, 2),
+    })
+
+    # POST /users: only the POST rule
+    assert limiter.reserve('POST', '/users') == 0
+    assert limiter.reserve('POST', '/users') > 0
+
+    # PATCH /hubs/x/rooms/y: only the prefix rule
+    assert limiter.reserve('PATCH', '/hubs/section9/rooms/kusanagi') == 0
+    assert limiter.reserve('PATCH', '/hubs/_/rooms/batou') == 0
+    assert limiter.reserve('PATCH', '/hubs/_/rooms/batou') > 0
+
+    # neither
+    assert limiter.reserve('PATCH', '/users/kusanagi') == 0
+    assert limiter.reserve('PATCH', '/hubs/_/roomsx') == 0
+
+
+def test_get_rate_limit_delay(rate_limits):
+    """
+    The get_rate_limit_delay function should follow KABELWERK_RATE_LIMITS.
+    """
+    assert get_rate_limit_delay('POST', '/users') == 0
+    assert get_rate_limit_delay('POST', '/users') == 0
+
+    rate_limits({'/users': 1})
+
+    assert get_rate_limit_delay('POST', '/users') == 0
+    assert get_rate_limit_delay('POST', '/users') > 0
+
+    rate_limits({'/users': 1})
+
+    assert get_rate_limit_delay('POST', '/users') == 0
+
+
+def test_make_api_call_rate_limit(monkeypatch, rate_limits, mock_api,
+                                  mock_response):
+    """
+    The make_api_call function should wait for a token instead of exceeding
+    the rate limits.
+    """
+    sleeps = []
+    monkeypatch.setattr('time.sleep', sleeps.append)
+
+    rate_limits({'GET': (5, 1)})
+
+    mock_response('GET', '/test', 200, {'code': 2107})
+
+    for _ in range(3):
+        make_api_call('GET', '/test')
+
+    assert len(mock_api.calls) == 3
+
+    assert len(sleeps) == 2
+    assert sleeps[0] == pytest.approx(0.2, abs=0.01)
+    assert sleeps[1] == pytest.approx(0.4, abs=0.01)
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+from kabelwerk import config
+from kabelwerk.api.retry import get_retry_delay, parse_retry_after
+from kabelwerk.exceptions import ConnectionError, DoesNotExist, ServerError
+
+
+def make_response(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+@pytest.fixture
+def retry_config():
+    config.KABELWERK_MAX_ATTEMPTS = 4
+    config.KABELWERK_RETRY_BACKOFF = 1
+    config.KABELWERK_RETRY_MAX_BACKOFF = 3
+    yield
+    config.KABELWERK_MAX_ATTEMPTS = 3
+    config.KABELWERK_RETRY_BACKOFF = 0.1
+    config.KABELWERK_RETRY_MAX_BACKOFF = 2
+
+
+def test_retry_idempotent_methods(retry_config):
+    """
+    The get_retry_delay function should allow retrying idempotent methods and
+    POST requests with an idempotency key.
+    """
+    error = ServerError(make_response(503))
+
+    for method in ['PATCH', 'DELETE', 'GET']:
+        assert get_retry_delay(method, 1, error) is not None
+
+    assert get_retry_delay('POST', 1, error) is None
+    assert get_retry_delay('POST', 1, error, 'key') is not None
+
+
+def test_retry_errors(retry_config):
+    """
+    The get_retry_delay function should only allow retrying transient errors.
+    """
+    for status_code in [429, 502, 503, 504]:
+        error = ServerError(make_response(status_code))
+        assert get_retry_delay('PATCH', 1, error) is not None
+
+    for status_code in [500, 501]:
+        error = ServerError(make_response(status_code))
+        assert get_retry_delay('PATCH', 1, error) is None
+
+    error = ConnectionError(requests.ConnectionError())
+    assert get_retry_delay('PATCH', 1, error) is not None
+
+    error = DoesNotExist(make_response(404))
+    assert get_retry_delay('PATCH', 1, error) is None
+
+
+def test_retry_backoff(retry_config):
+    """
+    The get_retry_delay function should use exponential backoff with full
+    jitter, up to KABELWERK_MAX_ATTEMPTS.
+    """
+    error = ServerError(make_response(503))
+
+    for attempt, max_delay in [(1, 1), (2, 2), (3, 3)]:
+        delays = [get_retry_delay('PATCH', attempt, error) for _ in range(50)]
+
+        assert all(0 <= delay <= max_delay for delay in delays)
+        assert max(delays) > max_delay / 2
+
+    assert get_retry_delay('PATCH', 4, error) is None
+
+
+def test_retry_after(retry_config):
+    """
+    The get_retry_delay function should wait at least as long as asked by the
+    Retry-After header, and not retry if that is too long.
+    """
+    error = ServerError(make_response(429, {'Retry-After': '2.5'}))
+    assert 2.5 <= get_retry_delay('PATCH', 1, error) <= 3
+
+    error = ServerError(make_response(429, {'Retry-After': '60'}))
+    assert get_retry_delay('PATCH', 1, error) is None
+
+
+def test_parse_retry_after():
+    """
+    The parse_retry_after function should accept both seconds and HTTP dates.
+    """
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('') is None
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after('120') == 120
+    assert parse_retry_after('-1') == 0
+
+    date = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 28 < parse_retry_after(format_datetime(date, usegmt=True)) <= 30
+
+    date = datetime.now(timezone.utc) - timedelta(seconds=30)
+    assert parse_retry_after(format_datetime(date, usegmt=True)) == 0
@@ -2,7 +2,8 @@ from datetime import datetime, timezone
 
 from responses.matchers import json_params_matcher
 
-from kabelwerk.api import post_message, update_room
+from kabelwerk.api import broadcast_message, post_message, update_room
+from kabelwerk.exceptions import ConnectionError, DoesNotExist
 from kabelwerk.models import Message, Room, User
 
 
@@ -194,3 +195,54 @@ def test_post_message_no_hub_text(mock_api, mock_response):
     assert message.user.id == 49421
     assert message.user.key == 'batou'
     assert message.user.name == 'Batou'
+
+
+def test_broadcast_message(mock_api, mock_response):
+    """
+    One should be able to post the same message in many rooms and get the
+    posted messages and a summary of the failures.
+    """
+    for index, room in enumerate(['kusanagi', 'togusa']):
+        mock_response('POST', f'/hubs/section9/rooms/{room}/messages', 201, {
+            'html': "<p>Meeting at noon.</p>",
+            'id': 16947 + index,
+            'inserted_at': '2023-07-22T09:46:57Z',
+            'room_id': 22818 + index,
+            'text': "Meeting at noon.",
+            'type': 'text',
+            'updated_at': '2023-07-22T09:46:57Z',
+            'upload': None,
+            'user': {
+                'id': 49421,
+                'key': 'batou',
+                'name': 'Batou',
+            },
+        })
+
+    mock_response('POST', '/hubs/section9/rooms/aramaki/messages', 404)
+
+    broadcast = broadcast_message(
+        hub='section9',
+        rooms=['kusanagi', 'aramaki', 'togusa', 'ishikawa'],
+        user='batou',
+        text='Meeting at noon.',
+        concurrency=2,
+    )
+
+    assert len(mock_api.calls) == 0
+
+    messages = dict(broadcast)
+
+    assert len(mock_api.calls) == 4
+
+    assert sorted(messages) == ['kusanagi', 'togusa']
+    assert isinstance(messages['kusanagi'], Message)
+    assert messages['kusanagi'].id == 16947
+    assert messages['togusa'].id == 16948
+
+    assert broadcast.failures == {
+        ConnectionError: ['ishikawa'],
+        DoesNotExist: ['aramaki'],
+    }
+    assert isinstance(broadcast.errors['aramaki'], DoesNotExist)
+    assert broadcast.wait() == broadcast.failures
@@ -0,0 +1,218 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import pytest
+
+from kabelwerk import config
+from kabelwerk.api import create_user, update_room, update_user
+from kabelwerk.api.client import Client
+from kabelwerk.api.singleflight import SingleFlight, make_key
+from kabelwerk.api.timeouts import deadline
+from kabelwerk.exceptions import DeadlineExceededError, DoesNotExist
+from kabelwerk.fake import FakeServer, fixed
+
+
+@pytest.fixture
+def fake_server():
+    with FakeServer() as server:
+        config.KABELWERK_URL = server.url
+        config.KABELWERK_API_TOKEN = 'fake-token'
+        config.KABELWERK_MAX_ATTEMPTS = 1
+        config.KABELWERK_SINGLE_FLIGHT = True
+
+        yield server
+
+
+def run_at_once(function, times=5):
+    """
+    Call the function from several threads at the same moment and return the
+    results or exceptions.
+    """
+    barrier = threading.Barrier(times)
+
+    def target(_):
+        barrier.wait()
+        try:
+            return function()
+        except Exception as error:
+            return error
+
+    with ThreadPoolExecutor(times) as executor:
+        return list(executor.map(target, range(times)))
+
+
+def test_identical_calls_share_a_request(fake_server):
+    """
+    Identical API calls made at the same time should send a single request
+    and all get the same result.
+    """
+    create_user(key='kusanagi', name='Motoko')
+    fake_server.latency = fixed(0.2)
+    requests = fake_server.counters['requests']
+
+    users = run_at_once(lambda: update_user(key='kusanagi', name='Major'))
+
+    assert fake_server.counters['requests'] == requests + 1
+    assert all(user == users[0] for user in users)
+    assert users[0].name == 'Major'
+
+
+def test_identical_calls_share_an_exception(fake_server):
+    """
+    Identical API calls made at the same time should all raise the exception
+    of the single request sent — each its own copy of it.
+    """
+    fake_server.latency = fixed(0.2)
+
+    errors = run_at_once(lambda: update_room(room='batou', archived=True))
+
+    assert fake_server.counters['requests'] == 1
+    assert all(isinstance(error, DoesNotExist) for error in errors)
+    assert len(set(map(id, errors))) == len(errors)
+
+
+def test_single_flight_is_opt_in(fake_server):
+    """
+    Without KABELWERK_SINGLE_FLIGHT, and for POST requests without an
+    idempotency key, each call should send its own request.
+    """
+    create_user(key='kusanagi', name='Motoko')
+    fake_server.latency = fixed(0.1)
+
+    config.KABELWERK_SINGLE_FLIGHT = False
+    run_at_once(lambda: update_user(key='kusanagi', name='Major'), 3)
+    assert fake_server.counters['requests'] == 4
+
+    config.KABELWERK_SINGLE_FLIGHT = True
+    run_at_once(lambda: create_user(key='batou', name='Batou'), 3)
+    assert fake_server.counters['requests'] == 7
+
+
+def test_make_key():
+    """
+    The key of an API call should not depend on the order of its params but
+    should depend on the client and the idempotency key.
+    """
+    acme = Client('acme.kabelwerk.io', 'token')
+    tyrell = Client('tyrell.kabelwerk.io', 'token')
+
+    assert make_key(acme, 'PATCH', '/hubs/_/rooms/a', {
+        'archived': True, 'attributes': {'a': 1, 'b': 2},
+    }, None) == make_key(acme, 'PATCH', '/hubs/_/rooms/a', {
+        'attributes': {'b': 2, 'a': 1}, 'archived': True,
+    }, None)
+
+    assert make_key(acme, 'DELETE', '/users/a', None, None) != make_key(
+        tyrell, 'DELETE', '/users/a', None, None,
+    )
+
+    assert make_key(acme, 'POST', '/users', {'key': 'a'}, None) is None
+    assert make_key(acme, 'POST', '/users', {'key': 'a'}, '1') != make_key(
+        acme, 'POST', '/users', {'key': 'a'}, '2',
+    )
+
+
+def test_waiters_respect_deadlines():
+    """
+    A call waiting for an identical call in flight should give up when its
+    deadline passes, and should make the call itself if the one in flight is
+    interrupted without a result.
+    """
+    group = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait()
+        raise KeyboardInterrupt
+
+    def lead():
+        try:
+            group.do('key', slow)
+        except KeyboardInterrupt:
+            pass
+
+    thread = threading.Thread(target=lead)
+    thread.start()
+    started.wait()
+
+    with pytest.raises(DeadlineExceededError):
+        with deadline(0.05):
+            group.do('key', lambda: 'mine')
+
+    results = []
+    waiter = threading.Thread(
+        target=lambda: results.append(group.do('key', lambda: 'mine')),
+    )
+    waiter.start()
+
+    while group.counters['shared'] < 2:
+        time.sleep(0.01)
+
+    release.set()
+    thread.join()
+    waiter.join()
+
+    assert group.counters == {'leaders': 2, 'shared': 2}
+    assert results == ['mine']
+
+
+def test_deadlines_are_not_shared(fake_server):
+    """
+    A call waiting for an identical call in flight should make the call
+    itself if the one in flight runs out of its own deadline or timeout.
+    """
+    create_user(key='kusanagi', name='Motoko')
+    fake_server.latency = fixed(0.2)
+    requests = fake_server.counters['requests']
+
+    def lead():
+        with deadline(0.1):
+            return update_user(key='kusanagi', name='Major')
+
+    def follow():
+        time.sleep(0.05)
+        return update_user(key='kusanagi', name='Major')
+
+    with ThreadPoolExecutor(2) as executor:
+        leader, follower = executor.submit(lead), executor.submit(follow)
+
+        with pytest.raises(DeadlineExceededError):
+            leader.result()
+
+        assert follower.result().name == 'Major'
+
+    assert fake_server.counters['requests'] == requests + 2
+
+    group = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def timed_out():
+        started.set()
+        release.wait()
+        raise TimeoutError
+
+    def lead_group():
+        with pytest.raises(TimeoutError):
+            group.do('key', timed_out,
+                     lambda error: not isinstance(error, TimeoutError))
+
+    thread = threading.Thread(target=lead_group)
+    thread.start()
+    started.wait()
+
+    results = []
+    waiter = threading.Thread(
+        target=lambda: results.append(group.do('key', lambda: 'mine')),
+    )
+    waiter.start()
+
+    while group.counters['shared'] < 1:
+        time.sleep(0.01)
+
+    release.set()
+    thread.join()
+    waiter.join()
+
+    assert results == ['mine']
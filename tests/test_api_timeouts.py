@@ -0,0 +1,138 @@
+import asyncio
+import time
+
+import pytest
+
+from kabelwerk import config
+from kabelwerk.api import deadline, update_user
+from kabelwerk.api.breaker import get_circuit_breaker
+from kabelwerk.api.timeouts import get_remaining_time, get_timeout
+from kabelwerk.exceptions import DeadlineExceededError
+from kabelwerk.fake import FakeServer, fixed
+
+
+def test_default_timeouts():
+    """
+    The get_timeout function should return the configured connect and read
+    timeouts, unless the API call is given its own.
+    """
+    config.KABELWERK_CONNECT_TIMEOUT = 1
+    config.KABELWERK_READ_TIMEOUT = 4
+
+    assert get_timeout('PATCH', '/users/kusanagi') == (1, 4)
+    assert get_timeout('PATCH', '/users/kusanagi', 3) == (3, 3)
+    assert get_timeout('PATCH', '/users/kusanagi', (0.5, 6)) == (0.5, 6)
+
+
+def test_per_endpoint_timeouts():
+    """
+    The get_timeout function should use the most specific matching rule in
+    KABELWERK_TIMEOUTS.
+    """
+    config.KABELWERK_TIMEOUTS = {
+        'POST': 5,
+        '/hubs/{hub}/rooms': (1, 3),
+        '/hubs/{hub}/rooms/{room}/messages': (1, 10),
+    }
+
+    assert get_timeout('POST', '/users') == (5, 5)
+    assert get_timeout('PATCH', '/hubs/_/rooms/kusanagi') == (1, 3)
+    assert get_timeout('POST', '/hubs/_/rooms/kusanagi/messages') == (1, 10)
+    assert get_timeout('DELETE', '/users/kusanagi') == (
+        config.KABELWERK_CONNECT_TIMEOUT, config.KABELWERK_READ_TIMEOUT,
+    )
+
+
+def test_deadline_caps_timeouts():
+    """
+    The timeouts should be capped to the time left until the deadline, and a
+    nested deadline should not extend the outer one.
+    """
+    assert get_remaining_time() is None
+
+    with deadline(0.5):
+        connect, read = get_timeout('PATCH', '/users/kusanagi', 2)
+        assert 0.4 < connect <= 0.5 and 0.4 < read <= 0.5
+
+        with deadline(10):
+            assert get_remaining_time() <= 0.5
+
+        with pytest.raises(DeadlineExceededError):
+            get_timeout('PATCH', '/users/kusanagi', 2, wait=1)
+
+    assert get_remaining_time() is None
+
+
+def test_deadline_is_per_task():
+    """
+    The deadline should only apply to the asyncio task which sets it.
+    """
+    async def with_deadline():
+        with deadline(1):
+            await asyncio.sleep(0.01)
+            return get_remaining_time()
+
+    async def without_deadline():
+        await asyncio.sleep(0.01)
+        return get_remaining_time()
+
+    async def main():
+        return await asyncio.gather(with_deadline(), without_deadline())
+
+    remaining, other = asyncio.run(main())
+
+    assert remaining is not None
+    assert other is None
+
+
+def test_expired_deadline_skips_request(api_token, mock_api):
+    """
+    An API call made after the deadline has passed should raise a
+    DeadlineExceededError without sending a request.
+    """
+    with deadline(0):
+        with pytest.raises(DeadlineExceededError) as exc_info:
+            update_user(key='kusanagi', name='Motoko')
+
+    assert exc_info.value.cause is None
+    assert len(mock_api.calls) == 0
+
+
+def test_deadline_interrupts_slow_request():
+    """
+    A request outlasting the deadline should be cut short with a
+    DeadlineExceededError, without retrying it or tripping the circuit
+    breaker.
+    """
+    config.KABELWERK_BREAKER_THRESHOLD = 1
+
+    with FakeServer(latency=fixed(0.5)) as server:
+        config.KABELWERK_URL = server.url
+        config.KABELWERK_API_TOKEN = 'fake-token'
+
+        started_at = time.monotonic()
+
+        with deadline(0.1):
+            with pytest.raises(DeadlineExceededError) as exc_info:
+                update_user(key='kusanagi', name='Motoko')
+
+        assert time.monotonic() - started_at < 0.4
+        assert exc_info.value.cause is not None
+        assert server.counters['requests'] <= 1
+
+    assert get_circuit_breaker().state == 'closed'
+
+
+def test_timeout_passthrough(mock_api, mock_response):
+    """
+    The API functions should pass their timeout argument on to the request.
+    """
+    mock_response('PATCH', '/users/kusanagi', 200, {
+        'id': 2,
+        'key': 'kusanagi',
+        'name': 'Motoko',
+    })
+
+    update_user(key='kusanagi', name='Motoko', timeout=(0.5, 7))
+
+    assert mock_api.calls[0].request.req_kwargs['timeout'] == (0.5, 7)
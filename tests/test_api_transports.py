@@ -0,0 +1,115 @@
+import pytest
+
+from kabelwerk import config
+from kabelwerk.api import create_user, deadline, update_room, update_user
+from kabelwerk.api.base import close_session, get_headers, get_transport
+from kabelwerk.exceptions import (
+    AuthenticationError, ConnectionError, DeadlineExceededError, DoesNotExist,
+    ServerError, ValidationError,
+)
+from kabelwerk.fake import FakeServer, fixed
+
+
+@pytest.fixture(params=['requests', 'urllib3'])
+def transport(request):
+    config.KABELWERK_TRANSPORT = request.param
+
+    with FakeServer() as server:
+        config.KABELWERK_URL = server.url
+        config.KABELWERK_API_TOKEN = 'fake-token'
+        config.KABELWERK_MAX_ATTEMPTS = 1
+
+        yield server
+
+    close_session()
+
+
+def test_transport_responses(transport):
+    """
+    Both transports should return the decoded payloads of the responses.
+    """
+    user = create_user(key='kusanagi', name='Motoko')
+    assert user.name == 'Motoko'
+
+    assert update_user(key='kusanagi', name='Major').name == 'Major'
+
+    room = update_room(room='kusanagi', archived=True)
+    assert room.archived is True
+    assert room.user.key == 'kusanagi'
+
+
+def test_transport_errors(transport):
+    """
+    Both transports should map the error responses to the same exceptions,
+    carrying the response.
+    """
+    create_user(key='kusanagi', name='Motoko')
+
+    with pytest.raises(ValidationError) as exc_info:
+        create_user(key='kusanagi', name='Motoko')
+    assert exc_info.value.field == 'key'
+    assert exc_info.value.response.status_code == 400
+    assert exc_info.value.request.method == 'POST'
+
+    with pytest.raises(DoesNotExist):
+        update_user(key='batou', name='Batou')
+
+    transport.error_rate = 1
+    with pytest.raises(ServerError) as exc_info:
+        update_user(key='kusanagi', name='Motoko')
+    assert exc_info.value.response.status_code in [500, 502, 503]
+
+    transport.error_rate, transport.drop_rate = 0, 1
+    with pytest.raises(ConnectionError):
+        update_user(key='kusanagi', name='Motoko')
+
+    transport.drop_rate, transport.latency = 0, fixed(0.5)
+    with deadline(0.05), pytest.raises(DeadlineExceededError):
+        update_user(key='kusanagi', name='Motoko')
+
+    transport.latency = None
+    config.KABELWERK_API_TOKEN = 'wrong'
+    with pytest.raises(AuthenticationError):
+        update_user(key='kusanagi', name='Motoko')
+
+
+def test_transport_retry_after(transport):
+    """
+    Both transports should expose the response headers to the retry policy.
+    """
+    config.KABELWERK_MAX_ATTEMPTS = 2
+    config.KABELWERK_RETRY_MAX_BACKOFF = 0.5
+    transport.burst = (60, 30)
+
+    with pytest.raises(ServerError) as exc_info:
+        update_user(key='kusanagi', name='Motoko')
+
+    assert exc_info.value.response.headers['Retry-After'] == '30'
+    assert transport.counters['bursts'] == 1
+
+
+def test_unknown_transport():
+    """
+    The get_transport function should raise a ValueError for an unknown
+    transport name.
+    """
+    config.KABELWERK_TRANSPORT = 'carrier-pigeon'
+
+    with pytest.raises(ValueError):
+        get_transport()
+
+
+def test_headers_are_built_once(api_token):
+    """
+    The get_headers function should reuse the static headers until the API
+    token changes.
+    """
+    headers = get_headers()
+    assert get_headers() is headers
+
+    with_key = get_headers('a')
+    assert with_key['Idempotency-Key'] == 'a'
+    assert 'Idempotency-Key' not in get_headers()
+
+    config.KABELWERK_API_TOKEN = 'OTHER'
+    assert get_headers()['Kabelwerk-Token'] == 'OTHER'
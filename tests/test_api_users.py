@@ -1,6 +1,10 @@
 from responses.matchers import json_params_matcher
 
-from kabelwerk.api import create_user, delete_user, update_user
+from kabelwerk.api import (
+    create_user, create_users, delete_user, delete_users, update_user,
+    update_users,
+)
+from kabelwerk.exceptions import DoesNotExist, ValidationError
 from kabelwerk.models import User
 
 
@@ -67,3 +71,111 @@ def test_delete_user_works(mock_api, mock_response):
     assert mock_api.calls[0].request.body is None
 
     assert output is None
+
+
+"""
+bulk operations
+"""
+
+
+def test_create_users_works(mock_api, mock_response):
+    """
+    The create_users function should return, in the order of the input, the
+    created users and the exceptions of the failed calls.
+    """
+    mock_response('POST', '/users', 201, {
+        'id': 2,
+        'key': 'kusanagi',
+        'name': 'Motoko',
+    })
+    mock_response('POST', '/users', 400, {
+        'errors': {'name': ["can't be blank"]},
+    })
+
+    results = create_users([
+        {'key': 'kusanagi', 'name': 'Motoko'},
+        {'key': 'batou', 'name': ''},
+        {'key': 'togusa', 'name': 'Togusa', 'hub': 'section9'},
+    ], concurrency=1)
+
+    assert len(mock_api.calls) == 3
+
+    assert results[0] == User(id=2, key='kusanagi', name='Motoko')
+    assert isinstance(results[1], ValidationError)
+    assert results[1].field == 'name'
+    assert isinstance(results[2], ValidationError)
+
+
+def test_bulk_malformed_rows(mock_api, mock_response):
+    """
+    A row with missing or unexpected keys should result in a TypeError of
+    its own, without an API call and without aborting the other rows.
+    """
+    mock_response('POST', '/users', 201, {
+        'id': 2,
+        'key': 'kusanagi',
+        'name': 'Motoko',
+    })
+
+    results = create_users([
+        {'key': 'togusa'},
+        {'key': 'kusanagi', 'name': 'Motoko'},
+        {'key': 'batou', 'name': 'Batou', 'rank': 'sergeant'},
+        {'key': 'aramaki', 'name': 'Daisuke', 'client': None},
+    ])
+
+    assert len(mock_api.calls) == 1
+
+    assert isinstance(results[0], TypeError)
+    assert results[1] == User(id=2, key='kusanagi', name='Motoko')
+    assert isinstance(results[2], TypeError)
+    assert isinstance(results[3], TypeError)
+
+    results = update_users([{'name': 'Motoko'}])
+
+    assert isinstance(results[0], TypeError)
+    assert len(mock_api.calls) == 1
+
+
+def test_update_users_works(mock_api, mock_response):
+    """
+    The update_users function should return the updated users in the order of
+    the input.
+    """
+    for key, name in [('kusanagi', 'Motoko'), ('batou', 'Batou')]:
+        mock_response('PATCH', f'/users/{key}', 200, {
+            'id': len(name),
+            'key': key,
+            'name': name,
+        })
+
+    results = update_users(
+        ({'key': key, 'name': name} for key, name in [
+            ('kusanagi', 'Motoko'),
+            ('batou', 'Batou'),
+        ]),
+        concurrency=2,
+    )
+
+    assert len(mock_api.calls) == 2
+
+    assert results == [
+        User(id=6, key='kusanagi', name='Motoko'),
+        User(id=5, key='batou', name='Batou'),
+    ]
+
+
+def test_delete_users_works(mock_api, mock_response):
+    """
+    The delete_users function should return None for each deleted user and the
+    exception for each user that could not be deleted.
+    """
+    mock_response('DELETE', '/users/kusanagi', 204)
+    mock_response('DELETE', '/users/batou', 404)
+
+    results = delete_users(['kusanagi', 'batou'])
+
+    assert len(mock_api.calls) == 2
+
+    assert results[0] is None
+    assert isinstance(results[1], DoesNotExist)
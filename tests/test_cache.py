@@ -0,0 +1,152 @@
+import pytest
+
+from kabelwerk import config
+from kabelwerk.api import delete_user, update_room, update_user
+from kabelwerk.cache import DjangoCache, LocalCache
+
+
+ROOM = {
+    'archived': False,
+    'attributes': {'seven': 7},
+    'hub_user': {'id': 49448, 'key': 'batou', 'name': 'Batou'},
+    'id': 22833,
+    'user': {'id': 49447, 'key': 'kusanagi', 'name': 'Motoko'},
+}
+
+
+@pytest.fixture
+def cache():
+    config.KABELWERK_CACHE = LocalCache()
+
+    return config.KABELWERK_CACHE
+
+
+def test_local_cache_lru_and_ttl(monkeypatch):
+    """
+    The local cache should evict the least recently used entries when full
+    and drop the entries which have expired.
+    """
+    now = [100.0]
+    monkeypatch.setattr('kabelwerk.cache.time.monotonic', lambda: now[0])
+
+    cache = LocalCache(max_size=2, ttl=10)
+
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+    now[0] += 11
+    assert cache.get('a') is None
+
+    cache.set('a', 4)
+    cache.delete('a')
+    assert cache.get('a') is None
+
+
+def test_django_cache_keys():
+    """
+    The DjangoCache keys should be short and safe for memcached, whatever the
+    API URL and the user keys, and should still keep the entries apart.
+    """
+    cache = DjangoCache(prefix='kw')
+
+    key = cache._make_key('https://hub.kabelwerk.io/apiuser:' + 'ü ' * 200)
+    assert len(key) < 250
+    assert key.isascii() and ' ' not in key
+    assert key.startswith('kw:')
+
+    assert cache._make_key('user:a') != cache._make_key('user:b')
+    assert cache._make_key('user:a') == cache._make_key('user:a')
+
+
+def test_update_user_skipped_if_unchanged(cache, mock_api, mock_response):
+    """
+    With the cache on, an update_user call which would not change the cached
+    user should not make a request.
+    """
+    mock_response('PATCH', '/users/kusanagi', 200, {
+        'id': 2,
+        'key': 'kusanagi',
+        'name': 'Motoko',
+    })
+
+    first = update_user(key='kusanagi', name='Motoko')
+    second = update_user(key='kusanagi', name='Motoko')
+
+    assert len(mock_api.calls) == 1
+    assert second == first
+
+    mock_response('PATCH', '/users/kusanagi', 200, {
+        'id': 2,
+        'key': 'kusanagi',
+        'name': 'Major',
+    })
+
+    assert update_user(key='kusanagi', name='Major').name == 'Major'
+    assert len(mock_api.calls) == 2
+
+
+def test_delete_user_uncaches(cache, mock_api, mock_response):
+    """
+    Deleting a user should remove it from the cache.
+    """
+    mock_response('PATCH', '/users/kusanagi', 200, {
+        'id': 2,
+        'key': 'kusanagi',
+        'name': 'Motoko',
+    })
+    mock_response('DELETE', '/users/kusanagi', 204)
+
+    update_user(key='kusanagi', name='Motoko')
+    delete_user(key='kusanagi')
+    update_user(key='kusanagi', name='Motoko')
+
+    assert len(mock_api.calls) == 3
+
+
+def test_update_room_skipped_if_unchanged(cache, mock_api, mock_response):
+    """
+    With the cache on, an update_room call which would not change the cached
+    room should not make a request — and mutating a returned room should not
+    affect the cache.
+    """
+    mock_response('PATCH', '/hubs/section9/rooms/kusanagi', 200, ROOM)
+    mock_response('PATCH', '/hubs/_/rooms/kusanagi', 200, ROOM)
+
+    room = update_room(hub='section9', room='kusanagi',
+                       attributes={'seven': 7}, hub_user='batou')
+    assert len(mock_api.calls) == 1
+
+    room = update_room(hub='section9', room='kusanagi', archived=False,
+                       hub_user='batou')
+    assert len(mock_api.calls) == 1
+    assert room.id == 22833
+
+    room.attributes['eight'] = 8
+    update_room(hub='section9', room='kusanagi', attributes=room.attributes)
+    assert len(mock_api.calls) == 2
+
+    update_room(hub='section9', room='kusanagi', hub_user=None)
+    update_room(hub='_', room='kusanagi', archived=False)
+    assert len(mock_api.calls) == 4
+
+
+def test_no_cache_by_default(mock_api, mock_response):
+    """
+    Without a cache, every update should make a request.
+    """
+    mock_response('PATCH', '/users/kusanagi', 200, {
+        'id': 2,
+        'key': 'kusanagi',
+        'name': 'Motoko',
+    })
+
+    update_user(key='kusanagi', name='Motoko')
+    update_user(key='kusanagi', name='Motoko')
+
+    assert len(mock_api.calls) == 2
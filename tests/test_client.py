@@ -0,0 +1,192 @@
+import asyncio
+
+import pytest
+
+from kabelwerk import aio, config
+from kabelwerk.api import Client, create_user
+from kabelwerk.api.base import get_transport
+from kabelwerk.api.client import get_client
+from kabelwerk.cache import LocalCache
+from kabelwerk.exceptions import (
+    AuthenticationError, CircuitOpenError, ConnectionError,
+)
+from kabelwerk.fake import FakeKabelwerk, FakeServer
+
+
+@pytest.fixture
+def backends():
+    with FakeServer(FakeKabelwerk(token='acme-token')) as acme:
+        with FakeServer(FakeKabelwerk(token='tyrell-token')) as tyrell:
+            config.KABELWERK_MAX_ATTEMPTS = 1
+
+            yield acme, tyrell
+
+
+def test_clients_talk_to_their_backends(backends):
+    """
+    Each client should make its API calls to its own backend with its own API
+    token, regardless of the module-level configuration.
+    """
+    acme = Client(backends[0].url, 'acme-token')
+    tyrell = Client(backends[1].url, 'tyrell-token', transport='urllib3')
+
+    acme.create_user(key='kusanagi', name='Motoko')
+    tyrell.create_users([{'key': 'batou', 'name': 'Batou'}])
+    tyrell.update_user(key='batou', name='Batou!')
+
+    assert list(backends[0].backend.users) == ['kusanagi']
+    assert backends[1].backend.users['batou']['name'] == 'Batou!'
+
+    # the module functions keep using the default client
+    with pytest.raises(ValueError):
+        create_user(key='togusa', name='Togusa')
+
+    with pytest.raises(AuthenticationError):
+        Client(backends[0].url, 'tyrell-token').delete_user(key='kusanagi')
+
+    acme.close()
+    tyrell.close()
+
+
+def test_clients_own_their_transports(backends):
+    """
+    A client given a transport name should create its own transport, and a
+    client given a transport object should use it as it is.
+    """
+    acme = Client(backends[0].url, 'acme-token', pool_size=2)
+    assert acme.transport is not get_transport()
+    assert acme.transport.pool.adapters['http://']._pool_maxsize == 2
+
+    shared = Client(backends[0].url, 'acme-token', transport=get_transport())
+    assert shared.transport is get_transport()
+
+    pool = get_transport().pool
+    shared.close()
+    assert get_transport().pool is pool
+
+    acme.close()
+    assert acme.transport._pool is None
+
+
+def test_client_validates_once():
+    """
+    The client should validate its URL and API token when created.
+    """
+    with pytest.raises(ValueError):
+        Client('not a url', 'token')
+
+    with pytest.raises(ValueError):
+        Client('kabelwerk.io', '')
+
+    with pytest.raises(ValueError):
+        Client('kabelwerk.io', 'token', transport='carrier-pigeon')
+
+    client = Client('http://localhost:4000', 'token', read_timeout=5,
+                    timeouts={'/users': 1})
+
+    assert client.api_url == 'http://localhost:4000/api'
+    assert client.socket_url == 'ws://localhost:4000/socket/api/websocket'
+    assert client.get_headers()['Kabelwerk-Token'] == 'token'
+    assert client.get_headers('a')['Idempotency-Key'] == 'a'
+    assert client.get_timeout('PATCH', '/users/kusanagi') == 1
+    assert client.get_timeout('PATCH', '/hubs/_/rooms/kusanagi') == (2, 5)
+
+
+def test_default_client_follows_config(api_token):
+    """
+    The default client should be reused until the settings it is built from
+    change.
+    """
+    client = get_client()
+    assert get_client() is client
+    assert client.transport is get_transport()
+
+    config.KABELWERK_URL = 'http://localhost:4000'
+    assert get_client() is not client
+    assert get_client().api_url == 'http://localhost:4000/api'
+
+    config.KABELWERK_API_TOKEN = ''
+    with pytest.raises(ValueError):
+        get_client()
+
+
+def test_named_clients(backends):
+    """
+    The named clients should be created from KABELWERK_CLIENTS on first use
+    and be recreated when the setting is replaced.
+    """
+    config.KABELWERK_CLIENTS = {
+        'acme': {'url': backends[0].url, 'api_token': 'acme-token'},
+    }
+
+    acme = get_client('acme')
+    assert get_client('acme') is acme
+
+    create_user(key='kusanagi', name='Motoko', client=acme)
+    assert 'kusanagi' in backends[0].backend.users
+
+    with pytest.raises(ValueError):
+        get_client('tyrell')
+
+    config.KABELWERK_CLIENTS = {
+        'acme': {'url': backends[1].url, 'api_token': 'tyrell-token'},
+    }
+    assert get_client('acme') is not acme
+    assert get_client('acme').api_url == backends[1].url + '/api'
+
+
+def test_cache_is_namespaced_by_backend(backends):
+    """
+    The cached users of different backends should not be mixed up.
+    """
+    config.KABELWERK_CACHE = LocalCache()
+
+    acme = Client(backends[0].url, 'acme-token')
+    tyrell = Client(backends[1].url, 'tyrell-token')
+
+    acme.create_user(key='kusanagi', name='Motoko')
+    tyrell.create_user(key='kusanagi', name='Major')
+
+    # answered from the cache of the first backend
+    assert acme.update_user(key='kusanagi', name='Motoko').name == 'Motoko'
+    assert backends[1].backend.users['kusanagi']['name'] == 'Major'
+
+    tyrell.update_user(key='kusanagi', name='Motoko')
+    assert backends[1].backend.users['kusanagi']['name'] == 'Motoko'
+
+
+def test_circuit_breaker_per_backend(backends):
+    """
+    An outage of one backend should open its circuit breaker only, without
+    failing the API calls made to the other backends.
+    """
+    config.KABELWERK_BREAKER_THRESHOLD = 3
+
+    down = Client('http://127.0.0.1:9', 'down-token')
+    acme = Client(backends[0].url, 'acme-token')
+
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            down.create_user(key='kusanagi', name='Motoko')
+
+    with pytest.raises(CircuitOpenError):
+        down.create_user(key='kusanagi', name='Motoko')
+
+    assert acme.create_user(key='kusanagi', name='Motoko').key == 'kusanagi'
+    assert asyncio.run(aio.create_user(
+        key='batou', name='Batou', client=acme,
+    )).key == 'batou'
+
+
+def test_async_functions_take_a_client(backends):
+    """
+    The async API functions should also make their calls with the given
+    client.
+    """
+    tyrell = Client(backends[1].url, 'tyrell-token')
+
+    user = asyncio.run(aio.create_user(key='batou', name='Batou',
+                                       client=tyrell))
+
+    assert user.key == 'batou'
+    assert 'batou' in backends[1].backend.users
@@ -1,3 +1,5 @@
+import importlib
+
 import pytest
 
 from kabelwerk import config
@@ -46,3 +48,45 @@ def test_get_api_token():
 
     config.KABELWERK_API_TOKEN = 'TOKEN'
     assert config.get_api_token() == 'TOKEN'
+
+
+def test_socket_urls():
+    """
+    The get_socket_url function should infer the websocket URL from
+    KABELWERK_URL.
+    """
+    config.KABELWERK_URL = 'kabelwerk.io'
+    assert config.get_socket_url() == 'wss://kabelwerk.io/socket/api/websocket'
+
+    config.KABELWERK_URL = 'http://localhost:4000'
+    assert config.get_socket_url() == (
+        'ws://localhost:4000/socket/api/websocket'
+    )
+
+    config.KABELWERK_URL = 'https://kabelwerk.io/api'
+    assert config.get_socket_url() == 'wss://kabelwerk.io/socket/api/websocket'
+
+    config.KABELWERK_URL = 'WSS://KABELWERK.IO/socket/hub/'
+    assert config.get_socket_url() == 'wss://kabelwerk.io/socket/hub/websocket'
+
+    config.KABELWERK_URL = 'not a url'
+    with pytest.raises(ValueError):
+        config.get_socket_url()
+
+
+def test_log_redacted_fields(monkeypatch):
+    """
+    The names and the texts should be redacted from the log entries by
+    default, which the environment variable should be able to change.
+    """
+    monkeypatch.delenv('KABELWERK_LOG_REDACTED_FIELDS', raising=False)
+    importlib.reload(config)
+    assert config.KABELWERK_LOG_REDACTED_FIELDS == ['name', 'text']
+
+    monkeypatch.setenv('KABELWERK_LOG_REDACTED_FIELDS', 'attributes')
+    importlib.reload(config)
+    assert config.KABELWERK_LOG_REDACTED_FIELDS == ['attributes']
+
+    monkeypatch.setenv('KABELWERK_LOG_REDACTED_FIELDS', '')
+    importlib.reload(config)
+    assert config.KABELWERK_LOG_REDACTED_FIELDS == []
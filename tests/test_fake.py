@@ -0,0 +1,146 @@
+import pytest
+
+from kabelwerk import config
+from kabelwerk.api import (
+    create_user, delete_user, post_message, update_room, update_user,
+)
+from kabelwerk.exceptions import (
+    AuthenticationError, ConnectionError, DoesNotExist, ServerError,
+    ValidationError,
+)
+from kabelwerk.fake import FakeKabelwerk, FakeServer, fixed, parse_latency
+
+
+@pytest.fixture
+def fake_server():
+    with FakeServer(seed=42) as server:
+        config.KABELWERK_URL = server.url
+        config.KABELWERK_API_TOKEN = 'fake-token'
+        config.KABELWERK_MAX_ATTEMPTS = 1
+
+        yield server
+
+
+def test_fake_server_keeps_state(fake_server):
+    """
+    The fake server should serve the SDK's API calls from its in-memory state.
+    """
+    user = create_user(key='kusanagi', name='Motoko')
+    hub_user = create_user(key='batou', name='Batou', hub='section9')
+
+    assert update_user(key='kusanagi', name='Major').name == 'Major'
+
+    room = update_room(hub='section9', room='kusanagi', hub_user='batou',
+                       attributes={'tags': ['vip']})
+    assert room.user == user._replace(name='Major')
+    assert room.hub_user == hub_user
+    assert room.attributes == {'tags': ['vip']}
+
+    message = post_message(room='kusanagi', user='kusanagi', text='a < b')
+    assert message.room_id == room.id
+    assert message.html == '<p>a &lt; b</p>'
+    assert message.inserted_at.year >= 2023
+
+    delete_user(key='kusanagi')
+    with pytest.raises(DoesNotExist):
+        update_user(key='kusanagi', name='Motoko')
+
+
+def test_fake_server_error_shapes(fake_server):
+    """
+    The fake server's errors should be mapped to the SDK's exceptions.
+    """
+    create_user(key='kusanagi', name='Motoko')
+
+    with pytest.raises(ValidationError) as exc_info:
+        create_user(key='kusanagi', name='Motoko')
+    assert 'key' in str(exc_info.value)
+
+    with pytest.raises(ValidationError):
+        update_user(key='kusanagi', name='')
+
+    with pytest.raises(DoesNotExist):
+        update_room(hub='laughing-man', room='kusanagi', archived=True)
+
+    config.KABELWERK_API_TOKEN = 'wrong'
+    with pytest.raises(AuthenticationError):
+        update_user(key='kusanagi', name='Motoko')
+
+
+def test_fake_server_replays_idempotent_requests(fake_server):
+    """
+    The fake server should answer a repeated request with the same idempotency
+    key with the original response.
+    """
+    create_user(key='kusanagi', name='Motoko')
+
+    first = post_message(room='kusanagi', user='kusanagi', text='Hello',
+                         idempotency_key='a')
+    second = post_message(room='kusanagi', user='kusanagi', text='Hello',
+                          idempotency_key='a')
+
+    assert first == second
+    assert len(fake_server.backend.messages[first.room_id]) == 1
+
+
+def test_fake_server_injects_faults():
+    """
+    The fake server should inject server errors, dropped connections, and 429
+    bursts at the configured rates.
+    """
+    with FakeServer(error_rate=1) as server:
+        config.KABELWERK_URL = server.url
+        config.KABELWERK_API_TOKEN = 'fake-token'
+        config.KABELWERK_MAX_ATTEMPTS = 1
+
+        with pytest.raises(ServerError):
+            create_user(key='kusanagi', name='Motoko')
+
+    with FakeServer(drop_rate=1) as server:
+        config.KABELWERK_URL = server.url
+
+        with pytest.raises(ConnectionError):
+            create_user(key='kusanagi', name='Motoko')
+
+    with FakeServer(burst=(60, 30)) as server:
+        config.KABELWERK_URL = server.url
+
+        with pytest.raises(ServerError):
+            create_user(key='kusanagi', name='Motoko')
+
+        assert server.counters['bursts'] == 1
+        assert server.backend.users == {}
+
+
+def test_fake_server_latency(fake_server):
+    """
+    The fake server should delay its responses by the latency distribution.
+    """
+    fake_server.latency = fixed(0.05)
+
+    create_user(key='kusanagi', name='Motoko')
+
+    assert fake_server.latency(fake_server.random) == 0.05
+    assert parse_latency('uniform:0.1,0.2')(fake_server.random) >= 0.1
+
+    with pytest.raises(ValueError):
+        parse_latency('gaussian:1')
+
+
+def test_fake_backend_without_server():
+    """
+    The backend should be usable without the HTTP server.
+    """
+    backend = FakeKabelwerk(hubs=['section9'])
+
+    assert backend.handle('POST', '/api/users', {'Kabelwerk-Token': 'nope'},
+                          b'')[0] == 401
+
+    status, payload = backend.handle(
+        'POST', '/api/users', {'Kabelwerk-Token': 'fake-token'}, b'{}',
+    )
+    assert status == 400
+    assert payload == {'errors': {
+        'key': ["can't be blank"],
+        'name': ["can't be blank"],
+    }}
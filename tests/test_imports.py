@@ -0,0 +1,105 @@
+import inspect
+import subprocess
+import sys
+
+import kabelwerk
+from kabelwerk import api, aio, exceptions
+
+
+# the modules which should only be imported once they are needed
+HEAVY_MODULES = [
+    'concurrent.futures',
+    'httpx',
+    'kabelwerk.api.base',
+    'kabelwerk.api.dispatcher',
+    'kabelwerk.models',
+    'requests',
+    'urllib3',
+]
+
+SCRIPT = '''
+import sys
+
+import kabelwerk
+import kabelwerk.aio
+import kabelwerk.api
+
+print(' '.join(sys.modules))
+'''
+
+
+def test_import_is_cheap():
+    """
+    Importing kabelwerk, kabelwerk.api, and kabelwerk.aio should not import
+    the HTTP libraries or the other modules which are only needed once an
+    API call is made.
+    """
+    modules = subprocess.run(
+        [sys.executable, '-c', SCRIPT],
+        capture_output=True, check=True, text=True,
+    ).stdout.split()
+
+    assert [name for name in HEAVY_MODULES if name in modules] == []
+
+
+# the maximum time, in microseconds, which importing kabelwerk, kabelwerk.api,
+# and kabelwerk.aio should take — generously above the actual time, so that
+# the test only fails if something heavy starts to be imported eagerly
+IMPORT_BUDGET = 100_000
+
+
+def test_import_time_budget():
+    """
+    The cumulative time reported by python -X importtime for the kabelwerk
+    imports should stay within the budget.
+    """
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCRIPT],
+        capture_output=True, check=True, text=True,
+    ).stderr
+
+    total = 0
+
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        _, cumulative, name = line.split('|')
+
+        # only the top-level imports, as the nested ones are included in the
+        # cumulative time of their parents
+        if name.startswith(' kabelwerk'):
+            total += int(cumulative)
+
+    assert 0 < total < IMPORT_BUDGET
+
+
+def test_lazy_attributes():
+    """
+    The lazily imported names should resolve to the same objects as in their
+    modules, and be listed by dir.
+    """
+    for package in [api, aio]:
+        for name in package.__all__:
+            function = getattr(package, name)
+            assert function.__name__ == name
+            assert name in dir(package)
+
+    exception_classes = sorted(
+        name for name, value in vars(exceptions).items()
+        if inspect.isclass(value)
+    )
+    assert kabelwerk.__all__ == exception_classes
+    assert kabelwerk.DoesNotExist is exceptions.DoesNotExist
+
+
+def test_dispatch_is_not_shadowed():
+    """
+    The dispatch function should not be shadowed by the module defining it,
+    whether the latter is imported first or not.
+    """
+    import kabelwerk.api.dispatcher  # noqa: F401
+
+    from kabelwerk.api import dispatch
+
+    assert callable(dispatch) and dispatch.__name__ == 'dispatch'
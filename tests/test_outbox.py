@@ -0,0 +1,121 @@
+import json
+
+import pytest
+
+from kabelwerk import config
+from kabelwerk.outbox import Outbox
+
+
+def message(id, text):
+    return {
+        'html': f'<p>{text}</p>',
+        'id': id,
+        'inserted_at': '2023-07-22T09:46:57Z',
+        'room_id': 22818,
+        'text': text,
+        'type': 'text',
+        'updated_at': '2023-07-22T09:46:57Z',
+        'upload': None,
+        'user': {'id': 49421, 'key': 'batou', 'name': 'Batou'},
+    }
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    config.KABELWERK_MAX_ATTEMPTS = 1
+
+    outbox = Outbox(tmp_path / 'outbox.sqlite3', retry_backoff=0)
+
+    yield outbox
+
+    outbox.close()
+
+
+def test_outbox_delivers_in_order(outbox, mock_api, mock_response):
+    """
+    The messages should be delivered one at a time per room and in the order
+    in which they were appended, each with its own idempotency key.
+    """
+    mock_response('POST', '/hubs/_/rooms/kusanagi/messages', 201,
+                  message(1, 'one'))
+    mock_response('POST', '/hubs/_/rooms/togusa/messages', 201,
+                  message(2, 'two'))
+
+    outbox.post_messages([
+        {'room': 'kusanagi', 'user': 'batou', 'text': 'one'},
+        {'room': 'kusanagi', 'user': 'batou', 'text': 'three'},
+    ])
+    outbox.post_message(room='togusa', user='batou', text='two')
+
+    assert outbox.depth == 3
+    assert outbox.age >= 0
+
+    assert outbox.deliver() == 2
+    assert outbox.depth == 1
+
+    assert outbox.deliver() == 1
+    assert outbox.deliver() == 0
+    assert outbox.depth == 0
+    assert outbox.age == 0
+
+    requests = [call.request for call in mock_api.calls]
+    assert [json.loads(r.body)['text'] for r in requests] in (
+        ['one', 'two', 'three'], ['two', 'one', 'three'],
+    )
+    assert len({r.headers['Idempotency-Key'] for r in requests}) == 3
+
+
+def test_outbox_retries_and_fails(outbox, mock_api, mock_response):
+    """
+    A message which cannot be posted should be retried and should hold back
+    the later messages in its room, whereas a message which is rejected as
+    invalid should be marked as failed.
+    """
+    mock_response('POST', '/hubs/_/rooms/kusanagi/messages', 503)
+    mock_response('POST', '/hubs/_/rooms/kusanagi/messages', 201,
+                  message(1, 'one'))
+    mock_response('POST', '/hubs/_/rooms/togusa/messages', 400,
+                  {'errors': {'text': ['is invalid']}})
+
+    outbox.post_message(room='kusanagi', user='batou', text='one')
+    outbox.post_message(room='kusanagi', user='batou', text='two')
+    outbox.post_message(room='togusa', user='batou', text='')
+
+    assert outbox.deliver() == 0
+    assert outbox.depth == 2
+    assert outbox.failed == 1
+    assert outbox.failed_messages()[0]['room'] == 'togusa'
+    assert 'ValidationError' in outbox.failed_messages()[0]['last_error']
+
+    assert outbox.deliver() == 1
+    assert outbox.deliver() == 1
+    assert outbox.depth == 0
+
+    keys = [
+        call.request.headers['Idempotency-Key'] for call in mock_api.calls
+        if 'kusanagi' in call.request.url
+    ]
+    assert len(keys) == 3
+    assert keys[0] == keys[1] != keys[2]
+
+
+def test_outbox_survives_restart(tmp_path, mock_api, mock_response):
+    """
+    The appended messages should still be in the outbox after reopening it.
+    """
+    mock_response('POST', '/hubs/_/rooms/kusanagi/messages', 201,
+                  message(1, 'one'))
+
+    outbox = Outbox(tmp_path / 'outbox.sqlite3')
+    outbox.post_message(room='kusanagi', user='batou', text='one')
+    outbox.close()
+
+    outbox = Outbox(tmp_path / 'outbox.sqlite3', poll_interval=0.01)
+    outbox.start()
+
+    while outbox.depth:
+        pass
+
+    outbox.close()
+
+    assert len(mock_api.calls) == 1
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import socket as socket_module
+
+import pytest
+from websockets.asyncio.server import serve
+
+from kabelwerk import config
+from kabelwerk.exceptions import (
+    AuthenticationError, ChannelError, ConnectionError,
+)
+from kabelwerk.socket import Socket
+
+
+class Backend:
+    """
+    A minimal stand-in for the Kabelwerk backend's websocket, speaking the
+    Phoenix channels protocol.
+    """
+
+    def __init__(self):
+        self.paths = []
+        self.joins = []
+        self.heartbeats = 0
+        self.connections = []
+
+    async def handle(self, websocket):
+        self.paths.append(websocket.request.path)
+        self.connections.append(websocket)
+
+        async for data in websocket:
+            join_ref, ref, topic, event, payload = json.loads(data)
+
+            if event == 'heartbeat':
+                self.heartbeats += 1
+                status = 'ok'
+            elif event == 'phx_join':
+                self.joins.append(topic)
+                status = 'error' if topic == 'forbidden' else 'ok'
+            else:
+                status = 'ok'
+
+            await websocket.send(json.dumps([
+                join_ref, ref, topic, 'phx_reply',
+                {'status': status, 'response': payload},
+            ]))
+
+    async def broadcast(self, topic, event, payload):
+        for websocket in self.connections:
+            await websocket.send(json.dumps([
+                None, None, topic, event, payload,
+            ]))
+
+
+@pytest.fixture
+def run_with_backend(api_token):
+    def function(test):
+        backend = Backend()
+
+        async def run():
+            async with serve(backend.handle, '127.0.0.1', 0) as server:
+                port = server.sockets[0].getsockname()[1]
+                config.KABELWERK_URL = f'ws://127.0.0.1:{port}'
+
+                await asyncio.wait_for(test(backend), 5)
+
+        asyncio.run(run())
+
+    return function
+
+
+def test_socket_join_and_receive(run_with_backend):
+    """
+    One should be able to join channels over a single connection and receive
+    their events.
+    """
+    async def test(backend):
+        socket = Socket()
+        await socket.connect()
+
+        received = []
+        rooms = [await socket.join(f'room:{index}') for index in range(3)]
+
+        for channel in rooms:
+            channel.on('message_posted', received.append)
+
+        await backend.broadcast('room:1', 'message_posted', {'id': 1})
+        await backend.broadcast('room:9', 'message_posted', {'id': 9})
+        await backend.broadcast('room:2', 'message_posted', {'id': 2})
+
+        while len(received) < 2:
+            await asyncio.sleep(0.01)
+
+        assert received == [{'id': 1}, {'id': 2}]
+        assert await rooms[0].push('ping', {'x': 1}) == {'x': 1}
+
+        await socket.disconnect()
+
+        assert backend.paths == [
+            '/socket/api/websocket?token=TOKEN&vsn=2.0.0',
+        ]
+        assert backend.joins == ['room:0', 'room:1', 'room:2']
+
+    run_with_backend(test)
+
+
+def test_socket_join_rejected(run_with_backend):
+    """
+    Joining a channel should raise if the backend rejects it.
+    """
+    async def test(backend):
+        socket = Socket()
+        await socket.connect()
+
+        with pytest.raises(ChannelError) as exc_info:
+            await socket.join('forbidden')
+
+        assert exc_info.value.topic == 'forbidden'
+        assert 'forbidden' not in socket.channels
+
+        await socket.disconnect()
+
+    run_with_backend(test)
+
+
+def test_socket_reconnects(run_with_backend):
+    """
+    The socket should reconnect and rejoin its channels when the connection
+    is lost.
+    """
+    async def test(backend):
+        socket = Socket(reconnect_backoff=0.01)
+        await socket.connect()
+
+        channel = await socket.join('room:1')
+
+        await backend.connections[0].close()
+
+        while len(backend.joins) < 2 or not channel.joined:
+            await asyncio.sleep(0.01)
+
+        assert len(backend.paths) == 2
+        assert backend.joins == ['room:1', 'room:1']
+
+        await socket.disconnect()
+
+    run_with_backend(test)
+
+
+def test_socket_heartbeat(run_with_backend):
+    """
+    The socket should send heartbeats to keep the connection alive.
+    """
+    async def test(backend):
+        socket = Socket(heartbeat_interval=0.01)
+        await socket.connect()
+
+        while backend.heartbeats < 3:
+            await asyncio.sleep(0.01)
+
+        assert socket.connected
+        assert len(backend.paths) == 1
+
+        await socket.disconnect()
+
+    run_with_backend(test)
+
+
+def test_socket_rejected_token(api_token):
+    """
+    Connecting should raise AuthenticationError straight away if the backend
+    rejects the handshake with a 401 or a 403.
+    """
+    async def run():
+        async with serve(
+            lambda websocket: None, '127.0.0.1', 0,
+            process_request=lambda connection, request: connection.respond(
+                403, 'Forbidden\n',
+            ),
+        ) as server:
+            port = server.sockets[0].getsockname()[1]
+            config.KABELWERK_URL = f'ws://127.0.0.1:{port}'
+
+            socket = Socket(reconnect_backoff=0.01)
+
+            with pytest.raises(AuthenticationError) as exc_info:
+                await asyncio.wait_for(socket.connect(), 5)
+
+            assert exc_info.value.response.status_code == 403
+            assert not socket.connected
+
+    asyncio.run(run())
+
+
+def test_socket_connect_attempts(api_token):
+    """
+    Connecting should raise ConnectionError once the connect attempts run
+    out.
+    """
+    # a port which nothing listens on
+    with socket_module.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    config.KABELWERK_URL = f'ws://127.0.0.1:{port}'
+
+    async def run():
+        socket = Socket(reconnect_backoff=0.01, connect_attempts=2)
+
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(socket.connect(), 5)
+
+        assert not socket.connected
+
+    asyncio.run(run())
@@ -0,0 +1,151 @@
+from kabelwerk import config
+from kabelwerk.exceptions import ServerError
+from kabelwerk.sync import SyncEngine
+
+
+def user(id, key, name):
+    return {'id': id, 'key': key, 'name': name}
+
+
+def test_sync_engine(tmp_path, mock_api, mock_response):
+    """
+    The sync engine should only make the API calls needed to mirror the given
+    users — creating the new ones, updating the changed ones, and deleting
+    the ones which are gone.
+    """
+    mock_response('POST', '/users', 201, user(1, 'kusanagi', 'Motoko'))
+    mock_response('PATCH', '/users/batou', 200, user(2, 'batou', 'Bato'))
+    mock_response('DELETE', '/users/togusa', 204)
+
+    engine = SyncEngine(tmp_path / 'sync.sqlite3', batch_size=2)
+
+    result = engine.sync(iter([
+        ('kusanagi', 'Motoko', None),
+        ('batou', 'Batou', None),
+        ('togusa', 'Togusa', None),
+    ]))
+
+    assert (result.created, result.updated, result.deleted) == (3, 0, 0)
+    assert len(mock_api.calls) == 3
+
+    result = engine.sync(iter([
+        ('kusanagi', 'Motoko', None),
+        ('batou', 'Bato', None),
+    ]))
+
+    assert result.created == 0
+    assert result.updated == 1
+    assert result.deleted == 1
+    assert result.unchanged == 1
+    assert result.errors == {}
+    assert [call.request.method for call in mock_api.calls[3:]] == [
+        'PATCH', 'DELETE',
+    ]
+
+    engine.close()
+
+
+def test_sync_engine_resumes(tmp_path, mock_api, mock_response):
+    """
+    A sync which fails should be resumable, with the users synced before the
+    failure skipped and the failed users neither stored nor deleted.
+    """
+    config.KABELWERK_MAX_ATTEMPTS = 1
+
+    mock_response('POST', '/users', 201, user(1, 'kusanagi', 'Motoko'))
+    mock_response('PATCH', '/users/batou', 500)
+    mock_response('PATCH', '/users/batou', 200, user(2, 'batou', 'Bato'))
+
+    engine = SyncEngine(tmp_path / 'sync.sqlite3', concurrency=1,
+                        batch_size=1)
+    engine.sync([('batou', 'Batou', None)])
+
+    def records():
+        yield 'kusanagi', 'Motoko', None
+        yield 'batou', 'Bato', None
+        raise RuntimeError('The database went away.')
+
+    try:
+        engine.sync(records())
+    except RuntimeError:
+        pass
+
+    calls = len(mock_api.calls)
+
+    result = engine.sync([
+        ('kusanagi', 'Motoko', None),
+        ('batou', 'Bato', None),
+    ])
+
+    assert result.unchanged == 1
+    assert result.updated == 1
+    assert result.deleted == 0
+    assert len(mock_api.calls) == calls + 1
+
+    engine.close()
+
+
+def test_sync_engine_errors(tmp_path, mock_api, mock_response):
+    """
+    The users which cannot be synced should be reported and retried on the
+    next sync.
+    """
+    config.KABELWERK_MAX_ATTEMPTS = 1
+
+    mock_response('POST', '/users', 500)
+    mock_response('POST', '/users', 201, user(1, 'kusanagi', 'Motoko'))
+
+    engine = SyncEngine(tmp_path / 'sync.sqlite3')
+
+    result = engine.sync([('kusanagi', 'Motoko', None)])
+    assert isinstance(result.errors['kusanagi'], ServerError)
+
+    result = engine.sync([('kusanagi', 'Motoko', None)])
+    assert result.created == 1
+    assert result.errors == {}
+
+    engine.close()
+
+
+def test_sync_engine_hub_changes(tmp_path, mock_api, mock_response):
+    """
+    A user whose hub has changed should be reported as an error — or deleted
+    and created anew if the sync is told to — and a key occurring twice in a
+    batch should only be synced once, as its last record.
+    """
+    mock_response('POST', '/users', 201, user(1, 'kusanagi', 'Motoko'))
+    mock_response('DELETE', '/users/kusanagi', 204)
+
+    engine = SyncEngine(tmp_path / 'sync.sqlite3')
+
+    result = engine.sync([
+        ('kusanagi', 'Major', None),
+        ('kusanagi', 'Motoko', None),
+    ])
+
+    assert result.created == 1
+    assert len(mock_api.calls) == 1
+    assert b'Motoko' in mock_api.calls[0].request.body
+
+    result = engine.sync([('kusanagi', 'Motoko', 'section9')])
+
+    assert result.updated == 0
+    assert isinstance(result.errors['kusanagi'], ValueError)
+    assert len(mock_api.calls) == 1
+
+    result = engine.sync([('kusanagi', 'Motoko', 'section9')],
+                         recreate=True)
+
+    assert result.updated == 1
+    assert result.errors == {}
+    assert [call.request.method for call in mock_api.calls[1:]] == [
+        'DELETE', 'POST',
+    ]
+    assert b'section9' in mock_api.calls[2].request.body
+
+    result = engine.sync([('kusanagi', 'Motoko', 'section9')])
+
+    assert result.unchanged == 1
+    assert len(mock_api.calls) == 3
+
+    engine.close()